@@ -1,15 +1,17 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 import os
 import json
-import uuid
 import time
 
 from flask_cors import CORS
-from video_process.eye_tracking import simulate_eye_tracking_score
-from video_process.video_utils import process_video, evaluate_answer
-from video_process.personality import simulate_big_five_scores, average_traits, score_roles
-from video_process.ai_detection import AIDetector
-from video_process.answer_analyzer import AnswerAnalyzer
+from video_process.pipeline import PipelineScheduler, PIPELINE_WORKERS
+from video_process.runtime import get_ai_detector, readiness, start as start_runtime
+from video_process.evaluation import (
+    VIDEO_KEYS, QUESTION_KEYS, EvaluationError, validate_inputs, validate_mapping, evaluate_interview
+)
+from video_process.jobs import JobQueue, QueueFullError, create_job_store
+from video_process.ingest import ingest_multipart
+from video_process import metrics
 
 UPLOAD_FOLDER = 'upload'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -19,166 +21,222 @@ RETRY_DELAY = 0.5
 app = Flask(__name__)
 CORS(app)
 
-ai_detector = AIDetector()  
+pipeline = PipelineScheduler(PIPELINE_WORKERS)
+metrics.register_collector(lambda: [(
+    "cache_requests_total", "counter", "Result cache lookups by stage and result", pipeline.cache.metric_series()
+)])
+
+# Send this header with any value to get a per-stage "timings" breakdown in the /evaluate response
+DEBUG_TIMINGS_HEADER = "X-Debug-Timings"
 
 def cleanup_files(file_list):
-    for file_path in file_list:
-        retries = 0
-        while retries < MAX_RETRIES:
-            try:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                break
-            except PermissionError:
-                retries += 1
-                if retries < MAX_RETRIES:
-                    time.sleep(RETRY_DELAY)
-                else:
-                    print(f'Failed to delete {file_path} after {MAX_RETRIES} attempts')
-            except Exception as e:
-                print(f'Error deleting {file_path}: {e}')
-                break
+    with metrics.timer("cleanup"):
+        for file_path in file_list:
+            _remove_file(file_path)
+
+def _remove_file(file_path):
+    retries = 0
+    while retries < MAX_RETRIES:
+        try:
+            if os.path.exists(file_path):
+                size = os.path.getsize(file_path)
+                os.remove(file_path)
+                metrics.inc("temp_file_bytes", -size)
+            break
+        except PermissionError:
+            retries += 1
+            if retries < MAX_RETRIES:
+                time.sleep(RETRY_DELAY)
+            else:
+                print(f'Failed to delete {file_path} after {MAX_RETRIES} attempts')
+        except Exception as e:
+            print(f'Error deleting {file_path}: {e}')
+            break
+
+def parse_form_fields(fields):
+    """(mapping, applied_role) from the form fields; raises EvaluationError"""
+    if 'mapping' not in fields:
+        raise EvaluationError("Missing mapping JSON")
+
+    try:
+        mapping = json.loads(fields['mapping'])
+    except json.JSONDecodeError:
+        raise EvaluationError("Invalid JSON format in mapping field")
+    if not isinstance(mapping, dict):
+        raise EvaluationError("Mapping must be a JSON object")
+
+    if 'applied_role' not in fields:
+        raise EvaluationError("Missing applied_role")
+    applied_role = fields['applied_role']
+    print("Role",applied_role)
+
+    validate_mapping(mapping)
+    return mapping, applied_role
+
+def parse_evaluation_request(temp_files, on_video=None):
+    """Stream the form to disk, validating the fields as soon as they arrive.
+
+    Saved video paths are appended to `temp_files` as they are created.
+    `on_video(video_key, path, digest)` is called for each uploaded video once
+    mapping and applied_role have arrived and are valid, so no work starts for
+    a request that will be rejected; an invalid field aborts the upload. Send
+    the fields before the videos to start each video's analysis while the
+    rest is still uploading. Returns (questions, mapping, applied_role);
+    raises EvaluationError.
+    """
+    form = {}
+    waiting = []  # Videos uploaded before the fields were validated
+
+    def field_arrived(fields):
+        if not form and 'mapping' in fields and 'applied_role' in fields:
+            form["mapping"], form["applied_role"] = parse_form_fields(fields)
+            if on_video:
+                for video in waiting:
+                    on_video(*video)
+                waiting.clear()
+
+    def video_arrived(v_key, path, digest):
+        if form and on_video:
+            on_video(v_key, path, digest)
+        else:
+            waiting.append((v_key, path, digest))
+
+    fields, videos = ingest_multipart(
+        request.stream, request.content_type, UPLOAD_FOLDER, temp_files,
+        on_video=video_arrived, content_length=request.content_length, on_field=field_arrived
+    )
+
+    mapping, applied_role = (form["mapping"], form["applied_role"]) if form else parse_form_fields(fields)
+    validate_inputs(mapping, videos)
+
+    questions = [(q_key, videos[v_key][0]) for v_key, q_key in zip(VIDEO_KEYS, QUESTION_KEYS)]
+    return questions, mapping, applied_role
+
+def wants_timeline():
+    """Gaze timelines are opt-in (?timeline=1) since they grow with video length"""
+    return request.args.get("timeline", "").lower() in ("1", "true", "yes")
+
+def run_evaluation_job(payload, progress):
+    return evaluate_interview(
+        payload["questions"], payload["mapping"], payload["applied_role"],
+        pipeline, get_ai_detector(), progress=progress,
+        include_timeline=payload.get("include_timeline", False)
+    )
+
+job_queue = JobQueue(
+    run_evaluation_job,
+    create_job_store(),
+    cleanup=lambda payload: cleanup_files(payload["temp_files"])
+)
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    if "request_start" in g:
+        metrics.observe("http_request_seconds", time.perf_counter() - g.request_start,
+                        endpoint=request.endpoint or "unknown", status=response.status_code)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    if not metrics.METRICS_ENABLED:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    # Liveness only: never waits on models
+    return jsonify({"status": "ok"})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    ready, detail = readiness()
+    return jsonify({"status": detail, "ready": ready}), (200 if ready else 503)
 
 @app.route('/evaluate', methods=['POST'])
 def evaluate():
     temp_files = [] 
+    handles = {}
 
-    try:
-        if 'mapping' not in request.form:
-            return jsonify({"error": "Missing mapping JSON"}), 400
+    def start_question(v_key, video_path, digest):
+        # Each question's pipeline starts as soon as its video has arrived
+        q_key = QUESTION_KEYS[VIDEO_KEYS.index(v_key)]
+        handles[q_key] = pipeline.submit(q_key, video_path, digest)
 
-        try:
-            mapping = json.loads(request.form['mapping'])
-        except json.JSONDecodeError:
-            return jsonify({"error": "Invalid JSON format in mapping field"}), 400
-
-        applied_role = request.form['applied_role']
-
-        video_keys = ['video_one', 'video_two', 'video_three', 'video_four', 'video_five']
-        question_keys = ['question_one', 'question_two', 'question_three', 'question_four', 'question_five']
-        print("Role",applied_role)
-        results = {}
-        personality_traits_list = []
-        eye_tracking_scores = []
-        transcriptions = {}  
-        
-        for v_key, q_key in zip(video_keys, question_keys):
-            if v_key not in request.files:
-                cleanup_files(temp_files)
-                return jsonify({"error": f"Missing video: {v_key}"}), 400
-            if q_key not in mapping:
-                cleanup_files(temp_files)
-                return jsonify({"error": f"Missing mapping for: {q_key}"}), 400
-
-            keywords = mapping[q_key].get('keywords', [])
-            if not keywords:
-                cleanup_files(temp_files)
-                return jsonify({"error": f"No keywords provided for {q_key}"}), 400
-
-            # Save video
-            file_id = str(uuid.uuid4())
-            video_file = request.files[v_key]
-            video_path = os.path.join(UPLOAD_FOLDER, f"{file_id}.mp4")
-            audio_path = os.path.join(UPLOAD_FOLDER, f"{file_id}.wav")
-
-            video_file.save(video_path)
-            temp_files.extend([video_path, audio_path])
-
-            # Step 1: Transcribe & evaluate
-            transcription = process_video(video_path, file_id, UPLOAD_FOLDER)
-            evaluation_result = evaluate_answer(transcription, keywords)
-            evaluation_result["transcription"] = transcription  # Store raw transcription
-            results[q_key] = evaluation_result
-            transcriptions[q_key] = transcription  # Store for AI detection
-
-            # Step 2: Simulate Big Five traits
-            traits = simulate_big_five_scores(video_path)
-            personality_traits_list.append(traits)
-
-            # Step 3: Eye tracking
-            eye_score = simulate_eye_tracking_score(video_path)
-            eye_tracking_scores.append(eye_score)
-            
-
-        # Average traits and calculate role suitability
-        avg_traits = average_traits(personality_traits_list)
-        career_scores = score_roles(avg_traits)
-
-        # Calculate eye tracking metrics
-        eye_track_per_question = [{"question": q_key, "score": f"{score:.0f}%" } for q_key, score in zip(question_keys, eye_tracking_scores)]
-        avg_eye_tracking_score = round(sum(eye_tracking_scores) / len(eye_tracking_scores), 2)
-        ai_results = ai_detector.analyze_responses(transcriptions)
-        
-        
-        
-        # Calculate suspicion score
-        suspicion_factors = {
-            "perfect_answers": all(result["score"] == "100%" for result in results.values()),
-            "role_mismatch": (
-                applied_role != "software_engineer" and
-                max(career_scores.values()) - career_scores.get(applied_role, 0) > 20
-            ),
-            "low_eye_contact": avg_eye_tracking_score < 30,
-            "unnatural_traits": (
-                avg_traits.get("Neuroticism", 0) < 0.2 and
-                avg_traits.get("Conscientiousness", 0) > 0.9 and
-                avg_traits.get("Agreeableness", 0) > 0.9
-            )
-        }
-        suspicion_score = sum(1 for factor in suspicion_factors.values() if factor) * 25
-        ai_answer_ratio = sum(1 for result in ai_results.values() if result["detection"] == "AI-generated") / len(ai_results) * 100
-        overall_suspicion = min(100, (suspicion_score + ai_answer_ratio) / 2)
-
-        # Final answer calculation
-        evaluation_data = {
-            "question_results": results,
-            "career_scores": career_scores,
-            "eye_track_per_question": eye_track_per_question,
-            "overall_eye_tracking_score": f"{avg_eye_tracking_score:.2f}%",
-            "personality_traits": avg_traits
-        }
-        
-        # ai_detection_results dictionary creation:
-        ai_detection_results = {
-            "answer_analysis": ai_results,
-            "suspicion_factors": suspicion_factors,
-            "behavioral_suspicion_score": suspicion_score,  
-            "ai_answer_ratio": round(ai_answer_ratio, 1),   
-            "overall_suspicion_score": round(overall_suspicion, 1),  
-            "is_suspicious": overall_suspicion >= 50,
-            "applied_role": applied_role
-        }
-        
-        final_score = AnswerAnalyzer.calculate_final_score(evaluation_data, ai_detection_results)
-
-        # Final result
-        return jsonify({
-            "success": True,
-            "question_results": results,
-            "career_scores": career_scores,
-            "eye_track_per_question": eye_track_per_question,
-            "personality_traits": avg_traits,
-            "overall_eye_tracking_score": f"{avg_eye_tracking_score:.2f}%",
-            "ai_detection_results": {
-                "answer_analysis": ai_results,
-                "suspicion_factors": suspicion_factors,
-                "behavioral_suspicion_score": f"{suspicion_score:.0f}%",
-                "ai_answer_ratio": f"{round(ai_answer_ratio, 1):.0f}%",
-                "overall_suspicion_score": f"{round(overall_suspicion, 1):.0f}%",
-                "is_suspicious": overall_suspicion >= 50,
-                "applied_role": applied_role
-            },
-            "final_evaluation": final_score
-        })
+    if DEBUG_TIMINGS_HEADER in request.headers:
+        metrics.start_trace()
+    timings = None
+    request_start = time.perf_counter()
 
+    try:
+        with metrics.timer("upload"):
+            questions, mapping, applied_role = parse_evaluation_request(temp_files, on_video=start_question)
+        result = evaluate_interview(
+            questions, mapping, applied_role, pipeline, get_ai_detector(),
+            handles=[handles[q_key] for q_key, _ in questions],
+            include_timeline=wants_timeline()
+        )
+
+    except EvaluationError as e:
+        return jsonify({"error": e.message}), e.status_code
     except Exception as e:
-        cleanup_files(temp_files)
         return jsonify({
             "error": f"Internal server error: {str(e)}",
             "success": False
         }), 500
     finally:
+        # Queued work of a failed request is dropped, not run; the files go once running work lets go of them
+        pipeline.cancel(handles.values(), then=lambda: cleanup_files(temp_files))
+        timings = metrics.end_trace()
+
+    if timings is not None:
+        # Stages are summed over the five videos, which run concurrently, so they can exceed the total
+        timings["total"] = round(time.perf_counter() - request_start, 4)
+        result["timings"] = timings
+    return jsonify(result)
+
+@app.route('/evaluate/jobs', methods=['POST'])
+def submit_evaluation_job():
+    temp_files = []
+
+    try:
+        if job_queue.full():
+            raise QueueFullError("Job queue is full")  # Before the client spends time uploading the videos
+        questions, mapping, applied_role = parse_evaluation_request(temp_files)
+        job_id = job_queue.submit({
+            "questions": questions,
+            "mapping": mapping,
+            "applied_role": applied_role,
+            "temp_files": temp_files,
+            "include_timeline": wants_timeline(),
+        })
+    except EvaluationError as e:
+        cleanup_files(temp_files)
+        return jsonify({"error": e.message}), e.status_code
+    except QueueFullError as e:
         cleanup_files(temp_files)
+        return jsonify({"error": str(e), "success": False}), 429, {"Retry-After": "30"}
+    except Exception as e:
+        cleanup_files(temp_files)
+        return jsonify({
+            "error": f"Internal server error: {str(e)}",
+            "success": False
+        }), 500
+
+    return jsonify({"success": True, "job_id": job_id, "status": "queued"}), 202
+
+@app.route('/evaluate/jobs/<job_id>', methods=['GET'])
+def get_evaluation_job(job_id):
+    job = job_queue.store.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    return jsonify(job)
+
+# Load models according to MODEL_LOADING (lazy, background or preload)
+start_runtime()
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,87 @@
+"""Latency, memory and label parity of each AI detector backend.
+
+Usage: python -m benchmarks.bench_ai_backends [--backends torch torch-int8 onnx] [--texts 100]
+
+Each backend runs in its own process so peak RSS is not shared between them.
+Labels are compared against the fp32 torch backend on a fixed synthetic corpus;
+the run exits non-zero if agreement drops below --min-agreement.
+"""
+import argparse
+import multiprocessing
+import resource
+import statistics
+import sys
+import time
+
+from benchmarks.bench_ai_detection import make_interviews
+
+
+def corpus(count):
+    texts = []
+    for answers in make_interviews(count):
+        texts.extend(text for text in answers.values() if len(text) >= 10)
+    return texts[:count]
+
+
+def run_backend(name, texts, results):
+    from video_process.ai_detection import AIDetector
+
+    start = time.perf_counter()
+    detector = AIDetector(micro_batch_window=0, mode="truncate", backend=name)
+    load_seconds = time.perf_counter() - start
+
+    latencies = []
+    labels = []
+    for text in texts:
+        start = time.perf_counter()
+        label, _ = detector.detect_text(text)
+        latencies.append(time.perf_counter() - start)
+        labels.append(label)
+
+    start = time.perf_counter()
+    detector.detect_batch(texts)
+    batch_seconds = time.perf_counter() - start
+
+    results.put({
+        "backend": name,
+        "labels": labels,
+        "load_s": load_seconds,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p95_ms": sorted(latencies)[int(len(latencies) * 0.95) - 1] * 1000,
+        "batch_texts_per_s": len(texts) / batch_seconds,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=["torch", "torch-int8", "onnx"])
+    parser.add_argument("--texts", type=int, default=100)
+    parser.add_argument("--min-agreement", type=float, default=0.98)
+    args = parser.parse_args()
+
+    texts = corpus(args.texts)
+    backends = ["torch"] + [name for name in args.backends if name != "torch"]
+    context = multiprocessing.get_context("spawn")
+    reports = []
+    for name in backends:
+        results = context.Queue()
+        process = context.Process(target=run_backend, args=(name, texts, results))
+        process.start()
+        report = results.get()
+        process.join()
+        reports.append(report)
+
+    reference = reports[0]["labels"]
+    failed = False
+    print(f"{'backend':<12} {'agree':>7} {'load s':>7} {'mean ms':>8} {'p95 ms':>8} {'batch/s':>8} {'RSS MB':>8}")
+    for report in reports:
+        agreement = sum(a == b for a, b in zip(reference, report["labels"])) / len(reference)
+        failed |= agreement < args.min_agreement
+        print(f"{report['backend']:<12} {agreement:>7.1%} {report['load_s']:>7.1f} {report['mean_ms']:>8.1f} "
+              f"{report['p95_ms']:>8.1f} {report['batch_texts_per_s']:>8.1f} {report['peak_rss_mb']:>8.0f}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
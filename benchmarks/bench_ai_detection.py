@@ -0,0 +1,70 @@
+"""Throughput of AI detection: one text per forward pass vs bucketed batches.
+
+Usage: python -m benchmarks.bench_ai_detection [--interviews 20] [--concurrency 4]
+
+Runs a synthetic corpus of interview-length answers through three paths:
+per-text detection (the old batch-size-1 behaviour), detect_batch per
+interview, and concurrent interviews merged by the micro-batcher.
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from video_process.ai_detection import AIDetector, MicroBatcher
+
+WORDS = ("the java virtual machine runs bytecode compiled from source while the runtime "
+         "environment provides libraries and the development kit adds the compiler and "
+         "tools so I usually explain it as layers that build on each other").split()
+
+
+def make_interviews(count, seed=0):
+    rng = random.Random(seed)
+    interviews = []
+    for _ in range(count):
+        answers = {}
+        for q in ("question_one", "question_two", "question_three", "question_four", "question_five"):
+            length = rng.choice((0, 15, 40, 90, 200, 450))
+            answers[q] = " ".join(rng.choice(WORDS) for _ in range(length))
+        interviews.append(answers)
+    return interviews
+
+
+def timed(label, texts_total, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:>8.2f}s {texts_total / elapsed:>10.1f} texts/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--interviews", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--window", type=float, default=0.02, help="micro-batch window in seconds")
+    args = parser.parse_args()
+
+    detector = AIDetector(micro_batch_window=0)
+    interviews = make_interviews(args.interviews)
+    texts_total = sum(len(answers) for answers in interviews)
+    detector.detect_batch(list(interviews[0].values()))  # Warm up
+
+    baseline = timed("per-text (batch size 1)", texts_total, lambda: [
+        detector.detect_text(text) for answers in interviews for text in answers.values()
+    ])
+    batched = timed("detect_batch per interview", texts_total, lambda: [
+        detector.detect_batch(list(answers.values())) for answers in interviews
+    ])
+
+    batcher = MicroBatcher(detector.detect_batch, args.window)
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        merged = timed(f"micro-batched x{args.concurrency}", texts_total, lambda: list(pool.map(
+            lambda answers: batcher.submit(list(answers.values())), interviews
+        )))
+
+    print(f"\nspeedup: batched {baseline / batched:.1f}x, micro-batched {baseline / merged:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Measure how much of the frame decoding FrameSource hides behind inference.
+
+Usage: python -m benchmarks.bench_decode video.mp4 [--step 3] [--infer-ms 15]
+
+Inference is simulated by a fixed CPU-free wait per analyzed frame, so the
+numbers isolate decode cost and need no MediaPipe. Rows:
+  legacy     read() every frame at full resolution, resize/convert inline
+  inline     FrameSource with prefetch=0 (grab() for skipped frames)
+  prefetch   FrameSource decoding on its background thread
+"""
+import argparse
+import time
+
+from video_process.eye_tracking import EYE_PREFETCH_FRAMES, FrameSource, load_opencv
+
+
+def legacy(video_path, step, infer_seconds):
+    import cv2
+    cap = cv2.VideoCapture(video_path)
+    index = analyzed = 0
+    while cap.isOpened():
+        success, frame = cap.read()
+        if not success:
+            break
+        if index % step == 0:
+            rgb_frame = cv2.cvtColor(cv2.resize(frame, (640, 480)), cv2.COLOR_BGR2RGB)
+            time.sleep(infer_seconds)
+            analyzed += 1
+        index += 1
+    cap.release()
+    return analyzed, index
+
+
+def frame_source(video_path, step, infer_seconds, prefetch):
+    analyzed = 0
+    with FrameSource(video_path, step=step, prefetch=prefetch) as source:
+        for _, rgb_frame in source:
+            time.sleep(infer_seconds)
+            analyzed += 1
+    return analyzed, source.frames_total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("video")
+    parser.add_argument("--step", type=int, default=3, help="Analyze every Nth frame")
+    parser.add_argument("--infer-ms", type=float, default=15.0, help="Simulated inference time per analyzed frame")
+    parser.add_argument("--prefetch", type=int, default=max(EYE_PREFETCH_FRAMES, 1))
+    args = parser.parse_args()
+
+    load_opencv()
+    infer_seconds = args.infer_ms / 1000
+    runs = [
+        ("legacy", lambda: legacy(args.video, args.step, infer_seconds)),
+        ("inline", lambda: frame_source(args.video, args.step, infer_seconds, 0)),
+        (f"prefetch={args.prefetch}", lambda: frame_source(args.video, args.step, infer_seconds, args.prefetch)),
+    ]
+
+    print(f"{'config':<12} {'analyzed':>10} {'sec':>7} {'decode overhead':>16}")
+    for name, run in runs:
+        start = time.perf_counter()
+        analyzed, total = run()
+        elapsed = time.perf_counter() - start
+        overhead = elapsed - analyzed * infer_seconds  # Wall time not hidden behind inference
+        print(f"{name:<12} {analyzed:>5}/{total:<4} {elapsed:>7.2f} {overhead * 1000 / max(analyzed, 1):>12.2f} ms/f")
+
+
+if __name__ == "__main__":
+    main()
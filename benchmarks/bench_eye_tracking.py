@@ -0,0 +1,66 @@
+"""Compare eye-tracking throughput and score drift across sampling modes.
+
+Usage: python -m benchmarks.bench_eye_tracking video1.mp4 [video2.mp4 ...]
+
+The full-frame path (every frame analyzed) is the reference; every other
+configuration reports its frames/sec and its score drift against it. The
+budgeted mode also shows its confidence interval, which should contain the
+full-frame score.
+"""
+import argparse
+import time
+
+from video_process.eye_tracking import EyeTracker, analyze_eye_tracking
+
+CONFIGS = [
+    ("full", {"mode": "full"}),
+    ("fps=15", {"mode": "fps", "target_fps": 15}),
+    ("fps=10", {"mode": "fps", "target_fps": 10}),
+    ("fps=5", {"mode": "fps", "target_fps": 5}),
+    ("nth=2", {"mode": "nth", "every_n": 2}),
+    ("nth=4", {"mode": "nth", "every_n": 4}),
+    ("adaptive", {"mode": "adaptive"}),
+    ("budgeted", {"mode": "budgeted"}),
+]
+
+
+def run(video_path, tracker):
+    rows = []
+    reference = None
+    for name, kwargs in CONFIGS:
+        start = time.perf_counter()
+        result = analyze_eye_tracking(video_path, tracker=tracker, **kwargs)
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference = result["score"]
+        rows.append({
+            "config": name,
+            "score": result["score"],
+            "drift": round(result["score"] - reference, 2),
+            "frames_analyzed": result["frames_analyzed"],
+            "frames_total": result["frames_total"],
+            "fps": result["frames_total"] / elapsed if elapsed else 0.0,
+            "seconds": elapsed,
+            "interval": result.get("confidence_interval"),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("videos", nargs="+")
+    args = parser.parse_args()
+
+    with EyeTracker() as tracker:
+        for video_path in args.videos:
+            print(f"\n{video_path}")
+            print(f"{'config':<10} {'score':>7} {'drift':>7} {'analyzed':>10} {'fps':>8} {'sec':>7}")
+            for row in run(video_path, tracker):
+                print(f"{row['config']:<10} {row['score']:>7.2f} {row['drift']:>+7.2f} "
+                      f"{row['frames_analyzed']:>5}/{row['frames_total']:<4} "
+                      f"{row['fps']:>8.1f} {row['seconds']:>7.2f}"
+                      + (f"  ({row['interval'][0]:.1f}-{row['interval'][1]:.1f})" if row["interval"] else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Scale keyword matching over keyword count and transcript length.
+
+Usage: python -m benchmarks.bench_keywords [--keywords 10 100 1000] [--words 100 1000 10000]
+
+Compares the old per-keyword substring scan with the compiled matcher, both
+cold (compile + match) and warm (cached matcher), on synthetic vocabulary.
+"""
+import argparse
+import random
+import time
+
+from video_process.keywords import KeywordMatcher, keyword_groups
+from video_process.video_utils import evaluate_answer
+
+
+def legacy_evaluate(user_answer, keywords):
+    """The substring scan evaluate_answer used before the matcher"""
+    user_answer = user_answer.lower()
+    keywords = [kw.lower() for kw in keywords]
+    found = [kw for kw in keywords if kw in user_answer]
+    return found, [kw for kw in keywords if kw not in found]
+
+
+def make_vocabulary(size, rng):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return list({"".join(rng.choices(letters, k=rng.randint(3, 10))) for _ in range(size)})
+
+
+def make_keywords(count, vocabulary, rng):
+    """Mostly single words, some two-word phrases"""
+    return [
+        " ".join(rng.sample(vocabulary, 2)) if rng.random() < 0.2 else rng.choice(vocabulary)
+        for _ in range(count)
+    ]
+
+
+def best_of(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--keywords", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--words", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(5000, rng)
+
+    print(f"{'keywords':>8} {'words':>6} {'legacy ms':>10} {'cold ms':>9} {'warm ms':>9} {'speedup':>8}")
+    for keyword_count in args.keywords:
+        keywords = make_keywords(keyword_count, vocabulary, rng)
+        for word_count in args.words:
+            transcript = " ".join(rng.choices(vocabulary, k=word_count))
+            legacy_ms = best_of(lambda: legacy_evaluate(transcript, keywords))
+            cold_ms = best_of(lambda: KeywordMatcher(keyword_groups(keywords)).find(transcript))
+            evaluate_answer(transcript, keywords)  # Compile once into the cache
+            warm_ms = best_of(lambda: evaluate_answer(transcript, keywords))
+            print(f"{keyword_count:>8} {word_count:>6} {legacy_ms:>10.2f} {cold_ms:>9.2f} "
+                  f"{warm_ms:>9.2f} {legacy_ms / warm_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
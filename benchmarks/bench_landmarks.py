@@ -0,0 +1,121 @@
+"""Per-frame cost of the landmark math in EyeTracker, outside MediaPipe.
+
+Usage: python -m benchmarks.bench_landmarks [--frames 2000] [--block 64]
+
+Feeds synthetic Face Mesh results (478 landmarks with a projected head pose)
+through three paths and reports microseconds per frame:
+  legacy     list of int tuples, per-eye arrays, six np.linalg.norm calls
+  per-frame  preallocated float32 buffer + vectorized EAR (analyze_frame path)
+  batch      analyze_landmarks_batch over blocks of frames
+It also checks that all three agree.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from video_process.eye_tracking import (
+    EyeTracker, LEFT_EYE_INDICES, NUM_LANDMARKS, RIGHT_EYE_INDICES, eye_aspect_ratios, load_opencv,
+    model_points,
+)
+
+
+class _Landmark:
+    __slots__ = ("x", "y")
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+class _FaceLandmarks:
+    def __init__(self, points):
+        self.landmark = [_Landmark(float(x), float(y)) for x, y in points.astype(np.float32)]
+
+
+def synthetic_faces(tracker, count, seed=0):
+    import cv2
+    rng = np.random.default_rng(seed)
+    faces = []
+    for _ in range(count):
+        points = rng.uniform(0.3, 0.7, size=(NUM_LANDMARKS, 2))
+        rotation = np.array([np.pi, 0, 0]) + rng.normal(size=3) * 0.2
+        translation = np.array([0, 0, 2500.0]) + rng.normal(size=3) * 50
+        projected, _ = cv2.projectPoints(model_points, rotation, translation,
+                                         tracker.camera_matrix, tracker.dist_coeffs)
+        points[[1, 152, 263, 33, 287, 57]] = projected.reshape(-1, 2) / np.array(tracker.size)
+        faces.append(_FaceLandmarks(points))
+    return faces
+
+
+def legacy_frame(tracker, face_landmarks):
+    """The original analyze_frame landmark path, kept here as the reference"""
+    import cv2
+    landmarks = [(int(lm.x * tracker.size[0]), int(lm.y * tracker.size[1])) for lm in face_landmarks.landmark]
+    image_points = np.array([landmarks[i] for i in (1, 152, 263, 33, 287, 57)], dtype="double")
+    _, rotation_vector, _ = cv2.solvePnP(model_points, image_points, tracker.camera_matrix,
+                                         tracker.dist_coeffs, flags=cv2.SOLVEPNP_ITERATIVE)
+    angles = cv2.RQDecomp3x3(cv2.Rodrigues(rotation_vector)[0])[0]
+
+    def ear(indices):
+        eye = np.array([landmarks[i] for i in indices], dtype="double")
+        horiz = np.linalg.norm(eye[8] - eye[0])
+        vert = (np.linalg.norm(eye[4] - eye[12]) + np.linalg.norm(eye[5] - eye[11])) / 2
+        return 0.0 if horiz == 0 else vert / horiz
+
+    return angles, ear(LEFT_EYE_INDICES), ear(RIGHT_EYE_INDICES)
+
+
+def per_frame(tracker, face_landmarks):
+    landmarks = tracker.fill_landmarks(face_landmarks)
+    angles = tracker.get_head_pose(landmarks)
+    left_ear, right_ear = eye_aspect_ratios(landmarks).tolist()
+    return angles, left_ear, right_ear
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--block", type=int, default=64)
+    args = parser.parse_args()
+
+    load_opencv()
+    tracker = EyeTracker()
+    faces = synthetic_faces(tracker, args.frames)
+
+    start = time.perf_counter()
+    legacy = [legacy_frame(tracker, face) for face in faces]
+    legacy_us = (time.perf_counter() - start) / len(faces) * 1e6
+
+    start = time.perf_counter()
+    current = [per_frame(tracker, face) for face in faces]
+    per_frame_us = (time.perf_counter() - start) / len(faces) * 1e6
+
+    start = time.perf_counter()
+    blocks = []
+    buffer = np.zeros((args.block, NUM_LANDMARKS, 2), dtype=np.float32)
+    for offset in range(0, len(faces), args.block):
+        chunk = faces[offset:offset + args.block]
+        for i, face in enumerate(chunk):
+            buffer[i] = tracker.fill_landmarks(face)
+        blocks.append(tracker.analyze_landmarks_batch(buffer[:len(chunk)]))
+    batch_us = (time.perf_counter() - start) / len(faces) * 1e6
+
+    batch_angles = np.concatenate([b["angles"] for b in blocks])
+    batch_ears = np.concatenate([b["ear"] for b in blocks])
+    legacy_angles = np.array([angles for angles, _, _ in legacy])
+    legacy_ears = np.array([[left, right] for _, left, right in legacy])
+    current_angles = np.array([angles for angles, _, _ in current])
+    current_ears = np.array([[left, right] for _, left, right in current])
+
+    print(f"legacy     {legacy_us:8.1f} us/frame")
+    print(f"per-frame  {per_frame_us:8.1f} us/frame  ({legacy_us / per_frame_us:.1f}x)")
+    print(f"batch x{args.block:<3} {batch_us:8.1f} us/frame  ({legacy_us / batch_us:.1f}x)")
+    print(f"max |diff| vs legacy: per-frame angles {np.abs(current_angles - legacy_angles).max():.2e}, "
+          f"EAR {np.abs(current_ears - legacy_ears).max():.2e}; "
+          f"batch angles {np.abs(batch_angles - legacy_angles).max():.2e}, "
+          f"EAR {np.abs(batch_ears - legacy_ears).max():.2e}")
+
+
+if __name__ == "__main__":
+    main()
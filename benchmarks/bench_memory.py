@@ -0,0 +1,69 @@
+"""Check that peak memory per video stays flat as the video gets longer.
+
+Usage: python -m benchmarks.bench_memory [--seconds 30 120 480] [--tolerance-mb 25] [--cases transcription ...]
+
+Renders the same synthetic interview at each length and runs the streaming
+stages of the benchmark suite on it, one fresh process per run. For every
+stage the peak RSS of the longest video must stay within `--tolerance-mb` of
+the shortest; the script exits with status 1 if any stage grows more, so it
+can guard the bounded-memory paths in CI. Stages whose libraries are missing
+are skipped.
+"""
+import argparse
+import sys
+
+from benchmarks import fixtures, suite
+
+DEFAULT_SECONDS = [30, 120, 480]
+DEFAULT_CASES = ["transcription", "frame_decode", "media_decode", "eye_tracking"]
+TOLERANCE_MB = 25  # Allowed peak RSS growth from the shortest to the longest video
+
+
+def measure(cases, lengths, width=640, height=480):
+    """{case: {seconds: peak RSS in MB, or None if skipped}}"""
+    videos = {}
+    for seconds in lengths:
+        print(f"fixture {seconds}s_{width}x{height}", file=sys.stderr)
+        videos[seconds] = {"path": fixtures.render_interview_video(seconds, width, height), "seconds": seconds}
+
+    peaks = {}
+    for name in cases:
+        peaks[name] = {}
+        for seconds, video in videos.items():
+            print(f"running {name}[{seconds}s]", file=sys.stderr)
+            entry = suite._in_fresh_process(name, video, 1)
+            if entry["status"] != "ok":
+                print(f"  {entry['status']}: {entry.get('reason') or entry.get('error')}", file=sys.stderr)
+                peaks[name][seconds] = None
+                continue
+            peaks[name][seconds] = entry["peak_rss_mb"]
+    return peaks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", nargs="+", type=int, default=DEFAULT_SECONDS, help="video lengths to compare")
+    parser.add_argument("--cases", nargs="+", choices=list(suite.CASES), default=DEFAULT_CASES)
+    parser.add_argument("--tolerance-mb", type=float, default=TOLERANCE_MB)
+    args = parser.parse_args()
+
+    lengths = sorted(args.seconds)
+    peaks = measure(args.cases, lengths)
+
+    print(f"{'case':<16}" + "".join(f"{f'{s}s MB':>10}" for s in lengths) + f"{'growth':>10}")
+    failed = False
+    for name, by_length in peaks.items():
+        shortest, longest = by_length[lengths[0]], by_length[lengths[-1]]
+        if shortest is None or longest is None:
+            print(f"{name:<16} skipped")
+            continue
+        growth = longest - shortest
+        flag = "  GROWS" if growth > args.tolerance_mb else ""
+        failed = failed or bool(flag)
+        print(f"{name:<16}" + "".join(f"{by_length[s]:>10.0f}" for s in lengths) + f"{growth:>+10.1f}{flag}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
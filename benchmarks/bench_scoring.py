@@ -0,0 +1,83 @@
+"""Compare per-candidate scoring with the bulk scorer.
+
+Usage: python -m benchmarks.bench_scoring [--candidates 1000 10000 100000] [--seed 0]
+
+Generates random candidates (two-decimal traits, five per-question content
+scores, eye contact and suspicion) and scores them with score_roles and
+AnswerAnalyzer.calculate_final_score one at a time, then with one
+scoring.score_candidates call. The bulk results, rounded the way the response
+rounds them, must match the per-candidate ones exactly.
+"""
+import argparse
+import random
+import sys
+import time
+
+import numpy as np
+
+from video_process import scoring
+from video_process.answer_analyzer import AnswerAnalyzer
+from video_process.personality import score_roles
+
+
+def make_candidates(count, rng):
+    return [{
+        "traits": {trait: round(rng.uniform(0, 1), 2) for trait in scoring.TRAITS},
+        "content": [rng.randrange(0, 101) for _ in range(5)],
+        "eye": round(rng.uniform(0, 100), 2),
+        "suspicion": rng.choice([0.0, 12.5, 25.0, 37.5, 50.0, 62.5, 75.0, 100.0]),
+    } for _ in range(count)]
+
+
+def score_each(candidates):
+    results = []
+    for candidate in candidates:
+        evaluation_data = {
+            "question_results": {q: {"score": score} for q, score in enumerate(candidate["content"])},
+            "overall_eye_tracking_score": candidate["eye"],
+            "personality_traits": candidate["traits"],
+        }
+        final = AnswerAnalyzer.calculate_final_score(evaluation_data, {"overall_suspicion_score": candidate["suspicion"]})
+        results.append((score_roles(candidate["traits"]), final["final_score"]))
+    return results
+
+
+def score_bulk(arrays):
+    return scoring.score_candidates(*arrays)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    roles = scoring.get_rubric().roles
+    print(f"{'candidates':>10} {'each ms':>10} {'bulk ms':>9} {'speedup':>8}")
+    for count in args.candidates:
+        candidates = make_candidates(count, rng)
+        arrays = (
+            scoring.trait_matrix([c["traits"] for c in candidates]),
+            np.array([c["content"] for c in candidates], dtype=np.float64),
+            np.array([c["eye"] for c in candidates]),
+            np.array([c["suspicion"] for c in candidates]),
+        )
+
+        start = time.perf_counter()
+        each = score_each(candidates)
+        each_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        bulk = score_bulk(arrays)
+        bulk_ms = (time.perf_counter() - start) * 1000
+
+        for i, (career_scores, final_score) in enumerate(each):
+            bulk_roles = {role: int(round(float(fit))) for role, fit in zip(roles, bulk["role_fit"][i])}
+            if bulk_roles != career_scores or round(float(bulk["final_score"][i]), 1) != final_score:
+                print(f"candidate {i}: bulk scores differ from the per-candidate path", file=sys.stderr)
+                sys.exit(1)
+        print(f"{count:>10} {each_ms:>10.1f} {bulk_ms:>9.2f} {each_ms / bulk_ms:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Worker startup cost: app import time, warm-up time and per-worker memory.
+
+Usage: python -m benchmarks.bench_startup [--workers 4]
+
+Every measurement runs in a fresh interpreter. The fork comparison loads the
+models either once before forking (MODEL_LOADING=preload) or in every worker
+after forking, and reads each worker's private vs shared memory from
+/proc/<pid>/smaps_rollup (Linux only).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+IMPORT_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+from benchmarks.bench_startup import memory
+print(json.dumps({"seconds": elapsed, **memory()}))
+"""
+
+WARM_UP_SCRIPT = """
+import json, time
+import app
+from video_process import runtime
+start = time.perf_counter()
+runtime.warm_up()
+elapsed = time.perf_counter() - start
+from benchmarks.bench_startup import memory
+print(json.dumps({"seconds": elapsed, **memory()}))
+"""
+
+FORK_SCRIPT = """
+import json, os, sys
+preload = sys.argv[1] == "preload"
+workers = int(sys.argv[2])
+import app
+from video_process import runtime
+from benchmarks.bench_startup import memory
+if preload:
+    runtime.preload()
+pipes = []
+for _ in range(workers):
+    read_fd, write_fd = os.pipe()
+    if os.fork() == 0:
+        os.close(read_fd)
+        if not preload:
+            runtime.warm_up(run_inference=False)
+        # Serve one request's worth of inference so lazily touched pages count too
+        runtime.get_ai_detector().detect_batch(["A sentence that exercises the detector once."])
+        os.write(write_fd, json.dumps(memory()).encode())
+        os._exit(0)
+    os.close(write_fd)
+    pipes.append(read_fd)
+reports = []
+for fd in pipes:
+    with os.fdopen(fd) as f:
+        reports.append(json.loads(f.read()))
+    os.wait()
+print(json.dumps(reports))
+"""
+
+
+def memory():
+    """RSS plus private/shared split (MB) of the calling process"""
+    report = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                key, value = line.split(":", 1)
+                if key in ("Rss", "Pss", "Private_Clean", "Private_Dirty", "Shared_Clean", "Shared_Dirty"):
+                    report[key] = int(value.split()[0]) / 1024
+    except OSError:
+        import resource
+        report["Rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    if "Private_Clean" in report:
+        report["Private"] = report.pop("Private_Clean") + report.pop("Private_Dirty")
+        report["Shared"] = report.pop("Shared_Clean") + report.pop("Shared_Dirty")
+    return {k: round(v, 1) for k, v in report.items()}
+
+
+def run(script, *args):
+    env = dict(os.environ, MODEL_LOADING="lazy")
+    output = subprocess.run(
+        [sys.executable, "-c", script, *args], env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    imported = run(IMPORT_SCRIPT)
+    print(f"import app:        {imported['seconds']:.2f}s, RSS {imported['Rss']:.0f} MB")
+    warmed = run(WARM_UP_SCRIPT)
+    print(f"warm_up():         {warmed['seconds']:.2f}s, RSS {warmed['Rss']:.0f} MB")
+
+    if not sys.platform.startswith("linux"):
+        return
+    for mode in ("per-worker", "preload"):
+        reports = run(FORK_SCRIPT, mode, str(args.workers))
+        private = sum(r["Private"] for r in reports)
+        pss = sum(r["Pss"] for r in reports)
+        print(f"{mode:<11} x{args.workers}: private {private:.0f} MB total "
+              f"({private / len(reports):.0f} MB/worker), PSS {pss:.0f} MB total")
+
+
+if __name__ == "__main__":
+    main()
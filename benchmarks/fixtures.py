@@ -0,0 +1,135 @@
+"""Deterministic synthetic fixtures for the benchmark suite.
+
+Nothing here needs real recordings: videos are a rendered face (blinking eyes,
+a mouth that opens with the audio, slight head sway) muxed with speech-like
+audio (harmonic voiced bursts separated by pauses), and transcripts are drawn
+from a fixed vocabulary. The same parameters always produce the same files,
+which are cached under the fixtures directory.
+"""
+import os
+import random
+import subprocess
+import tempfile
+import wave
+
+import numpy as np
+
+FIXTURE_VERSION = 1  # Bump when the rendering changes so cached files are rebuilt
+FIXTURES_DIR = os.environ.get("BENCH_FIXTURES_DIR", os.path.join(tempfile.gettempdir(), "interview-bench-fixtures"))
+AUDIO_RATE = 16000
+FPS = 30
+
+VOCABULARY = ("the java virtual machine runs bytecode compiled from source while the runtime "
+              "environment provides libraries and the development kit adds the compiler and "
+              "tools so I usually explain it as layers that build on each other garbage "
+              "collection heap stack thread memory class loader interface").split()
+
+
+def speech_audio(seconds, seed=0, rate=AUDIO_RATE):
+    """Mono int16 PCM of voiced bursts (0.3-2.5 s) separated by pauses (0.2-0.9 s)"""
+    rng = np.random.default_rng(seed)
+    samples = np.zeros(int(seconds * rate), dtype=np.float64)
+    position = int(rng.uniform(0.1, 0.5) * rate)
+    while position < len(samples):
+        length = min(int(rng.uniform(0.3, 2.5) * rate), len(samples) - position)
+        t = np.arange(length) / rate
+        f0 = rng.uniform(100, 200) * (1 + 0.05 * np.sin(2 * np.pi * rng.uniform(3, 6) * t))  # Vibrato
+        phase = 2 * np.pi * np.cumsum(f0) / rate
+        voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+        syllables = 0.5 + 0.5 * np.sin(2 * np.pi * rng.uniform(3, 5) * t) ** 2  # Syllable-rate envelope
+        fade = np.minimum(1, np.minimum(t, t[::-1]) / 0.02)
+        samples[position:position + length] = 0.25 * voiced * syllables * fade
+        position += length + int(rng.uniform(0.2, 0.9) * rate)
+    samples += rng.normal(0, 0.002, len(samples))  # Room noise, well under the silence threshold
+    return (np.clip(samples, -1, 1) * 32767).astype(np.int16)
+
+
+def _draw_face(frame, index, envelope):
+    import cv2
+    height, width = frame.shape[:2]
+    scale = height / 480
+    frame[:] = (60, 50, 40)
+    sway = np.sin(index / FPS * 2 * np.pi * 0.2)
+    cx = int(width / 2 + 20 * scale * sway)
+    cy = int(height / 2 + 8 * scale * np.sin(index / FPS * 2 * np.pi * 0.13))
+
+    cv2.ellipse(frame, (cx, cy), (int(110 * scale), int(145 * scale)), 0, 0, 360, (150, 180, 225), -1)
+    blink = (index % (FPS * 3)) < 4  # Blink for 4 frames every 3 seconds
+    for side in (-1, 1):
+        eye = (cx + side * int(45 * scale), cy - int(35 * scale))
+        openness = 2 if blink else int(14 * scale)
+        cv2.ellipse(frame, eye, (int(24 * scale), openness), 0, 0, 360, (245, 245, 245), -1)
+        if not blink:
+            cv2.circle(frame, eye, int(8 * scale), (50, 30, 20), -1)
+        cv2.line(frame, (eye[0] - int(26 * scale), eye[1] - int(24 * scale)),
+                 (eye[0] + int(26 * scale), eye[1] - int(28 * scale)), (40, 50, 70), max(1, int(4 * scale)))
+    cv2.line(frame, (cx, cy - int(10 * scale)), (cx - int(8 * scale), cy + int(30 * scale)), (110, 140, 190), 2)
+    mouth_open = int((3 + 22 * envelope) * scale)
+    cv2.ellipse(frame, (cx, cy + int(70 * scale)), (int(38 * scale), mouth_open), 0, 0, 360, (60, 40, 150), -1)
+
+
+def render_interview_video(seconds, width=640, height=480, seed=0, directory=FIXTURES_DIR):
+    """Path of a cached talking-face MP4 (H.264 + AAC), rendering it on first use"""
+    from video_process.video_utils import ffmpeg_executable
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"face_v{FIXTURE_VERSION}_{seconds}s_{width}x{height}_s{seed}.mp4")
+    if os.path.exists(path):
+        return path
+
+    audio = speech_audio(seconds, seed)
+    wav_path = path + ".wav"
+    with wave.open(wav_path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(AUDIO_RATE)
+        wav.writeframes(audio.tobytes())
+
+    per_frame = AUDIO_RATE // FPS
+    levels = np.abs(audio[:len(audio) // per_frame * per_frame].reshape(-1, per_frame)).mean(axis=1)
+    levels = np.clip(levels / 4000, 0, 1)
+
+    partial = path + ".partial.mp4"
+    command = [
+        ffmpeg_executable(), "-nostdin", "-v", "error", "-y",
+        "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}", "-r", str(FPS), "-i", "pipe:0",
+        "-i", wav_path,
+        "-c:v", "libx264", "-preset", "veryfast", "-threads", "1", "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-b:a", "64k", "-shortest", partial,
+    ]
+    process = subprocess.Popen(command, stdin=subprocess.PIPE)
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    try:
+        for index in range(int(seconds * FPS)):
+            _draw_face(frame, index, levels[min(index, len(levels) - 1)])
+            process.stdin.write(frame.tobytes())
+    finally:
+        process.stdin.close()
+        process.wait()
+        os.remove(wav_path)
+    if process.returncode != 0:
+        raise RuntimeError(f"Fixture rendering failed for {path}")
+    os.replace(partial, path)  # Only complete files are ever cached
+    return path
+
+
+def transcript_corpus(count, seed=0):
+    """Interview answers of mixed length (empty up to ~450 words)"""
+    rng = random.Random(seed)
+    lengths = (0, 15, 40, 90, 200, 450)
+    return [" ".join(rng.choice(VOCABULARY) for _ in range(rng.choice(lengths))) for _ in range(count)]
+
+
+def keyword_bank(count, seed=0):
+    """Keyword list mixing vocabulary words, unseen words and synonym groups"""
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    bank = []
+    for i in range(count):
+        if i % 5 == 0:
+            bank.append([rng.choice(VOCABULARY), " ".join(rng.sample(VOCABULARY, 2))])
+        elif i % 2:
+            bank.append(rng.choice(VOCABULARY))
+        else:
+            bank.append("".join(rng.choices(letters, k=rng.randint(4, 9))))
+    return bank
@@ -0,0 +1,335 @@
+"""Reproducible benchmark suite over synthetic interview fixtures.
+
+Usage:
+    python -m benchmarks.suite run [--quick] [--cases audio_decode evaluate ...]
+                                   [--repeat 5] [--output results.json] [--baseline baseline.json]
+    python -m benchmarks.suite compare baseline.json results.json [--threshold 0.1]
+
+Every case runs in a fresh interpreter (so peak memory is per case) with the
+speech engine stubbed (TRANSCRIBER_ENGINE=stub) and the result cache off. Each
+case is run once to warm up and then `--repeat` times; the JSON report holds
+latency percentiles, throughput and peak RSS per case. Cases whose libraries
+are missing (MediaPipe, torch, PyAV) are reported as skipped with the reason.
+
+`compare` (or `run --baseline`) flags cases whose p50 latency or peak memory
+grew by more than the threshold, or whose throughput fell by more than it, and
+exits with status 1 if any did.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_all_start_methods, get_context
+
+from benchmarks import fixtures
+
+CASE_ENV = {"TRANSCRIBER_ENGINE": "stub", "CACHE_BACKEND": "none", "MODEL_LOADING": "lazy"}
+
+# (seconds, width, height) of the rendered videos
+VIDEO_SIZES = [(10, 640, 480), (30, 1280, 720), (60, 640, 480)]
+QUICK_VIDEO_SIZES = [(5, 640, 480)]
+
+LATENCY_THRESHOLD = 0.10
+MEMORY_THRESHOLD = 0.20
+
+
+# Cases. Each takes its fixture and returns (fn, units per call, unit name);
+# fn is called once per measured run.
+
+def case_audio_decode(video):
+    from video_process.video_utils import iter_audio_chunks
+    return (lambda: sum(len(chunk) for chunk in iter_audio_chunks(video["path"]))), video["seconds"], "media_s"
+
+
+def case_transcription(video):
+    from video_process.video_utils import StubTranscriber, transcribe_video
+    transcriber = StubTranscriber()
+    return (lambda: transcribe_video(video["path"], transcriber)), video["seconds"], "media_s"
+
+
+def case_frame_decode(video):
+    from video_process.eye_tracking import EYE_TARGET_FPS, FrameSource
+
+    def decode():
+        with FrameSource(video["path"]) as source:
+            source.step = max(1, round(source.fps / EYE_TARGET_FPS))
+            for _ in source:
+                pass
+    return decode, video["seconds"], "media_s"
+
+
+def case_media_decode(video):
+    """Transcription plus frame sampling from one shared decode (needs PyAV); compare with the three cases above"""
+    import av  # noqa: F401  Skips the case up front when PyAV is missing
+    from video_process import media
+    from video_process.eye_tracking import EYE_TARGET_FPS
+
+    class FrameCounter:
+        def __init__(self, fps, label=""):
+            self.step = max(1, round(fps / EYE_TARGET_FPS))
+            self.frames = 0
+
+        def wants(self, index):
+            return index % self.step == 0
+
+        def consume(self, index, rgb_frame):
+            self.frames += 1
+
+        def finish(self, frames_total):
+            return self.frames
+
+    media.register_frame_consumer("bench_frames", FrameCounter)
+    return (lambda: media.analyze_media(video["path"], ("bench_frames",))), video["seconds"], "media_s"
+
+
+def case_eye_tracking(video):
+    from video_process.eye_tracking import analyze_eye_tracking, get_tracker, load_libraries
+    load_libraries()  # Skips the case up front when MediaPipe is missing
+    tracker = get_tracker()
+    return (lambda: analyze_eye_tracking(video["path"], tracker=tracker)), video["seconds"], "media_s"
+
+
+def case_keywords(corpus):
+    from video_process.video_utils import evaluate_answer
+    texts, keywords = corpus["texts"], corpus["keywords"]
+    return (lambda: [evaluate_answer(text, keywords) for text in texts]), len(texts), "answers"
+
+
+def case_ai_detection(corpus):
+    from video_process.ai_detection import AIDetector
+    detector = AIDetector(micro_batch_window=0)
+    texts = corpus["texts"]
+    interviews = [texts[i:i + 5] for i in range(0, len(texts), 5)]
+    return (lambda: [detector.detect_batch(answers) for answers in interviews]), len(texts), "answers"
+
+
+def case_evaluate(video):
+    """Full /evaluate request through the Flask test client, five copies of the video"""
+    import app as flask_app
+    flask_app.get_ai_detector()  # Load the model outside the measured runs
+    from video_process.eye_tracking import load_libraries
+    load_libraries()
+    client = flask_app.app.test_client()
+    mapping = json.dumps({q_key: {"keywords": ["java", "runtime", ["jvm", "virtual machine"]]}
+                          for q_key in flask_app.QUESTION_KEYS})
+
+    def request():
+        data = {"mapping": mapping, "applied_role": "software_engineer"}
+        files = [open(video["path"], "rb") for _ in flask_app.VIDEO_KEYS]
+        try:
+            for v_key, f in zip(flask_app.VIDEO_KEYS, files):
+                data[v_key] = (f, f"{v_key}.mp4")
+            response = client.post("/evaluate", data=data, content_type="multipart/form-data")
+        finally:
+            for f in files:
+                f.close()
+        if response.status_code != 200:
+            raise RuntimeError(f"/evaluate returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    return request, 5 * video["seconds"], "media_s"
+
+
+CASES = {
+    "audio_decode": (case_audio_decode, "video"),
+    "transcription": (case_transcription, "video"),
+    "frame_decode": (case_frame_decode, "video"),
+    "media_decode": (case_media_decode, "video"),
+    "eye_tracking": (case_eye_tracking, "video"),
+    "keywords": (case_keywords, "corpus"),
+    "ai_detection": (case_ai_detection, "corpus"),
+    "evaluate": (case_evaluate, "video"),
+}
+
+
+def _peak_rss_mb(who=resource.RUSAGE_SELF):
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # Bytes on macOS, KiB elsewhere
+
+
+def percentile(values, q):
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))]
+
+
+def run_case(name, fixture, repeat):
+    """Run one case in this (fresh) process and return its report entry"""
+    os.environ.update(CASE_ENV)
+    setup, _ = CASES[name]
+    rss_before = _peak_rss_mb()
+    try:
+        fn, units, unit = setup(fixture)
+        fn()  # Warm-up, not measured
+    except ImportError as e:
+        return {"status": "skipped", "reason": f"missing dependency: {e.name or e}"}
+
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    total = sum(latencies)
+    return {
+        "status": "ok",
+        "runs": repeat,
+        "latency_s": {
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p99": percentile(latencies, 99),
+            "mean": total / repeat,
+            "min": min(latencies),
+            "max": max(latencies),
+        },
+        "throughput": {"value": units * repeat / total, "unit": f"{unit}/s"},
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "peak_rss_before_case_mb": round(rss_before, 1),
+        "peak_children_rss_mb": round(_peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+    }
+
+
+def _in_fresh_process(name, fixture, repeat):
+    # A spawned child inherits this process's peak RSS on Linux; forkserver children start from a small server
+    context = get_context("forkserver" if "forkserver" in get_all_start_methods() else "spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        try:
+            return pool.submit(run_case, name, fixture, repeat).result()
+        except Exception as e:
+            return {"status": "error", "error": f"{type(e).__name__}: {e}"}
+
+
+def build_fixtures(quick):
+    sizes = QUICK_VIDEO_SIZES if quick else VIDEO_SIZES
+    videos = {}
+    for seconds, width, height in sizes:
+        label = f"{seconds}s_{width}x{height}"
+        print(f"fixture {label}", file=sys.stderr)
+        videos[label] = {"path": fixtures.render_interview_video(seconds, width, height), "seconds": seconds}
+    corpus = {
+        "texts": fixtures.transcript_corpus(50 if quick else 200),
+        "keywords": fixtures.keyword_bank(100 if quick else 500),
+    }
+    return videos, corpus
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    import cv2
+    import numpy
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "opencv": cv2.__version__,
+        "numpy": numpy.__version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "fixture_version": fixtures.FIXTURE_VERSION,
+    }
+
+
+def run_suite(cases, repeat, quick):
+    videos, corpus = build_fixtures(quick)
+    results = {}
+    for name in cases:
+        _, kind = CASES[name]
+        targets = videos.items() if kind == "video" else [("corpus", corpus)]
+        for label, fixture in targets:
+            key = f"{name}[{label}]"
+            print(f"running {key}", file=sys.stderr)
+            results[key] = _in_fresh_process(name, fixture, repeat)
+    return {"environment": environment(), "config": {"repeat": repeat, "quick": quick}, "results": results}
+
+
+def compare(baseline, current, threshold=LATENCY_THRESHOLD, memory_threshold=MEMORY_THRESHOLD):
+    """Rows comparing two reports; each row has a `regression` flag"""
+    rows = []
+    for key, entry in current["results"].items():
+        base = baseline["results"].get(key)
+        if entry.get("status") != "ok" or not base or base.get("status") != "ok":
+            rows.append({"case": key, "note": "not comparable", "regression": False})
+            continue
+        latency = entry["latency_s"]["p50"] / base["latency_s"]["p50"] - 1
+        throughput = entry["throughput"]["value"] / base["throughput"]["value"] - 1
+        memory = entry["peak_rss_mb"] / base["peak_rss_mb"] - 1
+        rows.append({
+            "case": key,
+            "p50_change": latency,
+            "throughput_change": throughput,
+            "memory_change": memory,
+            "regression": latency > threshold or throughput < -threshold or memory > memory_threshold,
+        })
+    return rows
+
+
+def print_comparison(rows):
+    print(f"{'case':<34} {'p50':>8} {'thruput':>8} {'peak mem':>9}")
+    for row in rows:
+        if "note" in row:
+            print(f"{row['case']:<34} {row['note']}")
+            continue
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(f"{row['case']:<34} {row['p50_change']:>+8.1%} {row['throughput_change']:>+8.1%} "
+              f"{row['memory_change']:>+9.1%}{flag}")
+
+
+def print_results(report):
+    print(f"{'case':<34} {'p50 s':>8} {'p90 s':>8} {'throughput':>18} {'peak MB':>8}")
+    for key, entry in report["results"].items():
+        if entry["status"] != "ok":
+            print(f"{key:<34} {entry['status']}: {entry.get('reason') or entry.get('error')}")
+            continue
+        latency = entry["latency_s"]
+        throughput = f"{entry['throughput']['value']:.1f} {entry['throughput']['unit']}"
+        print(f"{key:<34} {latency['p50']:>8.3f} {latency['p90']:>8.3f} {throughput:>18} {entry['peak_rss_mb']:>8.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Interview pipeline benchmark suite")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="run the suite and write a JSON report")
+    run.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    run.add_argument("--repeat", type=int, default=5, help="measured runs per case")
+    run.add_argument("--quick", action="store_true", help="one short video and a small corpus")
+    run.add_argument("--output", help="JSON report path (default: stdout)")
+    run.add_argument("--baseline", help="report to compare against")
+    run.add_argument("--threshold", type=float, default=LATENCY_THRESHOLD)
+    diff = commands.add_parser("compare", help="compare two JSON reports")
+    diff.add_argument("baseline")
+    diff.add_argument("current")
+    diff.add_argument("--threshold", type=float, default=LATENCY_THRESHOLD)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = run_suite(args.cases, args.repeat, args.quick)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+            print_results(report)
+        else:
+            json.dump(report, sys.stdout, indent=2)
+            print()
+        baseline_path = args.baseline
+    else:
+        with open(args.current) as f:
+            report = json.load(f)
+        baseline_path = args.baseline
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        rows = compare(baseline, report, args.threshold)
+        print_comparison(rows)
+        if any(row["regression"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
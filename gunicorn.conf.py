@@ -0,0 +1,10 @@
+# gunicorn -c gunicorn.conf.py app:app
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+timeout = int(os.environ.get("WORKER_TIMEOUT", 600))
+
+# With MODEL_LOADING=preload the app (and its models) is imported once in the
+# master and forked into every worker, sharing the weights copy-on-write.
+preload_app = os.environ.get("MODEL_LOADING", "background") == "preload"
@@ -0,0 +1,53 @@
+"""Each optimized AI detector backend must match the fp32 PyTorch model on a fixed corpus.
+
+Needs torch, transformers and the model in the local Hugging Face cache (the
+onnx cases also need onnxruntime); skipped otherwise.
+"""
+import pytest
+
+from benchmarks.bench_ai_backends import corpus
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from video_process import ai_backends  # noqa: E402
+
+CORPUS_TEXTS = 60
+MIN_LABEL_AGREEMENT = 0.98
+# Largest AI-probability difference from fp32 per backend: exported fp32 graphs
+# differ only by float rounding, int8 weights move borderline texts more
+MAX_PROBABILITY_GAP = {"torch-int8": 0.15, "onnx": 1e-3, "onnx-int8": 0.15}
+
+
+@pytest.fixture(scope="module")
+def reference():
+    try:
+        tokenizer = ai_backends.load_tokenizer(local_files_only=True)
+        model = ai_backends.load_torch_model("cpu", local_files_only=True)
+    except OSError:
+        pytest.skip(f"{ai_backends.MODEL_NAME} is not in the local model cache")
+    return tokenizer, ai_backends.TorchBackend("cpu", model=model)
+
+
+@pytest.fixture(scope="module")
+def texts():
+    return corpus(CORPUS_TEXTS)
+
+
+def _candidate(name, fp32_model, tmp_path_factory):
+    if name == "torch-int8":
+        return ai_backends.QuantizedTorchBackend(model=fp32_model)
+    pytest.importorskip("onnxruntime")
+    path = str(tmp_path_factory.mktemp("onnx") / "detector.onnx")
+    ai_backends.export_onnx(path, quantize=name == "onnx-int8")
+    return ai_backends.OnnxBackend(path)
+
+
+@pytest.mark.parametrize("name", sorted(MAX_PROBABILITY_GAP))
+def test_backend_matches_fp32(name, reference, texts, tmp_path_factory):
+    tokenizer, fp32 = reference
+    candidate = _candidate(name, fp32.model, tmp_path_factory)
+
+    report = ai_backends.compare_backends(fp32, candidate, tokenizer, texts)
+    assert report["label_agreement"] >= MIN_LABEL_AGREEMENT, report
+    assert report["max_probability_gap"] <= MAX_PROBABILITY_GAP[name], report
@@ -0,0 +1,60 @@
+"""Keyword matching: whole words, synonyms, phrases and plural folding in both directions."""
+import pytest
+
+from video_process.keywords import KeywordMatcher, stem
+
+PLURALS = [
+    ("runtime", "runtimes"),
+    ("library", "libraries"),
+    ("box", "boxes"),
+    ("index", "indexes"),
+    ("match", "matches"),
+    ("hash", "hashes"),
+    ("class", "classes"),
+    ("cache", "caches"),
+]
+
+
+def matched(keywords, text, stemming="plural"):
+    """Group labels found in text, in text order"""
+    matcher = KeywordMatcher([(keyword,) if isinstance(keyword, str) else keyword for keyword in keywords],
+                             stemming)
+    return [matcher.labels[group] for group, _, _ in matcher.find(text)]
+
+
+@pytest.mark.parametrize("singular, plural", PLURALS)
+def test_plural_and_singular_share_a_stem(singular, plural):
+    assert stem(singular) == stem(plural)
+
+
+@pytest.mark.parametrize("singular, plural", PLURALS)
+def test_plurals_match_either_way_round(singular, plural):
+    assert matched([singular], f"We used {plural} here") == [singular]
+    assert matched([plural], f"We used a {singular} here") == [plural]
+
+
+def test_plain_s_endings_are_not_folded():
+    assert stem("class") == "class"
+    assert stem("status") == "status"
+    assert stem("analysis") == "analysis"
+
+
+def test_no_stemming_matches_exact_words_only():
+    assert matched(["box"], "two boxes", stemming="none") == []
+    assert matched(["boxes"], "two boxes", stemming="none") == ["boxes"]
+
+
+def test_whole_words_only():
+    assert matched(["java"], "JavaScript is not java") == ["java"]
+    assert matched(["c++", "c#"], "C++ and C# but not C") == ["c++", "c#"]
+
+
+def test_synonyms_and_phrases():
+    text = "The JVM, or Java Virtual Machine, runs bytecode"
+    assert matched([["jvm", "java virtual machine"], "bytecode"], text) == ["jvm", "jvm", "bytecode"]
+
+
+def test_offsets_point_into_the_original_text():
+    text = "Two Boxes and a CACHE"
+    matcher = KeywordMatcher([("box",), ("caches",)], "plural")
+    assert [text[start:end] for _, start, end in matcher.find(text)] == ["Boxes", "CACHE"]
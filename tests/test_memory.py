@@ -0,0 +1,26 @@
+"""Peak memory per video must stay flat as the video gets longer.
+
+The pytest version of `python -m benchmarks.bench_memory`, on shorter and
+smaller fixtures so it runs in CI. Each stage runs in a fresh process; stages
+whose libraries are missing are skipped.
+"""
+import pytest
+
+from benchmarks import bench_memory
+
+SHORT_SECONDS = 20
+LONG_SECONDS = 320
+# Tighter than the script's default: the long video's whole audio track, decoded to 16 kHz mono, is about 10 MB
+TOLERANCE_MB = 5
+
+
+@pytest.mark.parametrize("case", ["transcription", "frame_decode", "media_decode"])
+def test_peak_memory_is_flat_in_video_length(case):
+    peaks = bench_memory.measure([case], [SHORT_SECONDS, LONG_SECONDS], width=320, height=240)[case]
+    if peaks[SHORT_SECONDS] is None or peaks[LONG_SECONDS] is None:
+        pytest.skip(f"{case} could not run here (see stderr)")
+
+    growth = peaks[LONG_SECONDS] - peaks[SHORT_SECONDS]
+    assert growth <= TOLERANCE_MB, (
+        f"{case} peak RSS grew {growth:.1f} MB from {SHORT_SECONDS}s to {LONG_SECONDS}s"
+    )
@@ -0,0 +1,177 @@
+"""Inference backends for AIDetector.
+
+torch, transformers and onnxruntime are imported inside the functions that
+need them so that importing this module stays cheap.
+
+    torch      full-precision PyTorch model (default)
+    torch-int8 PyTorch with dynamic int8 quantization of the Linear layers
+    onnx       exported ONNX Runtime graph (build it with the export command below)
+
+Export the ONNX artifact from the local model cache:
+
+    python -m video_process.ai_backends export [--output PATH] [--quantize] [--corpus FILE]
+"""
+import argparse
+import logging
+import os
+from typing import Dict, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "openai-community/roberta-base-openai-detector"
+AI_BACKEND = os.environ.get("AI_DETECTOR_BACKEND", "torch")
+ONNX_MODEL_PATH = os.environ.get("AI_DETECTOR_ONNX_PATH", os.path.join("models", "roberta-base-openai-detector.onnx"))
+BACKENDS = ("torch", "torch-int8", "onnx")
+
+
+def load_tokenizer(local_files_only: bool = False):
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(MODEL_NAME, local_files_only=local_files_only)
+
+
+def load_torch_model(device: str = "cpu", local_files_only: bool = False):
+    from transformers import AutoModelForSequenceClassification
+    model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME, local_files_only=local_files_only)
+    model.to(device)
+    model.eval()
+    return model
+
+
+class TorchBackend:
+    name = "torch"
+    tensor_type = "pt"
+
+    def __init__(self, device: str = "cpu", model=None):
+        """`model` reuses an already loaded model (on `device`) instead of loading another copy"""
+        self.device = device
+        self.model = model if model is not None else load_torch_model(device)
+
+    def ai_probabilities(self, inputs) -> List[float]:
+        import torch
+        inputs = inputs.to(self.device)
+        with torch.no_grad():
+            logits = self.model(**inputs).logits
+        return torch.softmax(logits, dim=1)[:, 1].tolist()
+
+
+class QuantizedTorchBackend(TorchBackend):
+    name = "torch-int8"
+
+    def __init__(self, device: str = "cpu", model=None):
+        """`model` is quantized from an already loaded fp32 CPU model, which is left unchanged"""
+        import torch
+        # Dynamic quantization kernels are CPU-only
+        self.device = "cpu"
+        self.model = torch.quantization.quantize_dynamic(
+            model if model is not None else load_torch_model("cpu"), {torch.nn.Linear}, dtype=torch.qint8
+        )
+
+
+class OnnxBackend:
+    name = "onnx"
+    tensor_type = "np"
+
+    def __init__(self, path: str = ONNX_MODEL_PATH):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("The onnx backend requires the onnxruntime package") from e
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                f"ONNX model not found at {path}; run `python -m video_process.ai_backends export`"
+            )
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+    def ai_probabilities(self, inputs) -> List[float]:
+        logits = self.session.run(["logits"], {
+            "input_ids": inputs["input_ids"].astype(np.int64),
+            "attention_mask": inputs["attention_mask"].astype(np.int64),
+        })[0]
+        logits = logits - logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+        return probs[:, 1].tolist()
+
+
+def create_backend(name: str = AI_BACKEND, device: str = "cpu"):
+    if name == "torch":
+        return TorchBackend(device)
+    if name == "torch-int8":
+        return QuantizedTorchBackend(device)
+    if name == "onnx":
+        return OnnxBackend()
+    raise ValueError(f"Unknown AI detector backend: {name} (expected one of {', '.join(BACKENDS)})")
+
+
+def compare_backends(reference, candidate, tokenizer, texts: List[str]) -> Dict[str, float]:
+    """Label agreement and max probability gap between two backends on a corpus"""
+    agree = 0
+    max_gap = 0.0
+    for text in texts:
+        encoding = tokenizer(text, truncation=True, max_length=512)
+        ref = reference.ai_probabilities(tokenizer.pad([encoding], return_tensors=reference.tensor_type))[0]
+        cand = candidate.ai_probabilities(tokenizer.pad([encoding], return_tensors=candidate.tensor_type))[0]
+        agree += (ref > 0.5) == (cand > 0.5)
+        max_gap = max(max_gap, abs(ref - cand))
+    return {"label_agreement": agree / len(texts) if texts else 1.0, "max_probability_gap": max_gap}
+
+
+def export_onnx(output: str = ONNX_MODEL_PATH, quantize: bool = False, corpus: str = None):
+    """Export the cached PyTorch model to ONNX, optionally int8-quantized, and check parity"""
+    import torch
+    tokenizer = load_tokenizer(local_files_only=True)
+    model = load_torch_model("cpu", local_files_only=True)
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+
+    sample = tokenizer("A short calibration sentence for export.", return_tensors="pt")
+    fp32_path = output if not quantize else output.replace(".onnx", ".fp32.onnx")
+    torch.onnx.export(
+        model,
+        (sample["input_ids"], sample["attention_mask"]),
+        fp32_path,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["logits"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "logits": {0: "batch"},
+        },
+        opset_version=14,
+    )
+    logger.info(f"Exported ONNX model to {fp32_path}")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(fp32_path, output, weight_type=QuantType.QInt8)
+        os.remove(fp32_path)
+        logger.info(f"Quantized ONNX model written to {output}")
+
+    if corpus:
+        with open(corpus, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+        reference = TorchBackend("cpu", model=model)
+        report = compare_backends(reference, OnnxBackend(output), tokenizer, texts)
+        logger.info(f"Parity on {len(texts)} texts: {report}")
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI detector backend tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="export the cached model to ONNX")
+    export.add_argument("--output", default=ONNX_MODEL_PATH)
+    export.add_argument("--quantize", action="store_true", help="apply int8 dynamic quantization to the graph")
+    export.add_argument("--corpus", help="text file, one sample per line, to check label parity after export")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_onnx(args.output, args.quantize, args.corpus)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -1,58 +1,240 @@
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import torch
-from typing import Dict, Tuple
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import Future
 import logging
+import os
+import queue
+import threading
+import time
+
+from video_process import metrics
+from video_process.ai_backends import AI_BACKEND, create_backend, load_tokenizer
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+MAX_TOKENS = 512
+LENGTH_BUCKETS = (64, 128, 256, MAX_TOKENS)  # Token-length bucket edges used to limit padding
+MAX_BATCH_SIZE = 16  # Sequences per forward pass
+# Window (seconds) for merging detection calls from concurrent requests; 0 disables
+MICRO_BATCH_WINDOW = float(os.environ.get("AI_MICRO_BATCH_WINDOW", 0.02))
+
+# Long transcripts: "truncate" scores only the first MAX_TOKENS, "chunked" scores overlapping windows
+DETECTION_MODE = os.environ.get("AI_DETECTION_MODE", "chunked")
+WINDOW_OVERLAP = 128  # Tokens shared by consecutive windows
+MAX_WINDOWS = 16  # Windows per transcript; longer ones get evenly spaced windows with unscored gaps between them
+WINDOW_COMBINE = "mean"  # "mean", "max" or "weighted" (by window token count)
+WINDOW_EARLY_EXIT = True  # Stop scoring a transcript once remaining windows cannot flip its verdict
+COMBINE_RULES = ("mean", "max", "weighted")
+
 class AIDetector:
-    def __init__(self):
+    def __init__(self, micro_batch_window: float = MICRO_BATCH_WINDOW, mode: str = DETECTION_MODE,
+                 combine: str = WINDOW_COMBINE, early_exit: bool = WINDOW_EARLY_EXIT,
+                 backend: str = AI_BACKEND):
+        if mode not in ("truncate", "chunked"):
+            raise ValueError(f"Unknown detection mode: {mode}")
+        if combine not in COMBINE_RULES:
+            raise ValueError(f"Unknown window combine rule: {combine}")
+        import torch
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.tokenizer = None
-        self.model = None
+        self.backend = None
+        self.backend_name = backend
+        self.mode = mode
+        self.combine = combine
+        self.early_exit = early_exit
         self._load_model()
+        self.batcher = MicroBatcher(self.detect_detailed, micro_batch_window) if micro_batch_window > 0 else None
+
+    @property
+    def config_key(self) -> str:
+        """Settings that change detection output, used in result cache keys"""
+        return f"{self.backend_name}:{self.mode}:{self.combine}:{int(self.early_exit)}"
 
     def _load_model(self):
         """Load the AI detection model"""
         try:
-            self.tokenizer = AutoTokenizer.from_pretrained("openai-community/roberta-base-openai-detector")
-            self.model = AutoModelForSequenceClassification.from_pretrained(
-                "openai-community/roberta-base-openai-detector"
-            ).to(self.device)
-            self.model.eval()
-            logger.info("AI detection model loaded successfully")
+            self.tokenizer = load_tokenizer()
+            self.backend = create_backend(self.backend_name, self.device)
+            logger.info(f"AI detection model loaded successfully ({self.backend.name} backend)")
         except Exception as e:
             logger.error(f"Failed to load AI detection model: {e}")
             raise
 
-    def detect_text(self, text: str) -> Tuple[str, float]:
-        """Detect if text is AI-generated with modified empty text handling"""
+    @staticmethod
+    def _precheck(text: str) -> Optional[Tuple[str, float]]:
+        """Label texts that never reach the model"""
         if not text:  # Empty string case
             return "Empty", 0.0
         if len(text) < 10:  # Short text case
             return "TooShort", 0.0
-        
+        return None
+
+    def _buckets(self, lengths: List[int]) -> List[List[int]]:
+        """Group indices of similar token length, shortest first, capped at MAX_BATCH_SIZE"""
+        groups = {}
+        for index in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+            edge = next(edge for edge in LENGTH_BUCKETS if lengths[index] <= edge)
+            groups.setdefault(edge, []).append(index)
+        buckets = []
+        for edge in sorted(groups):
+            indices = groups[edge]
+            for start in range(0, len(indices), MAX_BATCH_SIZE):
+                buckets.append(indices[start:start + MAX_BATCH_SIZE])
+        return buckets
+
+    def _ai_probabilities(self, encodings: List[Dict[str, List[int]]]) -> List[float]:
+        """One forward pass over already tokenized, unpadded sequences"""
+        inputs = self.tokenizer.pad(encodings, return_tensors=self.backend.tensor_type)
+        start = time.perf_counter()
+        probs = self.backend.ai_probabilities(inputs)
+        metrics.observe("ai_inference_seconds", time.perf_counter() - start)
+        metrics.observe("ai_batch_size", len(encodings))
+        return probs
+
+    def _windows(self, text: str) -> List[Dict[str, List[int]]]:
+        """Split a transcript into overlapping model-sized windows"""
+        ids = self.tokenizer(text, add_special_tokens=False)["input_ids"]
+        size = MAX_TOKENS - self.tokenizer.num_special_tokens_to_add()
+        stride = size - WINDOW_OVERLAP
+        if self.mode == "truncate" or len(ids) <= size:
+            starts = [0]
+        else:
+            starts = list(range(0, len(ids) - size + stride, stride))
+            starts[-1] = len(ids) - size  # Last window ends exactly at the final token
+            if len(starts) > MAX_WINDOWS:
+                # Bound the cost: evenly spaced windows that still include both ends, but not the text between them
+                last = len(starts) - 1
+                starts = [starts[round(k * last / (MAX_WINDOWS - 1))] for k in range(MAX_WINDOWS)]
+
+        windows = []
+        for start in starts:
+            input_ids = self.tokenizer.build_inputs_with_special_tokens(ids[start:start + size])
+            windows.append({"input_ids": input_ids, "attention_mask": [1] * len(input_ids)})
+        return windows
+
+    def _combine(self, probs: List[Optional[float]], weights: List[int]) -> Tuple[float, float, float]:
+        """Combined probability over scored windows, plus its bounds once all windows are scored"""
+        scored = [(p, w) for p, w in zip(probs, weights) if p is not None]
+        remaining = [w for p, w in zip(probs, weights) if p is None]
+        if self.combine == "max":
+            current = max(p for p, _ in scored)
+            return current, current, (1.0 if remaining else current)
+
+        if self.combine == "mean":
+            scored = [(p, 1) for p, _ in scored]
+            remaining = [1] * len(remaining)
+        scored_sum = sum(p * w for p, w in scored)
+        scored_weight = sum(w for _, w in scored)
+        total_weight = scored_weight + sum(remaining)
+        return (
+            scored_sum / scored_weight,
+            scored_sum / total_weight,
+            (scored_sum + sum(remaining)) / total_weight,
+        )
+
+    def _rounds(self, windows: Dict[int, List]) -> List[List[Tuple[int, int]]]:
+        """(text index, window index) pairs to score per round, with early-exit checks in between.
+
+        Round one scores every text's first window, which can settle a "max"
+        verdict. Round two scores up to a majority of each text's windows,
+        the earliest a "mean" or "weighted" verdict can be settled. Round
+        three scores the rest. Without early exit there is a single round,
+        so batches stay as full as possible.
+        """
+        if not self.early_exit:
+            return [[(i, w) for i, encodings in windows.items() for w in range(len(encodings))]]
+        rounds = [[], [], []]
+        for i, encodings in windows.items():
+            count = len(encodings)
+            start = 0
+            for round_windows, end in zip(rounds, (1, count // 2 + 1, count)):
+                round_windows.extend((i, w) for w in range(start, end))
+                start = end
+        return rounds
+
+    def detect_detailed(self, texts: List[str]) -> List[Dict]:
+        """Detect AI-generated text for many inputs, batching windows by token length.
+
+        Returns one dict per text with the label, combined AI probability and the
+        per-window probabilities (None for windows skipped by early exit).
+        """
+        results: List[Optional[Dict]] = []
+        for text in texts:
+            precheck = self._precheck(text)
+            results.append(
+                {"label": precheck[0], "probability": precheck[1], "window_probabilities": []}
+                if precheck else None
+            )
+        pending = [i for i, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+
+        windows = {}  # text index -> encodings
         try:
-            inputs = self.tokenizer(text, return_tensors="pt", truncation=True, max_length=512).to(self.device)
-            with torch.no_grad():
-                logits = self.model(**inputs).logits
-            
-            probs = torch.softmax(logits, dim=1).squeeze()
-            ai_prob = probs[1].item()
-            
-            label = "AI-generated" if ai_prob > 0.5 else "Human-written"
-            return label, ai_prob
+            for i in pending:
+                windows[i] = self._windows(texts[i])
         except Exception as e:
             logger.error(f"AI detection error: {e}")
-            return "Error", 0.0
+            for i in pending:
+                results[i] = {"label": "Error", "probability": 0.0, "window_probabilities": []}
+            return results
+        window_probs = {i: [None] * len(encodings) for i, encodings in windows.items()}
+        weights = {i: [len(encoding["input_ids"]) for encoding in encodings] for i, encodings in windows.items()}
+
+        failed = set()
+        undecided = set(pending)
+        for round_windows in self._rounds(windows):
+            # (text index, window index) of this round's windows for texts still undecided, bucketed by length
+            batch = [(i, w) for i, w in round_windows if i in undecided]
+            for bucket in self._buckets([len(windows[i][w]["input_ids"]) for i, w in batch]):
+                bucket = [batch[k] for k in bucket if batch[k][0] not in failed]
+                if not bucket:
+                    continue
+                try:
+                    probs = self._ai_probabilities([windows[i][w] for i, w in bucket])
+                except Exception as e:
+                    logger.error(f"AI detection error: {e}")
+                    failed.update(i for i, _ in bucket)
+                    continue
+                for (i, w), ai_prob in zip(bucket, probs):
+                    window_probs[i][w] = ai_prob
+
+            undecided -= failed
+            if self.early_exit:
+                for i in list(undecided):
+                    _, lower, upper = self._combine(window_probs[i], weights[i])
+                    if lower > 0.5 or upper <= 0.5:
+                        undecided.discard(i)
+
+        for i in pending:
+            if i in failed:
+                results[i] = {"label": "Error", "probability": 0.0, "window_probabilities": []}
+                continue
+            ai_prob = self._combine(window_probs[i], weights[i])[0]
+            results[i] = {
+                "label": "AI-generated" if ai_prob > 0.5 else "Human-written",
+                "probability": ai_prob,
+                "window_probabilities": window_probs[i],
+            }
+        return results
+
+    def detect_batch(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """Detect AI-generated text for many inputs with one forward pass per length bucket"""
+        return [(result["label"], result["probability"]) for result in self.detect_detailed(texts)]
+
+    def detect_text(self, text: str) -> Tuple[str, float]:
+        """Detect if text is AI-generated with modified empty text handling"""
+        return self.detect_batch([text])[0]
 
     def analyze_responses(self, responses: Dict[str, str]) -> Dict[str, Dict]:
         """Analyze multiple responses with proper empty text handling"""
+        texts = list(responses.values())
+        detections = self.batcher.submit(texts) if self.batcher else self.detect_detailed(texts)
+
         results = {}
-        for response_id, text in responses.items():
-            label, prob = self.detect_text(text)
+        for response_id, detection in zip(responses, detections):
+            label, prob = detection["label"], detection["probability"]
             human_prob = 0.0 if label in ["Empty", "TooShort", "Error"] else (1 - prob)
             
             results[response_id] = {
@@ -61,5 +243,71 @@ class AIDetector:
                 "human_probability":f"{round(human_prob * 100, 1)}"
 
             }
+            if self.mode == "chunked":
+                results[response_id]["window_probabilities"] = [
+                    None if p is None else round(p * 100, 1)
+                    for p in detection["window_probabilities"]
+                ]
             logger.info(f"Analyzed response {response_id}: {results[response_id]}")
-        return results
\ No newline at end of file
+        return results
+
+
+class MicroBatcher:
+    """Merges detection calls from concurrent requests into shared batches.
+
+    The first call to arrive opens a window of `window` seconds; everything
+    submitted before it closes (or until `max_items` texts are collected) is
+    run through `detect_fn` together and split back per caller.
+    """
+
+    def __init__(self, detect_fn, window: float = MICRO_BATCH_WINDOW, max_items: int = MAX_BATCH_SIZE * 4):
+        self.detect_fn = detect_fn
+        self.window = window
+        self.max_items = max_items
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        # Started on first use so the thread exists in the serving process, not a pre-fork parent
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="ai-micro-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, texts: List[str]) -> List[Tuple[str, float]]:
+        if not texts:
+            return []
+        self._ensure_started()
+        future = Future()
+        self._queue.put((texts, future))
+        return future.result()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            count = len(batch[0][0])
+            deadline = time.monotonic() + self.window
+            while count < self.max_items:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                count += len(item[0])
+
+            texts = [text for item_texts, _ in batch for text in item_texts]
+            try:
+                detections = self.detect_fn(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for item_texts, future in batch:
+                future.set_result(detections[offset:offset + len(item_texts)])
+                offset += len(item_texts)
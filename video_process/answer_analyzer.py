@@ -1,40 +1,29 @@
 from typing import Dict, Any
-import statistics
+
+from video_process import scoring
+from video_process.scoring import trait_matrix
 
 class AnswerAnalyzer:
     @staticmethod
-    def calculate_final_score(evaluation_data: Dict[str, Any], ai_detection_results: Dict[str, Any]) -> Dict[str, Any]:
+    def calculate_final_score(evaluation_data: Dict[str, Any], ai_detection_results: Dict[str, Any],
+                              rubric: scoring.Rubric = None) -> Dict[str, Any]:
+        """Final score for one candidate from numeric scores (0-100), rounded for the response.
 
-        # Calculate average content score
-        question_scores = [
-            float(result["score"].strip('%')) 
-            for result in evaluation_data["question_results"].values()
-        ]
-        avg_content_score = statistics.mean(question_scores)
-        
-        # Calculate behavioral scores
-        eye_score = float(evaluation_data["overall_eye_tracking_score"].strip('%'))
-        personality_scores = evaluation_data["personality_traits"]
-        
-        # Calculate AI suspicion impact (0-100, higher is more suspicious)
+        A one-candidate call of scoring.score_candidates; see scoring.py for the formula.
+        """
+        question_scores = [result["score"] for result in evaluation_data["question_results"].values()]
+        # AI suspicion impact (0-100, higher is more suspicious)
         ai_suspicion = ai_detection_results["overall_suspicion_score"]
-        
-        # Calculate final score with AI suspicion penalty
-        base_score = (
-            0.5 * avg_content_score + 
-            0.2 * eye_score + 
-            0.3 * (sum(personality_scores.values()) / len(personality_scores) * 100
-        )
+
+        scores = scoring.score_candidates(
+            trait_matrix([evaluation_data["personality_traits"]]), [question_scores],
+            [evaluation_data["overall_eye_tracking_score"]], [ai_suspicion], rubric=rubric
         )
-        # Apply penalty based on AI suspicion (up to 30% reduction)
-        final_score = max(0, base_score * (1 - (ai_suspicion / 100 * 0.3)))
-        
         return {
-            "content_score": round(avg_content_score, 1),
-            "eye_contact_score": round(eye_score, 1),
-            "personality_score": round((sum(personality_scores.values()) / len(personality_scores)) * 100, 1),
+            "content_score": round(float(scores["content_score"][0]), 1),
+            "eye_contact_score": round(float(scores["eye_contact_score"][0]), 1),
+            "personality_score": round(float(scores["personality_score"][0]), 1),
             "ai_suspicion_score": ai_suspicion,
-            "base_score": round(base_score, 1),
-            "final_score": round(final_score, 1),
-        
-        }
\ No newline at end of file
+            "base_score": round(float(scores["base_score"][0]), 1),
+            "final_score": round(float(scores["final_score"][0]), 1),
+        }
@@ -0,0 +1,214 @@
+"""Re-score stored interviews offline.
+
+Usage: python -m video_process.batch manifest.jsonl --output results.jsonl [--workers N]
+           [--mapping mapping.json] [--role software_engineer] [--timeline]
+
+Each manifest line describes one interview:
+
+    {"id": "cand-001", "videos": {"video_one": "a.mp4", ...}, "mapping": {...}, "applied_role": "it_intern"}
+
+`videos` may also be a list of five paths in question order; relative paths
+are resolved against the manifest's directory. `--mapping` replaces every
+line's mapping (e.g. after a rubric change) and `--role` fills in a missing
+applied_role. `--timeline` adds each video's gaze timeline to the results.
+
+Interviews are spread over a process pool, one interview per worker at a time.
+Results are appended to the output as JSON lines as soon as each finishes, so
+the output doubles as the checkpoint: rerunning the same command skips every
+interview already recorded as "ok" and retries the failed ones. With
+CACHE_BACKEND=disk, transcripts and eye-tracking scores from earlier runs are
+reused, so re-scoring mostly pays for keyword matching and AI detection.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from video_process import metrics
+from video_process.evaluation import STAGES, VIDEO_KEYS, evaluate_videos
+from video_process.pipeline import PipelineScheduler
+
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", os.cpu_count() or 1))
+MAX_IN_FLIGHT_PER_WORKER = 2  # Interviews queued per worker, so huge manifests are not all submitted at once
+# Stages timed per interview; media_decode is the shared decode (see media.py), which neither stage's time includes
+REPORT_STAGES = STAGES + ["media_decode"]
+
+
+_worker_state = {}
+
+def _init_worker():
+    """Per-process pipeline and detector, created once and reused for every interview"""
+    from video_process.ai_detection import AIDetector
+    _worker_state["pipeline"] = PipelineScheduler(workers=1)
+    _worker_state["ai_detector"] = AIDetector(micro_batch_window=0)  # One caller per process, nothing to merge
+
+
+def evaluate_record(record):
+    """Evaluate one manifest record and return its output line"""
+    if not _worker_state:
+        _init_worker()
+    start = time.perf_counter()
+    metrics.start_trace()  # Stage times as the stages record them, wherever they ran
+    try:
+        result = evaluate_videos(
+            record["videos"], record["mapping"], record["applied_role"],
+            _worker_state["pipeline"], _worker_state["ai_detector"],
+            include_timeline=record.get("include_timeline", False)
+        )
+    except Exception as e:
+        metrics.end_trace()
+        return {
+            "id": record["id"],
+            "status": "error",
+            "error": str(e),
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+    trace = metrics.end_trace() or {}  # Empty with METRICS_ENABLED=0
+    return {
+        "id": record["id"],
+        "status": "ok",
+        "result": result,
+        "stage_seconds": {stage: round(trace.get(stage, 0.0), 3) for stage in REPORT_STAGES},
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def read_manifest(path, mapping=None, role=None, include_timeline=False):
+    """Yield normalized records from a JSONL manifest"""
+    base_dir = os.path.dirname(os.path.abspath(path))
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            videos = entry.get("videos", {})
+            if isinstance(videos, list):
+                videos = dict(zip(VIDEO_KEYS, videos))
+            yield {
+                "id": str(entry.get("id", line_number)),
+                "videos": {key: os.path.join(base_dir, video) for key, video in videos.items()},
+                "mapping": mapping if mapping is not None else entry.get("mapping", {}),
+                "applied_role": entry.get("applied_role", role),
+                "include_timeline": include_timeline,
+            }
+
+
+def completed_ids(output_path):
+    """Ids already recorded as "ok" in an earlier, possibly interrupted, run"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Line cut off by the interruption
+            if entry.get("status") == "ok":
+                done.add(entry["id"])
+    return done
+
+
+def _open_output(output_path):
+    output = open(output_path, "a+")
+    output.seek(0, os.SEEK_END)
+    if output.tell():
+        output.seek(output.tell() - 1)
+        if output.read(1) != "\n":
+            output.write("\n")  # Terminate a line cut off by an interruption
+    return output
+
+
+def run_batch(records, output_path, workers=BATCH_WORKERS):
+    """Evaluate records not yet completed in `output_path`, appending results; returns the summary"""
+    done = completed_ids(output_path)
+    stats = {"ok": 0, "error": 0, "skipped": 0, "stage_seconds": {stage: 0.0 for stage in REPORT_STAGES}}
+    start = time.perf_counter()
+
+    def record_result(output, entry):
+        output.write(json.dumps(entry) + "\n")
+        output.flush()
+        stats[entry["status"]] += 1
+        for stage, seconds in entry.get("stage_seconds", {}).items():
+            stats["stage_seconds"][stage] += seconds
+        print(f"[{entry['status']}] {entry['id']} ({entry['seconds']:.1f}s)"
+              + (f": {entry['error']}" if entry["status"] == "error" else ""), file=sys.stderr)
+
+    def pending():
+        for record in records:
+            if record["id"] in done:
+                stats["skipped"] += 1
+                continue
+            yield record
+
+    interrupted = False
+    with _open_output(output_path) as output:
+        if workers <= 1:
+            try:
+                for record in pending():
+                    record_result(output, evaluate_record(record))
+            except KeyboardInterrupt:
+                interrupted = True
+        else:
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+            in_flight = set()
+            try:
+                for record in pending():
+                    if len(in_flight) >= workers * MAX_IN_FLIGHT_PER_WORKER:
+                        finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            record_result(output, future.result())
+                    in_flight.add(pool.submit(evaluate_record, record))
+                for future in wait(in_flight).done:
+                    record_result(output, future.result())
+                pool.shutdown()
+            except KeyboardInterrupt:
+                interrupted = True
+                pool.shutdown(wait=False, cancel_futures=True)
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["interrupted"] = interrupted
+    return stats
+
+
+def print_report(stats):
+    evaluated = stats["ok"] + stats["error"]
+    hours = stats["seconds"] / 3600
+    print(f"\n{evaluated} interviews evaluated ({stats['ok']} ok, {stats['error']} failed, "
+          f"{stats['skipped']} already done) in {stats['seconds']:.1f}s"
+          + (" (interrupted; rerun to resume)" if stats["interrupted"] else ""))
+    if evaluated and hours:
+        print(f"Throughput: {evaluated / hours:.1f} interviews/hour")
+    if stats["ok"]:
+        total = sum(stats["stage_seconds"].values()) or 1
+        print(f"{'stage':<15} {'total s':>9} {'per interview':>14} {'share':>6}")
+        for stage, seconds in stats["stage_seconds"].items():
+            print(f"{stage:<15} {seconds:>9.1f} {seconds / stats['ok']:>13.2f}s {seconds / total:>6.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch interview evaluation")
+    parser.add_argument("manifest", help="JSONL file, one interview per line")
+    parser.add_argument("--output", required=True, help="JSONL results file; also the resume checkpoint")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="worker processes (1 runs inline)")
+    parser.add_argument("--mapping", help="JSON mapping file applied to every interview")
+    parser.add_argument("--role", help="applied_role for lines that do not set one")
+    parser.add_argument("--timeline", action="store_true", help="include gaze timelines in the results")
+    args = parser.parse_args()
+
+    mapping = None
+    if args.mapping:
+        with open(args.mapping) as f:
+            mapping = json.load(f)
+
+    stats = run_batch(read_manifest(args.manifest, mapping, args.role, args.timeline), args.output, args.workers)
+    print_report(stats)
+    if stats["interrupted"]:
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
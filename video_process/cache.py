@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Result cache for per-video stage outputs, keyed by the hash of the video bytes
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory")  # "memory", "disk" or "none"
+CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", 256 * 1024 * 1024))
+CACHE_PATH = os.environ.get("CACHE_PATH", "cache.sqlite3")
+
+# Bump a stage's version whenever its output for the same video can change
+STAGE_VERSIONS = {
+    "transcript": 1,
+    "eye_tracking": 5,  # 2: full result dict instead of the bare score; 3: adds the gaze timeline;
+                        # 4: stability windows scaled by the sampling step; 5: budgeted intervals with
+                        # the finite-population correction
+    "traits": 1,
+    "ai_detection": 2,  # 2: keyed by transcript text instead of video content
+}
+
+
+def content_hash(file_path, block_size=1024 * 1024):
+    """SHA-256 of a file's bytes, read in blocks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def text_hash(text):
+    """SHA-256 of a string's UTF-8 bytes"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def stage_key(stage, digest, params=""):
+    """Cache key for one stage of one video; `params` captures config that changes the output"""
+    return f"{stage}:v{STAGE_VERSIONS[stage]}:{digest}:{params}"
+
+
+class _Counters:
+    """Hit/miss counts per stage (the part of the key before the first colon)"""
+
+    def __init__(self):
+        self.hits = {}
+        self.misses = {}
+        self._counter_lock = threading.Lock()
+
+    def _count(self, key, hit):
+        stage = key.split(":", 1)[0]
+        counts = self.hits if hit else self.misses
+        with self._counter_lock:
+            counts[stage] = counts.get(stage, 0) + 1
+
+    def counters(self):
+        with self._counter_lock:
+            return {"hits": dict(self.hits), "misses": dict(self.misses)}
+
+    def metric_series(self):
+        """Lookups as ({"stage", "result"}, count) pairs for the metrics endpoint"""
+        counts = self.counters()
+        return [
+            ({"stage": stage, "result": result}, count)
+            for result, key in (("hit", "hits"), ("miss", "misses"))
+            for stage, count in sorted(counts[key].items())
+        ]
+
+
+class NullCache(_Counters):
+    """Caching disabled; every lookup is a miss"""
+
+    def get(self, key):
+        self._count(key, False)
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def stats(self):
+        return {"backend": "none", **self.counters()}
+
+
+class MemoryCache(_Counters):
+    """In-process LRU cache bounded by the JSON size of the stored values"""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()  # key -> (serialized value, size)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        self._count(key, entry is not None)
+        return json.loads(entry[0]) if entry is not None else None
+
+    def set(self, key, value):
+        data = json.dumps(value)
+        size = len(data)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self._entries[key] = (data, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+
+    def stats(self):
+        with self._lock:
+            entries, size = len(self._entries), self.size
+        return {"backend": "memory", "entries": entries, "bytes": size, **self.counters()}
+
+
+class DiskCache(_Counters):
+    """SQLite-backed LRU cache that survives restarts and is shared by worker processes"""
+
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_BYTES):
+        super().__init__()
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT, size INTEGER, accessed_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:  # Commits on success, rolls back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        self._count(key, row is not None)
+        return json.loads(row[0]) if row is not None else None
+
+    def set(self, key, value):
+        data = json.dumps(value)
+        if len(data) > self.max_bytes:
+            return
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                (key, data, len(data), time.time()),
+            )
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            while total > self.max_bytes:
+                oldest = conn.execute(
+                    "SELECT key, size FROM entries ORDER BY accessed_at LIMIT 1"
+                ).fetchone()
+                conn.execute("DELETE FROM entries WHERE key = ?", (oldest[0],))
+                total -= oldest[1]
+
+    def stats(self):
+        with self._lock, self._connect() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"backend": "disk", "entries": entries, "bytes": size, **self.counters()}
+
+
+def create_cache(kind=CACHE_BACKEND):
+    if kind == "memory":
+        return MemoryCache()
+    if kind == "disk":
+        return DiskCache()
+    if kind == "none":
+        return NullCache()
+    raise ValueError(f"Unknown cache backend: {kind}")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide result cache for CACHE_BACKEND"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = create_cache()
+        return _cache
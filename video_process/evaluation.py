@@ -0,0 +1,219 @@
+from video_process import metrics
+from video_process.video_utils import evaluate_answer
+from video_process.personality import average_traits, score_roles
+from video_process.answer_analyzer import AnswerAnalyzer
+from video_process.cache import stage_key, text_hash
+from video_process.gaze_timeline import GazeTimeline
+
+VIDEO_KEYS = ['video_one', 'video_two', 'video_three', 'video_four', 'video_five']
+QUESTION_KEYS = ['question_one', 'question_two', 'question_three', 'question_four', 'question_five']
+
+# Stages reported through the progress callback, in pipeline order
+STAGES = ["transcription", "eye_tracking", "ai_detection", "scoring"]
+
+
+class EvaluationError(Exception):
+    """Invalid evaluation input, reported to the client with `status_code`"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def validate_inputs(mapping, video_names):
+    """Check that every question has a video and well-formed keywords, in question order"""
+    for v_key in VIDEO_KEYS:
+        if v_key not in video_names:
+            raise EvaluationError(f"Missing video: {v_key}")
+    validate_mapping(mapping)
+
+
+def validate_mapping(mapping):
+    """Check that every question has well-formed keywords, in question order"""
+    for q_key in QUESTION_KEYS:
+        if q_key not in mapping:
+            raise EvaluationError(f"Missing mapping for: {q_key}")
+
+        keywords = mapping[q_key].get('keywords', [])
+        if not keywords:
+            raise EvaluationError(f"No keywords provided for {q_key}")
+        if not isinstance(keywords, list):
+            raise EvaluationError(f"Keywords for {q_key} must be a list")
+        for entry in keywords:
+            # A phrase, or a list of synonymous phrases
+            phrases = [entry] if isinstance(entry, str) else entry
+            if not isinstance(phrases, list) or not phrases or not all(
+                isinstance(phrase, str) and phrase.strip() for phrase in phrases
+            ):
+                raise EvaluationError(f"Invalid keyword for {q_key}: {entry!r}")
+
+
+def analyze_responses_cached(ai_detector, transcriptions, cache, cacheable=None):
+    """AI detection for every answer, running the model only for transcripts not in the cache.
+
+    Results are cached by the transcript text, and only for the questions in
+    `cacheable` (all by default) with a non-empty transcript, so a failed or
+    cut-short transcription never pins its verdict to the video.
+    """
+    cacheable = set(transcriptions if cacheable is None else cacheable)
+    keys = {
+        q_key: stage_key("ai_detection", text_hash(text), ai_detector.config_key)
+        for q_key, text in transcriptions.items() if q_key in cacheable and text.strip()
+    }
+    cached = {q_key: cache.get(key) for q_key, key in keys.items()}
+    missing = {q_key: text for q_key, text in transcriptions.items() if cached.get(q_key) is None}
+
+    detected = ai_detector.analyze_responses(missing) if missing else {}
+    for q_key, result in detected.items():
+        if q_key in keys and result["detection"] != "Error":
+            cache.set(keys[q_key], result)
+    return {q_key: cached.get(q_key) or detected[q_key] for q_key in transcriptions}
+
+
+def evaluate_videos(videos, mapping, applied_role, pipeline, ai_detector, progress=None, include_timeline=False):
+    """Validate and evaluate an interview whose videos are already on disk.
+
+    `videos` maps video keys (video_one ... video_five) to file paths. Raises
+    EvaluationError for invalid input; otherwise returns the same body as
+    evaluate_interview.
+    """
+    if not applied_role:
+        raise EvaluationError("Missing applied_role")
+    validate_inputs(mapping, videos)
+    questions = [(q_key, videos[v_key]) for v_key, q_key in zip(VIDEO_KEYS, QUESTION_KEYS)]
+    return evaluate_interview(questions, mapping, applied_role, pipeline, ai_detector, progress=progress,
+                              include_timeline=include_timeline)
+
+
+def evaluate_interview(questions, mapping, applied_role, pipeline, ai_detector, progress=None, handles=None,
+                       include_timeline=False):
+    """Run the full evaluation for saved videos and build the response body.
+
+    `questions` is a list of (question_key, video_path) tuples in question
+    order. `progress`, if given, is called as progress(stage, done, total).
+    `handles` are pipeline handles already submitted for these questions (e.g.
+    while the upload was still streaming); without them the pipeline is run here.
+    `include_timeline` adds each video's gaze timeline and its summary to
+    eye_track_per_question.
+    """
+    results = {}
+    personality_traits_list = []
+    eye_tracking_scores = []
+    eye_tracking_results = []
+    transcriptions = {}
+    complete_transcripts = []
+
+    # Transcription, Big Five traits and eye tracking for every video, run concurrently
+    outputs = pipeline.collect(handles) if handles is not None else pipeline.run(questions, progress=progress)
+    for output in outputs:
+        q_key = output["question"]
+        transcription = output["transcription"]
+
+        # Step 1: Transcribe & evaluate
+        evaluation_result = evaluate_answer(transcription, mapping[q_key]['keywords'])
+        evaluation_result["transcription"] = transcription  # Store raw transcription
+        evaluation_result["word_timestamps"] = output["words"]
+        if output["degraded"]:  # Analyzed within the resource limits rather than in full
+            evaluation_result["degraded"] = output["degraded"]
+        if output["frame_analyses"]:  # Analyzers registered with media.register_frame_consumer
+            evaluation_result["frame_analyses"] = output["frame_analyses"]
+        results[q_key] = evaluation_result
+        transcriptions[q_key] = transcription  # Store for AI detection
+        if output["transcript_complete"]:
+            complete_transcripts.append(q_key)
+
+        # Step 2: Simulate Big Five traits
+        personality_traits_list.append(output["traits"])
+
+        # Step 3: Eye tracking
+        eye_tracking_scores.append(output["eye_score"])
+        eye_tracking_results.append(output["eye_tracking"])
+
+    question_keys = [q_key for q_key, _ in questions]
+
+    # Average traits and calculate role suitability
+    avg_traits = average_traits(personality_traits_list)
+    career_scores = score_roles(avg_traits)
+
+    # Calculate eye tracking metrics
+    eye_track_per_question = []
+    for q_key, eye_result in zip(question_keys, eye_tracking_results):
+        entry = {"question": q_key, "score": f"{eye_result['score']:.0f}%"}
+        if "confidence_interval" in eye_result:  # Budgeted sampling reports its uncertainty
+            low, high = eye_result["confidence_interval"]
+            entry["confidence_interval"] = f"{low:.0f}-{high:.0f}%"
+            entry["frames_analyzed"] = eye_result["frames_analyzed"]
+        if include_timeline and "timeline" in eye_result:
+            entry["timeline"] = eye_result["timeline"]
+            entry["gaze_summary"] = GazeTimeline.from_dict(eye_result["timeline"]).summary()
+        eye_track_per_question.append(entry)
+    avg_eye_tracking_score = round(sum(eye_tracking_scores) / len(eye_tracking_scores), 2)
+    with metrics.timer("ai_detection"):
+        ai_results = analyze_responses_cached(ai_detector, transcriptions, pipeline.cache, complete_transcripts)
+    if progress:
+        progress("ai_detection", 1, 1)
+
+    # Calculate suspicion score
+    suspicion_factors = {
+        "perfect_answers": all(result["score"] == 100 for result in results.values()),
+        "role_mismatch": (
+            applied_role != "software_engineer" and
+            max(career_scores.values()) - career_scores.get(applied_role, 0) > 20
+        ),
+        "low_eye_contact": avg_eye_tracking_score < 30,
+        "unnatural_traits": (
+            avg_traits.get("Neuroticism", 0) < 0.2 and
+            avg_traits.get("Conscientiousness", 0) > 0.9 and
+            avg_traits.get("Agreeableness", 0) > 0.9
+        )
+    }
+    suspicion_score = sum(1 for factor in suspicion_factors.values() if factor) * 25
+    ai_answer_ratio = sum(1 for result in ai_results.values() if result["detection"] == "AI-generated") / len(ai_results) * 100
+    overall_suspicion = min(100, (suspicion_score + ai_answer_ratio) / 2)
+
+    # Final answer calculation
+    evaluation_data = {
+        "question_results": results,
+        "career_scores": career_scores,
+        "eye_track_per_question": eye_track_per_question,
+        "overall_eye_tracking_score": avg_eye_tracking_score,
+        "personality_traits": avg_traits
+    }
+
+    # ai_detection_results dictionary creation:
+    ai_detection_results = {
+        "answer_analysis": ai_results,
+        "suspicion_factors": suspicion_factors,
+        "behavioral_suspicion_score": suspicion_score,
+        "ai_answer_ratio": round(ai_answer_ratio, 1),
+        "overall_suspicion_score": round(overall_suspicion, 1),
+        "is_suspicious": overall_suspicion >= 50,
+        "applied_role": applied_role
+    }
+
+    with metrics.timer("scoring"):
+        final_score = AnswerAnalyzer.calculate_final_score(evaluation_data, ai_detection_results)
+    if progress:
+        progress("scoring", 1, 1)
+
+    # Final result, with scores formatted for the response
+    return {
+        "success": True,
+        "degraded": any("degraded" in result for result in results.values()),
+        "question_results": {q_key: {**result, "score": f"{result['score']}%"} for q_key, result in results.items()},
+        "career_scores": career_scores,
+        "eye_track_per_question": eye_track_per_question,
+        "personality_traits": avg_traits,
+        "overall_eye_tracking_score": f"{avg_eye_tracking_score:.2f}%",
+        "ai_detection_results": {
+            "answer_analysis": ai_results,
+            "suspicion_factors": suspicion_factors,
+            "behavioral_suspicion_score": f"{suspicion_score:.0f}%",
+            "ai_answer_ratio": f"{round(ai_answer_ratio, 1):.0f}%",
+            "overall_suspicion_score": f"{round(overall_suspicion, 1):.0f}%",
+            "is_suspicious": overall_suspicion >= 50,
+            "applied_role": applied_role
+        },
+        "final_evaluation": final_score
+    }
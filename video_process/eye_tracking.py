@@ -1,24 +1,82 @@
-import cv2
 import numpy as np
-import mediapipe as mp
 from collections import deque
+import os
+import queue
+import threading
 import time
 
+from video_process import limits, metrics
+from video_process.gaze_timeline import EYE_CONTACT, LOOKING_AWAY, NO_FACE, GazeTimeline
+
 # Configuration parameters
 MAX_HEAD_ANGLE = 20  # Increased from 15 for more flexibility
 MIN_EYE_OPENNESS = 0.25  # Adjusted eye openness threshold
 GAZE_SMOOTHING_WINDOW = 5  # Number of frames for smoothing gaze direction
-EYE_AR_CONSEC_FRAMES = 3  # Number of consecutive frames for stable eye state
+EYE_AR_CONSEC_FRAMES = 3  # Number of consecutive frames for stable eye state (at every frame; see EyeTracker.reset)
 GAZE_CONSEC_FRAMES = 5  # Number of consecutive frames for stable gaze direction
 
-# Face Mesh setup
-mp_face_mesh = mp.solutions.face_mesh
-mp_drawing = mp.solutions.drawing_utils
+# Frame sampling
+SAMPLING_MODES = ("full", "fps", "nth", "adaptive", "budgeted")
+EYE_SAMPLING_MODE = os.environ.get("EYE_SAMPLING_MODE", "full")  # Default sampling mode for simulate_eye_tracking_score
+EYE_TARGET_FPS = 10  # Frames analyzed per second of video in "fps" mode
+EYE_EVERY_N = 3  # Analyze every Nth frame in "nth" mode
+ADAPTIVE_MAX_STEP = 8  # Largest skip while gaze stays stable in "adaptive" mode
+
+# "budgeted" mode: stratified random frames until the eye-contact ratio is known well enough
+EYE_BUDGET_TOLERANCE = float(os.environ.get("EYE_BUDGET_TOLERANCE", 0.05))  # Stop once the interval is within +/- this
+EYE_BUDGET_MAX_FRAMES = int(os.environ.get("EYE_BUDGET_MAX_FRAMES", 240))  # Frames analyzed per video at most
+EYE_BUDGET_SECONDS = float(os.environ.get("EYE_BUDGET_SECONDS", 20))  # Wall time per video at most
+EYE_BUDGET_INITIAL_STRATA = 16  # Frames in the first round; each later round doubles the strata
+EYE_CONFIDENCE_Z = 1.96  # 95% confidence interval
+EYE_MAX_DESIGN_GAIN = 4  # Stratification is credited with at most 4x the precision of simple random sampling
+EYE_SAMPLE_SEED = 0  # Fixed, so a video always gets the same frames
+EYE_SEEK_GAP = 60  # Jumps longer than this many frames seek instead of decoding the frames in between
+
+# Frame decoding
+EYE_PREFETCH_FRAMES = int(os.environ.get("EYE_PREFETCH_FRAMES", 4))  # Frames decoded ahead of inference; 0 decodes inline
+EYE_DECODE_ACCELERATION = os.environ.get("EYE_DECODE_ACCELERATION", "any")  # "any" uses a hardware decoder if present, "none" forces software
+
+# OpenCV and Face Mesh are imported on first use (see load_libraries) to keep worker startup fast
+cv2 = None
+mp_face_mesh = None
+mp_drawing = None
+_import_lock = threading.Lock()
+
+def load_opencv():
+    """Import OpenCV once, thread-safely (enough for the landmark geometry)"""
+    global cv2
+    if cv2 is not None:
+        return
+    with _import_lock:
+        if cv2 is None:
+            import cv2 as _cv2
+            cv2 = _cv2
+
+def load_libraries():
+    """Import OpenCV and MediaPipe once, thread-safely"""
+    global mp_face_mesh, mp_drawing
+    load_opencv()
+    if mp_face_mesh is not None:
+        return
+    with _import_lock:
+        if mp_face_mesh is None:
+            import mediapipe as mp
+            mp_drawing = mp.solutions.drawing_utils
+            mp_face_mesh = mp.solutions.face_mesh
 
 # Eye landmarks (using more points for better accuracy)
 LEFT_EYE_INDICES = [362, 382, 381, 380, 374, 373, 390, 249, 263, 466, 388, 387, 386, 385, 384, 398]
 RIGHT_EYE_INDICES = [33, 7, 163, 144, 145, 153, 154, 155, 133, 173, 157, 158, 159, 160, 161, 246]
 
+# Precomputed index arrays into the (NUM_LANDMARKS, 2) landmark buffer
+NUM_LANDMARKS = 478  # Face Mesh with refine_landmarks=True
+EAR_POINTS = [0, 8, 12, 4, 11, 5]  # Positions in each eye list: horizontal pair, then two vertical pairs
+EAR_INDICES = np.array([
+    [LEFT_EYE_INDICES[i] for i in EAR_POINTS],
+    [RIGHT_EYE_INDICES[i] for i in EAR_POINTS],
+])  # (2 eyes, 6 points)
+POSE_INDICES = np.array([1, 152, 263, 33, 287, 57])  # Nose tip, chin, eye corners, mouth corners
+
 # 3D model points for head pose estimation
 model_points = np.array([
     (0.0, 0.0, 0.0),         # Nose tip
@@ -29,8 +87,57 @@ model_points = np.array([
     (150.0, -150.0, -125.0)   # Right mouth corner
 ])
 
+def eye_aspect_ratios(landmarks):
+    """EAR of both eyes for landmark arrays shaped (..., NUM_LANDMARKS, 2) -> (..., 2)"""
+    points = landmarks[..., EAR_INDICES, :].astype(np.float64)  # (..., 2, 6, 2)
+    distances = np.sqrt(np.square(points[..., 1::2, :] - points[..., 0::2, :]).sum(axis=-1))  # (..., 2, 3)
+    horiz_dist = distances[..., 0]
+    avg_vert_dist = (distances[..., 1] + distances[..., 2]) / 2
+    # Avoid division by zero
+    safe = np.where(horiz_dist == 0, 1, horiz_dist)
+    return np.where(horiz_dist == 0, 0.0, avg_vert_dist / safe)
+
+def rotation_angles(rotation_vectors):
+    """(N, 3) Rodrigues vectors -> (N, 3) pitch, yaw, roll in degrees, as cv2.RQDecomp3x3 reports them"""
+    # Rodrigues: R = I + sin(t) K + (1 - cos(t)) K^2
+    theta = np.linalg.norm(rotation_vectors, axis=1)
+    axis = rotation_vectors / np.where(theta == 0, 1, theta)[:, None]
+    kx, ky, kz = axis[:, 0], axis[:, 1], axis[:, 2]
+    zero = np.zeros_like(kx)
+    K = np.stack([
+        np.stack([zero, -kz, ky], axis=1),
+        np.stack([kz, zero, -kx], axis=1),
+        np.stack([-ky, kx, zero], axis=1),
+    ], axis=1)
+    sin, cos = np.sin(theta)[:, None, None], np.cos(theta)[:, None, None]
+    R = np.eye(3) + sin * K + (1 - cos) * (K @ K)
+
+    # Givens rotations about x, y and z, in the order RQDecomp3x3 applies them
+    eps = np.finfo(np.float64).eps
+    s, c = R[:, 2, 1], R[:, 2, 2]
+    z = 1 / np.sqrt(c * c + s * s + eps)
+    cx, sx = c * z, s * z
+    col1 = R[:, :, 1] * cx[:, None] - R[:, :, 2] * sx[:, None]
+    col2 = R[:, :, 1] * sx[:, None] + R[:, :, 2] * cx[:, None]
+
+    s, c = -R[:, 2, 0], col2[:, 2]
+    z = 1 / np.sqrt(c * c + s * s + eps)
+    cy, sy = c * z, s * z
+    col0 = R[:, :, 0] * cy[:, None] + col2 * sy[:, None]
+
+    s, c = col0[:, 1], col1[:, 1]
+    z = 1 / np.sqrt(c * c + s * s + eps)
+    cz, sz = c * z, s * z
+
+    return np.degrees(np.stack([
+        np.arccos(np.clip(cx, -1, 1)) * np.where(sx >= 0, 1, -1),
+        np.arccos(np.clip(cy, -1, 1)) * np.where(sy >= 0, 1, -1),
+        np.arccos(np.clip(cz, -1, 1)) * np.where(sz >= 0, 1, -1),
+    ], axis=1))
+
 class EyeTracker:
     def __init__(self):
+        load_opencv()
         self.size = (640, 480)
         self.focal_length = self.size[1]
         self.center = (self.size[1] / 2, self.size[0] / 2)
@@ -40,65 +147,136 @@ class EyeTracker:
             [0, 0, 1]
         ], dtype="double")
         self.dist_coeffs = np.zeros((4, 1))
+
+        # Reused every frame: landmark pixels and the gathered PnP image points
+        self.landmarks = np.zeros((NUM_LANDMARKS, 2), dtype=np.float32)
+        self.landmark_scale = np.array(self.size, dtype=np.float64)
+        self._landmark_scratch = np.zeros((NUM_LANDMARKS, 2), dtype=np.float64)  # Normalized, then scaled in place
+        self._landmark_slots = memoryview(self._landmark_scratch).cast("B").cast("d")  # x0, y0, x1, y1, ...
+        self.image_points = np.zeros((len(POSE_INDICES), 2), dtype=np.float32)
         
         # State tracking
         self.eye_state_history = deque(maxlen=EYE_AR_CONSEC_FRAMES)
         self.gaze_history = deque(maxlen=GAZE_CONSEC_FRAMES)
         self.last_eye_contact_time = time.time()
-        
-    def get_head_pose(self, landmarks):
-        try:
-            image_points = np.array([
-                landmarks[1],     # Nose tip
-                landmarks[152],   # Chin
-                landmarks[263],   # Left eye left corner
-                landmarks[33],    # Right eye right corner
-                landmarks[287],   # Left Mouth corner
-                landmarks[57]     # Right mouth corner
-            ], dtype="double")
-
-            success, rotation_vector, translation_vector = cv2.solvePnP(
-                model_points, image_points, self.camera_matrix, 
-                self.dist_coeffs, flags=cv2.SOLVEPNP_ITERATIVE
+        self.face_mesh_seconds = 0.0  # FaceMesh time since the last reset
+        self.face_found = False  # Whether the last analyzed frame had a face
+
+        # One long-lived graph per tracker, created with the first frame
+        self.face_mesh = None
+
+    def _get_face_mesh(self):
+        if self.face_mesh is None:
+            load_libraries()
+            self.face_mesh = mp_face_mesh.FaceMesh(
+                static_image_mode=False,
+                max_num_faces=1,
+                refine_landmarks=True,
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5
             )
+        return self.face_mesh
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self.face_mesh is not None:
+            self.face_mesh.close()
+            self.face_mesh = None
+
+    def reset(self, step=1):
+        """Clear per-video state so the tracker can be reused for the next clip.
 
-            if success:
+        `step` is the clip's sampling step: the stability windows hold
+        proportionally fewer analyzed frames, so they still span about the
+        same stretch of video. The Face Mesh graph is restarted too, so the new
+        clip's first frames are not tracked from the previous clip's landmarks.
+        """
+        if self.face_mesh is not None:
+            self.face_mesh.reset()
+        self.eye_state_history = deque(maxlen=max(1, round(EYE_AR_CONSEC_FRAMES / step)))
+        self.gaze_history = deque(maxlen=max(1, round(GAZE_CONSEC_FRAMES / step)))
+        self.last_eye_contact_time = time.time()
+        self.face_mesh_seconds = 0.0
+
+    def clear_history(self):
+        """Forget earlier frames, so the next frame is judged on its own"""
+        self.eye_state_history.clear()
+        self.gaze_history.clear()
+
+    def fill_landmarks(self, face_landmarks):
+        """Copy Face Mesh landmarks into the tracker's pixel buffer and return it"""
+        points = face_landmarks.landmark
+        count = min(len(points), NUM_LANDMARKS)
+        slots = self._landmark_slots
+        for i, lm in zip(range(0, 2 * count, 2), points):
+            slots[i] = lm.x
+            slots[i + 1] = lm.y
+        # Scaled in float64 before the float32 copy, so truncation lands on the same pixel as int(lm.x * width)
+        pixels = self._landmark_scratch[:count]
+        np.multiply(pixels, self.landmark_scale, out=pixels)
+        np.trunc(pixels, out=pixels)  # Whole pixels, as the detector thresholds expect
+        self.landmarks[:count] = pixels
+        return self.landmarks
+
+    def _solve_pnp(self, landmarks):
+        np.take(landmarks, POSE_INDICES, axis=0, out=self.image_points)
+        success, rotation_vector, _ = cv2.solvePnP(
+            model_points, self.image_points, self.camera_matrix,
+            self.dist_coeffs, flags=cv2.SOLVEPNP_ITERATIVE
+        )
+        return rotation_vector if success else None
+
+    def get_head_pose(self, landmarks):
+        try:
+            rotation_vector = self._solve_pnp(landmarks)
+            if rotation_vector is not None:
                 rmat, _ = cv2.Rodrigues(rotation_vector)
                 angles, _, _, _, _, _ = cv2.RQDecomp3x3(rmat)
                 return angles  # pitch, yaw, roll
         except:
             pass
         return [0, 0, 0]  # Return neutral angles if detection fails
-    
+
+    def head_poses(self, landmark_block):
+        """Pitch, yaw, roll for a (N, NUM_LANDMARKS, 2) block -> (N, 3); failed frames are zeros"""
+        rotation_vectors = np.zeros((len(landmark_block), 3))
+        solved = np.zeros(len(landmark_block), dtype=bool)
+        for i, landmarks in enumerate(landmark_block):
+            try:
+                rotation_vector = self._solve_pnp(landmarks)
+            except cv2.error:
+                rotation_vector = None
+            if rotation_vector is not None:
+                rotation_vectors[i] = rotation_vector.ravel()
+                solved[i] = True
+        angles = rotation_angles(rotation_vectors)
+        angles[~solved] = 0
+        return angles
+
+    def analyze_landmarks_batch(self, landmark_block):
+        """EAR (N, 2: left, right) and head pose (N, 3: pitch, yaw, roll) for a block of frames"""
+        landmark_block = np.asarray(landmark_block, dtype=np.float32)
+        return {
+            "ear": eye_aspect_ratios(landmark_block),
+            "angles": self.head_poses(landmark_block),
+        }
+
     def calculate_eye_aspect_ratio(self, eye_landmarks):
-        # Horizontal eye landmarks
-        p1 = eye_landmarks[0]
-        p2 = eye_landmarks[8]
-        
-        # Vertical eye landmarks (top and bottom)
-        p3 = eye_landmarks[12]
-        p4 = eye_landmarks[4]
-        p5 = eye_landmarks[11]
-        p6 = eye_landmarks[5]
-        
-        # Calculate distances
-        horiz_dist = np.linalg.norm(p2 - p1)
-        vert_dist1 = np.linalg.norm(p4 - p3)
-        vert_dist2 = np.linalg.norm(p6 - p5)
-        
-        # Use average of vertical distances
-        avg_vert_dist = (vert_dist1 + vert_dist2) / 2
-        
-        # Avoid division by zero
-        if horiz_dist == 0:
+        """EAR of one eye from its 16 landmarks (ordered as LEFT/RIGHT_EYE_INDICES)"""
+        points = np.asarray(eye_landmarks, dtype=np.float64)[EAR_POINTS]
+        distances = np.sqrt(np.square(points[1::2] - points[0::2]).sum(axis=-1))
+        if distances[0] == 0:
             return 0.0
-            
-        ear = avg_vert_dist / horiz_dist
-        return ear
-    
+        return (distances[1] + distances[2]) / 2 / distances[0]
+
     def get_eye_landmarks(self, landmarks, indices):
-        return np.array([landmarks[i] for i in indices], dtype="double")
-    
+        return np.take(np.asarray(landmarks, dtype=np.float64), indices, axis=0)
+
     def is_looking_at_camera(self, pitch, yaw, roll):
         # More flexible thresholds for natural head movements
         return (abs(yaw) < MAX_HEAD_ANGLE and 
@@ -108,82 +286,513 @@ class EyeTracker:
     def analyze_frame(self, frame):
         frame = cv2.resize(frame, self.size)
         rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        return self.analyze_rgb_frame(rgb_frame)
+
+    def analyze_rgb_frame(self, rgb_frame):
+        """analyze_frame for a frame already resized to self.size and converted to RGB"""
+        face_mesh = self._get_face_mesh()
+        start = time.perf_counter()
+        results = face_mesh.process(rgb_frame)
+        self.face_mesh_seconds += time.perf_counter() - start
         
-        with mp_face_mesh.FaceMesh(
-            static_image_mode=False,
-            max_num_faces=1,
-            refine_landmarks=True,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        ) as face_mesh:
-            results = face_mesh.process(rgb_frame)
+        self.face_found = bool(results.multi_face_landmarks)
+        if results.multi_face_landmarks:
+            landmarks = self.fill_landmarks(results.multi_face_landmarks[0])
             
-            if results.multi_face_landmarks:
-                face_landmarks = results.multi_face_landmarks[0]
-                landmarks = [(int(lm.x * self.size[0]), int(lm.y * self.size[1])) 
-                            for lm in face_landmarks.landmark]
-                
-                # Get head pose
-                pitch, yaw, roll = self.get_head_pose(landmarks)
-                
-                # Get eye landmarks and calculate EAR
-                left_eye = self.get_eye_landmarks(landmarks, LEFT_EYE_INDICES)
-                right_eye = self.get_eye_landmarks(landmarks, RIGHT_EYE_INDICES)
-                left_ear = self.calculate_eye_aspect_ratio(left_eye)
-                right_ear = self.calculate_eye_aspect_ratio(right_eye)
-                
-                # Determine eye state
-                eyes_open = (left_ear > MIN_EYE_OPENNESS and 
-                           right_ear > MIN_EYE_OPENNESS)
-                self.eye_state_history.append(eyes_open)
-                
-                # Stable eye state (open/closed) over several frames
-                stable_eyes_open = (sum(self.eye_state_history) == 
-                                  len(self.eye_state_history))
-                
-                # Gaze direction
-                looking_at_camera = self.is_looking_at_camera(pitch, yaw, roll)
-                self.gaze_history.append(looking_at_camera)
-                
-                # Stable gaze direction over several frames
-                stable_gaze = (sum(self.gaze_history) == 
-                             len(self.gaze_history))
-                
-                # Eye contact requires stable eyes open and stable gaze
-                eye_contact = stable_eyes_open and stable_gaze
-                
-                # Update last eye contact time
-                if eye_contact:
-                    self.last_eye_contact_time = time.time()
-                
-                return eye_contact, pitch, yaw, roll, left_ear, right_ear
-        
+            # Get head pose
+            pitch, yaw, roll = self.get_head_pose(landmarks)
+            
+            # Calculate EAR for both eyes at once
+            left_ear, right_ear = eye_aspect_ratios(landmarks).tolist()
+            
+            # Determine eye state
+            eyes_open = (left_ear > MIN_EYE_OPENNESS and 
+                       right_ear > MIN_EYE_OPENNESS)
+            self.eye_state_history.append(eyes_open)
+            
+            # Stable eye state (open/closed) over several frames
+            stable_eyes_open = (sum(self.eye_state_history) == 
+                              len(self.eye_state_history))
+            
+            # Gaze direction
+            looking_at_camera = self.is_looking_at_camera(pitch, yaw, roll)
+            self.gaze_history.append(looking_at_camera)
+            
+            # Stable gaze direction over several frames
+            stable_gaze = (sum(self.gaze_history) == 
+                         len(self.gaze_history))
+            
+            # Eye contact requires stable eyes open and stable gaze
+            eye_contact = stable_eyes_open and stable_gaze
+            
+            # Update last eye contact time
+            if eye_contact:
+                self.last_eye_contact_time = time.time()
+            
+            return eye_contact, pitch, yaw, roll, left_ear, right_ear
+    
         return False, 0, 0, 0, 0, 0
 
-def simulate_eye_tracking_score(video_path):
-    print(f"Analyzing eye contact for video: {video_path}")
-    cap = cv2.VideoCapture(video_path)
-    tracker = EyeTracker()
-    
-    frame_count = 0
-    eye_contact_frames = 0
-    
-    while cap.isOpened():
-        success, frame = cap.read()
-        if not success:
-            break
-        
-        eye_contact, _, _, _, _, _ = tracker.analyze_frame(frame)
-        frame_count += 1
-        
-        if eye_contact:
-            eye_contact_frames += 1
-    
+def open_capture(video_path):
+    """VideoCapture using hardware decoding when EYE_DECODE_ACCELERATION allows it and a device exists"""
+    load_opencv()
+    if EYE_DECODE_ACCELERATION == "any" and hasattr(cv2, "VIDEO_ACCELERATION_ANY"):
+        # OpenCV falls back to software decoding when no accelerator is available
+        cap = cv2.VideoCapture(video_path, cv2.CAP_ANY,
+                               [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY])
+        if cap.isOpened():
+            return cap
+        cap.release()
+    return cv2.VideoCapture(video_path)
+
+class FrameSource:
+    """Decodes a video on a background thread into a small ring of reused RGB buffers.
+
+    Iterating yields (frame_index, rgb_frame) for every `step`-th frame. Only
+    those frames are retrieved, resized to `size` and converted to RGB on the
+    decode thread; skipped frames are grabbed and never converted. A yielded
+    buffer goes back to the ring when the next frame is requested, so use it
+    (or copy it) before advancing. `step` may be changed while iterating; with
+    prefetch=0 the change applies to the very next frame, otherwise only to
+    frames not yet decoded. Alternatively `frames` lists the (ascending) frame
+    indices to visit; long jumps between them seek instead of decoding through.
+    Decoding stops at `max_frames`, if set.
+    """
+
+    def __init__(self, video_path, size=(640, 480), step=1, prefetch=EYE_PREFETCH_FRAMES, frames=None,
+                 max_frames=None):
+        self.cap = open_capture(video_path)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.size = size
+        self.step = max(1, int(step))
+        self.prefetch = max(0, int(prefetch))
+        self.frames = frames
+        self.max_frames = max_frames
+        self.frames_total = 0  # Frames demuxed, known once iteration ends
+
+        width, height = size
+        self._buffers = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(self.prefetch + 1)]
+        self._resized = np.empty((height, width, 3), dtype=np.uint8)
+        self._raw = None  # Source-resolution BGR frame, reused by cap.read
+        self._free = queue.Queue()
+        for slot in range(len(self._buffers)):
+            self._free.put(slot)
+        self._ready = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _decode(self):
+        """Yield (frame_index, slot) for each sampled frame, decoded into its ring buffer"""
+        index = 0
+        targets = iter(self.frames) if self.frames is not None else None
+        next_index = next(targets, None) if targets is not None else 0
+        while next_index is not None and not self._stop.is_set():
+            if self.max_frames is not None and index >= self.max_frames:
+                break
+            if targets is not None and next_index - index > EYE_SEEK_GAP:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, next_index)
+                index = next_index
+            if index < next_index:
+                if not self.cap.grab():
+                    break
+                index += 1
+                continue
+
+            success, self._raw = self.cap.read(self._raw)
+            if not success:
+                break
+            slot = self._free.get()
+            if slot is None:  # Closed while waiting for a free buffer
+                break
+            cv2.resize(self._raw, self.size, dst=self._resized)
+            cv2.cvtColor(self._resized, cv2.COLOR_BGR2RGB, dst=self._buffers[slot])
+            yield index, slot
+            next_index = next(targets, None) if targets is not None else index + self.step
+            index += 1
+        self.frames_total = index
+
+    def _run(self):
+        try:
+            for item in self._decode():
+                self._ready.put(item)
+        except Exception as e:
+            self._ready.put(e)
+        self._ready.put(None)
+
+    def __iter__(self):
+        if self.prefetch == 0:
+            for index, slot in self._decode():
+                yield index, self._buffers[slot]
+                self._free.put(slot)
+            return
+
+        self._thread = threading.Thread(target=self._run, name="frame-decode", daemon=True)
+        self._thread.start()
+        slot = None
+        try:
+            while True:
+                if slot is not None:
+                    self._free.put(slot)  # The consumer is done with the previous frame
+                    slot = None
+                item = self._ready.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                index, slot = item
+                yield index, self._buffers[slot]
+        finally:
+            self.close()
+
+    def close(self):
+        self._stop.set()
+        self._free.put(None)  # Wake a decoder waiting for a buffer
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.cap.release()
+
+class FrameSampler:
+    """Decides how many frames to advance after each analyzed frame"""
+
+    def __init__(self, mode=EYE_SAMPLING_MODE, source_fps=30.0, target_fps=EYE_TARGET_FPS,
+                 every_n=EYE_EVERY_N, max_step=ADAPTIVE_MAX_STEP):
+        if mode not in SAMPLING_MODES:
+            raise ValueError(f"Unknown sampling mode: {mode}")
+        self.mode = mode
+        self.max_step = max(1, int(max_step))
+        if mode == "fps":
+            self.base_step = max(1, int(round(source_fps / target_fps))) if target_fps > 0 else 1
+        elif mode == "nth":
+            self.base_step = max(1, int(every_n))
+        else:
+            self.base_step = 1
+        self.step = self.base_step
+        self.last_result = None
+
+    def next_step(self, eye_contact):
+        if self.mode == "adaptive":
+            # Skip further ahead while gaze is stable, drop back to dense sampling on change
+            if eye_contact == self.last_result:
+                self.step = min(self.step * 2, self.max_step)
+            else:
+                self.step = 1
+            self.last_result = eye_contact
+        return self.step
+
+
+_worker_state = threading.local()
+
+def get_tracker():
+    """Return the long-lived tracker owned by the current worker thread/process"""
+    tracker = getattr(_worker_state, "tracker", None)
+    if tracker is None:
+        tracker = EyeTracker()
+        _worker_state.tracker = tracker
+    return tracker
+
+class EyeContactAnalyzer:
+    """Frame consumer that scores eye contact on the frames its sampler picks.
+
+    Feed it frames in order: consume(index, rgb_frame) for each frame where
+    wants(index) is true, then finish(frames_total) for the result. Each
+    analyzed frame stands in for the skipped frames that follow it, so the
+    score stays a fraction of video time rather than of analyzed frames. The
+    result's `timeline` holds the same spans run-length encoded by gaze state
+    (see GazeTimeline).
+    """
+
+    def __init__(self, tracker, fps, mode=EYE_SAMPLING_MODE, target_fps=EYE_TARGET_FPS,
+                 every_n=EYE_EVERY_N, max_step=ADAPTIVE_MAX_STEP, label=""):
+        self.fps = fps
+        self.sampler = FrameSampler(mode, fps, target_fps, every_n, max_step)
+        tracker.reset(self.sampler.base_step)
+        self.tracker = tracker
+        self.size = tracker.size  # Frames must be resized to this and converted to RGB
+        self.mode = mode
+        self.label = label
+        self.timeline = GazeTimeline(fps)
+        self.next_index = 0
+        self.frames_analyzed = 0
+        self.eye_contact_frames = 0
+        self.analysis_seconds = 0.0
+        self.last_sample = None  # (frame index, eye contact, gaze state, head pose) of the previous analyzed frame
+
+    @property
+    def step(self):
+        return self.sampler.step
+
+    def wants(self, index):
+        return index >= self.next_index
+
+    def consume(self, index, rgb_frame):
+        frame_start = time.perf_counter()
+        eye_contact, state, pose = _analyze_sample(self.tracker, rgb_frame)
+        self.analysis_seconds += time.perf_counter() - frame_start
+        self.frames_analyzed += 1
+
+        last_sample = self.last_sample
+        if last_sample is not None:
+            if last_sample[1]:
+                self.eye_contact_frames += index - last_sample[0]
+            self.timeline.add(last_sample[0], index, last_sample[2], last_sample[3])
+        self.last_sample = (index, eye_contact, state, pose)
+        self.next_index = index + self.sampler.next_step(eye_contact)
+
+    def finish(self, frames_total):
+        last_sample = self.last_sample
+        if last_sample is not None:
+            if last_sample[1]:
+                self.eye_contact_frames += frames_total - last_sample[0]
+            self.timeline.add(last_sample[0], frames_total, last_sample[2], last_sample[3])
+        self.timeline.frames_total = frames_total
+        _record_frame_metrics(self.tracker, self.frames_analyzed, frames_total)
+
+        score = (self.eye_contact_frames / frames_total) * 100 if frames_total else 0.0
+        print(f"Eye contact score: {score:.2f}% for video {self.label} "
+              f"({self.frames_analyzed}/{frames_total} frames analyzed)")
+        return {
+            "score": round(score, 2),
+            "frames_analyzed": self.frames_analyzed,
+            "frames_total": frames_total,
+            "sampling_mode": self.mode,
+            "timeline": self.timeline.to_dict(),
+        }
+
+def eye_contact_consumer(fps, label="", mode=EYE_SAMPLING_MODE, target_fps=EYE_TARGET_FPS):
+    """EyeContactAnalyzer on this worker's tracker, as a frame consumer for the shared media decode"""
+    return EyeContactAnalyzer(get_tracker(), fps, mode, target_fps, label=label)
+
+def analyze_eye_tracking(video_path, mode=EYE_SAMPLING_MODE, target_fps=EYE_TARGET_FPS,
+                         every_n=EYE_EVERY_N, max_step=ADAPTIVE_MAX_STEP, tracker=None, limit_seconds=None):
+    """Score eye contact on a sampled subset of frames, decoding the video for eye tracking alone.
+
+    Only the first `limit_seconds` of the video are analyzed, if set. When the
+    worker runs past MAX_WORKER_RSS_MB the analysis stops early and the result
+    lists the cut under `degraded`.
+    """
+    print(f"Analyzing eye contact for video: {video_path} (sampling: {mode})")
+    tracker = tracker or get_tracker()
+    if mode == "budgeted":
+        result = analyze_eye_tracking_budgeted(video_path, tracker=tracker, limit_seconds=limit_seconds)
+        if result is not None:
+            return result
+        print(f"Frame count unknown for {video_path}; sampling at {target_fps} fps instead")
+        mode = "fps"
+    start = time.perf_counter()
+
+    # Adaptive steps depend on each result, so decoding ahead would make the choice of frames timing-dependent
+    prefetch = 0 if mode == "adaptive" else EYE_PREFETCH_FRAMES
+    guard = limits.MemoryGuard()
+    stopped_at = None
+    with FrameSource(video_path, tracker.size, prefetch=prefetch) as source:
+        analyzer = EyeContactAnalyzer(tracker, source.fps, mode, target_fps, every_n, max_step, label=video_path)
+        source.step = analyzer.step
+        if limit_seconds:
+            source.max_frames = int(limit_seconds * source.fps)
+
+        # Decoding the next frames overlaps with inference on this one
+        for frame_index, rgb_frame in source:
+            if guard.exceeded():
+                stopped_at = frame_index
+                break
+            analyzer.consume(frame_index, rgb_frame)
+            source.step = analyzer.step
+
+    elapsed = time.perf_counter() - start
+    metrics.observe("stage_seconds", elapsed, stage="eye_tracking")
+    metrics.observe("stage_seconds", elapsed - analyzer.analysis_seconds, stage="frame_decode")  # Waiting on the decoder
+    if stopped_at is None:
+        return analyzer.finish(source.frames_total)
+    result = analyzer.finish(stopped_at)
+    result["degraded"] = [guard.degradation("truncated", seconds_analyzed=round(stopped_at / source.fps, 1))]
+    return result
+
+def _analyze_sample(tracker, rgb_frame):
+    """(eye contact, gaze state, head pose or None) for one frame"""
+    eye_contact, pitch, yaw, roll, _, _ = tracker.analyze_rgb_frame(rgb_frame)
+    if not tracker.face_found:
+        return eye_contact, NO_FACE, None
+    return eye_contact, EYE_CONTACT if eye_contact else LOOKING_AWAY, (pitch, yaw, roll)
+
+def _record_frame_metrics(tracker, frames_analyzed, frames_total):
+    metrics.observe("stage_seconds", tracker.face_mesh_seconds, stage="face_mesh")
+    metrics.inc("frames_total", frames_analyzed, kind="analyzed")
+    metrics.inc("frames_total", max(0, frames_total - frames_analyzed), kind="skipped")
+
+def stratified_estimate(cells, z=EYE_CONFIDENCE_Z):
+    """Eye-contact ratio and confidence interval from [start, end, frame, eye_contact] strata.
+
+    Each sampled stratum is weighted by its length. The variance is estimated
+    by collapsing neighbouring strata into pairs, and floored at the binomial
+    variance divided by EYE_MAX_DESIGN_GAIN, so a run of identical samples
+    never yields a zero-width interval. Both carry the finite-population
+    correction: frames that were all analyzed add no sampling error, so once
+    every frame is analyzed the interval is the exact ratio. Returns (ratio,
+    low, high).
+    """
+    sampled = [(end - start, float(value)) for start, end, _, value in cells if value is not None]
+    n = len(sampled)
+    if not n:
+        return 0.0, 0.0, 1.0
+    total = sum(weight for weight, _ in sampled)
+    ratio = sum(weight * value for weight, value in sampled) / total
+
+    groups = [sampled[i:i + 2] for i in range(0, n - n % 2, 2)]
+    if n % 2 and groups:
+        groups[-1] = groups[-1] + sampled[-1:]  # Odd count: the last three strata form one group
+    variance = 0.0
+    for group in groups:
+        frames = sum(w for w, _ in group)
+        values = [v for _, v in group]
+        mean = sum(values) / len(values)
+        spread = sum((v - mean) ** 2 for v in values) / (len(values) - 1)
+        fpc = 1 - len(group) / frames  # One analyzed frame per stratum
+        variance += (frames / total) ** 2 * spread / len(values) * fpc
+    shrunk = (sum(value for _, value in sampled) + 2) / (n + 4)  # Agresti-Coull
+    variance = max(variance, shrunk * (1 - shrunk) / (EYE_MAX_DESIGN_GAIN * n) * (1 - n / total))
+
+    half_width = z * variance ** 0.5
+    return ratio, max(0.0, ratio - half_width), min(1.0, ratio + half_width)
+
+def _plan_round(cells, rng):
+    """One new frame per stratum: the stratum itself if unsampled, else the half its sample is not in"""
+    plan = []
+    for position, (start, end, frame, _) in enumerate(cells):
+        if frame is None:
+            plan.append((int(rng.integers(start, end)), position, None))
+        elif end - start >= 2:
+            mid = (start + end) // 2
+            low, high = (start, mid) if frame >= mid else (mid, end)
+            plan.append((int(rng.integers(low, high)), position, mid))
+    return plan
+
+def _split_cells(cells, samples):
+    """Strata after a (possibly partial) round; samples maps stratum position -> (frame, mid, eye_contact)"""
+    refined = []
+    for position, (start, end, frame, value) in enumerate(cells):
+        if position not in samples:
+            refined.append([start, end, frame, value])
+            continue
+        new_frame, mid, new_value = samples[position]
+        if mid is None:
+            refined.append([start, end, new_frame, new_value])
+            continue
+        halves = [[start, mid, None, None], [mid, end, None, None]]
+        halves[frame >= mid][2:] = [frame, value]
+        halves[new_frame >= mid][2:] = [new_frame, new_value]
+        refined.extend(halves)
+    return refined
+
+def analyze_eye_tracking_budgeted(video_path, tolerance=EYE_BUDGET_TOLERANCE, max_frames=EYE_BUDGET_MAX_FRAMES,
+                                  max_seconds=EYE_BUDGET_SECONDS, tracker=None, limit_seconds=None):
+    """Estimate the eye-contact ratio from stratified random frames, stopping early.
+
+    The clip starts as EYE_BUDGET_INITIAL_STRATA equal strata with one random
+    frame each; every later round halves each stratum and samples the half
+    that has no frame yet, so any number of rounds covers the whole clip
+    evenly. Sampling stops once the confidence interval is within
+    +/- `tolerance` (checked after each round) or the frame or time budget
+    runs out, or the worker passes MAX_WORKER_RSS_MB. Frames are judged on
+    their own, without the smoothing over consecutive frames the dense modes
+    use. Only the first `limit_seconds` are sampled, if set. Returns None when
+    the container does not report a frame count.
+    """
+    tracker = tracker or get_tracker()
+    tracker.reset()
+    cap = open_capture(video_path)
+    frames_total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
     cap.release()
-    
-    if frame_count == 0:
-        return 0.0
-    
-    score = (eye_contact_frames / frame_count) * 100
-    print(f"Eye contact score: {score:.2f}% for video {video_path}")
-    return round(score, 2)
\ No newline at end of file
+    if frames_total <= 0:
+        return None
+    if limit_seconds:
+        frames_total = min(frames_total, int(limit_seconds * fps))
+
+    start = time.perf_counter()
+    analysis_seconds = 0.0
+    rng = np.random.default_rng(EYE_SAMPLE_SEED)
+    strata = min(EYE_BUDGET_INITIAL_STRATA, frames_total)
+    cells = [[i * frames_total // strata, (i + 1) * frames_total // strata, None, None] for i in range(strata)]
+    frames_analyzed = 0
+    observed = {}  # Frame index -> (gaze state, head pose)
+    stop_reason = None
+    guard = limits.MemoryGuard(every=1)  # Each sampled frame may cost a seek, so a check per frame is cheap
+
+    while stop_reason is None:
+        remaining = max_frames - frames_analyzed
+        if remaining <= 0:
+            stop_reason = "frame_budget"
+            break
+        plan = _plan_round(cells, rng)
+        if not plan:
+            stop_reason = "exhausted"  # Every frame has been analyzed
+            break
+        if len(plan) > remaining:
+            plan = [plan[i] for i in rng.choice(len(plan), remaining, replace=False)]
+        plan.sort()
+        planned = {frame: (position, mid) for frame, position, mid in plan}
+
+        samples = {}
+        with FrameSource(video_path, tracker.size, frames=[frame for frame, _, _ in plan]) as source:
+            for frame_index, rgb_frame in source:
+                frame_start = time.perf_counter()
+                tracker.clear_history()
+                eye_contact, state, pose = _analyze_sample(tracker, rgb_frame)
+                analysis_seconds += time.perf_counter() - frame_start
+                frames_analyzed += 1
+                observed[frame_index] = (state, pose)
+                position, mid = planned[frame_index]
+                samples[position] = (frame_index, mid, eye_contact)
+
+                if frames_analyzed >= max_frames:
+                    stop_reason = "frame_budget"
+                elif time.perf_counter() - start >= max_seconds:
+                    stop_reason = "time_budget"
+                elif guard.exceeded():
+                    stop_reason = "memory_limit"
+                if stop_reason:
+                    break
+        cells = _split_cells(cells, samples)
+
+        if stop_reason is None:
+            if len(samples) < len(plan):
+                stop_reason = "exhausted"  # The container reported more frames than it holds
+            else:
+                _, low, high = stratified_estimate(cells)
+                if high - low <= 2 * tolerance:
+                    stop_reason = "converged"
+
+    ratio, low, high = stratified_estimate(cells)
+    timeline = GazeTimeline(fps)  # Each sampled frame stands for its stratum
+    for cell_start, cell_end, frame, _ in cells:
+        if frame is not None:
+            timeline.add(cell_start, cell_end, *observed[frame])
+    timeline.frames_total = frames_total
+    elapsed = time.perf_counter() - start
+    metrics.observe("stage_seconds", elapsed, stage="eye_tracking")
+    metrics.observe("stage_seconds", elapsed - analysis_seconds, stage="frame_decode")
+    _record_frame_metrics(tracker, frames_analyzed, frames_total)
+    print(f"Eye contact score: {ratio * 100:.2f}% ({low * 100:.1f}-{high * 100:.1f}%) for video {video_path} "
+          f"({frames_analyzed}/{frames_total} frames analyzed, {stop_reason})")
+    result = {
+        "score": round(ratio * 100, 2),
+        "confidence_interval": [round(low * 100, 2), round(high * 100, 2)],
+        "frames_analyzed": frames_analyzed,
+        "frames_total": frames_total,
+        "sampling_mode": "budgeted",
+        "stop_reason": stop_reason,
+        "timeline": timeline.to_dict(),
+    }
+    if guard.tripped:
+        result["degraded"] = [guard.degradation("sampled_less", frames_analyzed=frames_analyzed)]
+    return result
+
+def simulate_eye_tracking_score(video_path):
+    return analyze_eye_tracking(video_path)["score"]
@@ -0,0 +1,102 @@
+import numpy as np
+
+# Gaze states, stored as small ints in the timeline
+EYE_CONTACT = 0
+LOOKING_AWAY = 1
+NO_FACE = 2
+STATES = ("eye_contact", "looking_away", "no_face")
+
+
+class GazeTimeline:
+    """Run-length encoded gaze states of one video.
+
+    Consecutive frames in the same state form one segment, stored in
+    preallocated column arrays (frame bounds, state, head-pose sums) that grow
+    by doubling, so a long video with a steady gaze costs a handful of rows
+    rather than one entry per frame. Each segment keeps the mean head pose of
+    the frames analyzed in it.
+    """
+
+    def __init__(self, fps=30.0, capacity=32):
+        self.fps = fps
+        self.frames_total = 0
+        self._size = 0
+        self._bounds = np.zeros((capacity, 2), dtype=np.int64)  # Start and end frame (exclusive)
+        self._states = np.zeros(capacity, dtype=np.int8)
+        self._pose_sums = np.zeros((capacity, 3), dtype=np.float64)  # Pitch, yaw, roll
+        self._pose_counts = np.zeros(capacity, dtype=np.int32)
+
+    def __len__(self):
+        return self._size
+
+    def _grow(self):
+        capacity = 2 * len(self._states)
+        for name in ("_bounds", "_states", "_pose_sums", "_pose_counts"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def add(self, start, end, state, pose=None):
+        """Mark frames [start, end) as `state`; `pose` is the (pitch, yaw, roll) seen there, if any"""
+        if end <= start:
+            return
+        last = self._size - 1
+        if last >= 0 and self._states[last] == state and self._bounds[last, 1] == start:
+            self._bounds[last, 1] = end
+        else:
+            if self._size == len(self._states):
+                self._grow()
+            last = self._size
+            self._size += 1
+            self._bounds[last] = (start, end)
+            self._states[last] = state
+        if pose is not None:
+            self._pose_sums[last] += pose
+            self._pose_counts[last] += 1
+        self.frames_total = max(self.frames_total, end)
+
+    def _lengths(self, state):
+        bounds = self._bounds[:self._size][self._states[:self._size] == state]
+        return bounds[:, 1] - bounds[:, 0]
+
+    def seconds_in(self, state):
+        return float(self._lengths(state).sum()) / self.fps
+
+    def longest(self, state):
+        """Longest single stretch of `state`, in seconds"""
+        lengths = self._lengths(state)
+        return float(lengths.max()) / self.fps if len(lengths) else 0.0
+
+    def summary(self):
+        """Figures for suspicion heuristics, computed from the segments alone"""
+        duration = self.frames_total / self.fps if self.frames_total else 0.0
+        return {
+            "eye_contact_ratio": round(self.seconds_in(EYE_CONTACT) / duration, 4) if duration else 0.0,
+            "look_away_count": int(len(self._lengths(LOOKING_AWAY))),
+            "longest_look_away": round(self.longest(LOOKING_AWAY), 2),
+            "no_face_seconds": round(self.seconds_in(NO_FACE), 2),
+        }
+
+    def to_dict(self):
+        """JSON form: segment bounds in seconds, with the mean head pose where a face was seen"""
+        segments = []
+        for (start, end), state, pose_sum, count in zip(self._bounds[:self._size], self._states[:self._size],
+                                                        self._pose_sums[:self._size], self._pose_counts[:self._size]):
+            segments.append({
+                "state": STATES[state],
+                "start": round(int(start) / self.fps, 3),
+                "end": round(int(end) / self.fps, 3),
+                "head_pose": [round(float(angle), 1) for angle in pose_sum / count] if count else None,
+            })
+        return {"fps": float(self.fps), "frames_total": int(self.frames_total), "segments": segments}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a timeline from to_dict() output (head poses become single samples)"""
+        timeline = cls(data["fps"], capacity=max(1, len(data["segments"])))
+        for segment in data["segments"]:
+            timeline.add(round(segment["start"] * timeline.fps), round(segment["end"] * timeline.fps),
+                         STATES.index(segment["state"]), segment["head_pose"])
+        timeline.frames_total = data["frames_total"]
+        return timeline
@@ -0,0 +1,114 @@
+import hashlib
+import os
+import uuid
+
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+
+from video_process import metrics
+from video_process.evaluation import VIDEO_KEYS, EvaluationError
+
+# Upload limits, enforced while the body is streamed
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", 1024 * 1024 * 1024))  # Whole request
+MAX_VIDEO_BYTES = int(os.environ.get("MAX_VIDEO_BYTES", 300 * 1024 * 1024))  # Each video part
+MAX_FIELD_BYTES = 1024 * 1024  # Each non-file field (mapping, applied_role)
+READ_CHUNK_BYTES = 256 * 1024  # Bytes read from the request stream at a time
+
+
+class UploadTooLarge(EvaluationError):
+    def __init__(self, message):
+        super().__init__(message, status_code=413)
+
+
+def ingest_multipart(stream, content_type, upload_dir, temp_files, on_video=None, content_length=None,
+                     on_field=None):
+    """Parse a multipart/form-data body straight off the socket.
+
+    Video parts (VIDEO_KEYS) are written to `upload_dir` and hashed as their bytes
+    arrive; `on_video(video_key, path, digest)` is called as soon as each one is
+    complete, while later parts are still uploading, and `on_field(fields)` as
+    each other field is. Either callback may raise to abort the upload. Every
+    file created is appended to `temp_files` immediately so the caller can
+    always clean up.
+
+    Returns (fields, videos) where videos maps video_key -> (path, digest).
+    """
+    mimetype, options = parse_options_header(content_type or "")
+    if mimetype != "multipart/form-data" or "boundary" not in options:
+        raise EvaluationError("Expected a multipart/form-data upload")
+    if content_length is not None and content_length > MAX_UPLOAD_BYTES:
+        raise UploadTooLarge(f"Upload exceeds {MAX_UPLOAD_BYTES} bytes")
+
+    decoder = MultipartDecoder(options["boundary"].encode("latin-1"))
+    fields = {}
+    videos = {}
+    part = None
+    received = 0
+
+    try:
+        while True:
+            chunk = stream.read(READ_CHUNK_BYTES)
+            received += len(chunk)
+            if received > MAX_UPLOAD_BYTES:
+                raise UploadTooLarge(f"Upload exceeds {MAX_UPLOAD_BYTES} bytes")
+            decoder.receive_data(chunk or None)  # None marks the end of the body
+
+            event = decoder.next_event()
+            while not isinstance(event, (NeedData, Epilogue)):
+                if isinstance(event, Field):
+                    part = {"kind": "field", "name": event.name, "data": bytearray()}
+                elif isinstance(event, File):
+                    part = _open_video_part(event.name, videos, upload_dir, temp_files)
+                elif isinstance(event, Data):
+                    _receive(part, event.data)
+                    if not event.more_data:
+                        _finish(part, fields, videos, on_video, on_field)
+                        part = None
+                event = decoder.next_event()
+
+            if isinstance(event, Epilogue) or not chunk:
+                break
+    except ValueError as e:
+        raise EvaluationError(f"Malformed multipart upload: {e}")
+    finally:
+        if part is not None and part["kind"] == "video":
+            part["file"].close()  # Upload aborted mid-part
+
+    return fields, videos
+
+
+def _open_video_part(name, videos, upload_dir, temp_files):
+    if name not in VIDEO_KEYS or name in videos:
+        return {"kind": "skip", "name": name}  # Unknown or repeated file fields are discarded
+    path = os.path.join(upload_dir, f"{uuid.uuid4()}.mp4")
+    temp_files.append(path)
+    return {"kind": "video", "name": name, "path": path, "file": open(path, "wb"),
+            "digest": hashlib.sha256(), "size": 0}
+
+
+def _receive(part, data):
+    if part["kind"] == "field":
+        part["data"].extend(data)
+        if len(part["data"]) > MAX_FIELD_BYTES:
+            raise UploadTooLarge(f"Field {part['name']} exceeds {MAX_FIELD_BYTES} bytes")
+    elif part["kind"] == "video":
+        part["size"] += len(data)
+        if part["size"] > MAX_VIDEO_BYTES:
+            raise UploadTooLarge(f"Video {part['name']} exceeds {MAX_VIDEO_BYTES} bytes")
+        part["file"].write(data)
+        part["digest"].update(data)
+        metrics.inc("upload_bytes_total", len(data))
+        metrics.inc("temp_file_bytes", len(data))  # Released in app.cleanup_files
+
+
+def _finish(part, fields, videos, on_video, on_field):
+    if part["kind"] == "field":
+        fields[part["name"]] = part["data"].decode("utf-8", errors="replace")
+        if on_field:
+            on_field(fields)
+    elif part["kind"] == "video":
+        part["file"].close()
+        digest = part["digest"].hexdigest()
+        videos[part["name"]] = (part["path"], digest)
+        if on_video:
+            on_video(part["name"], part["path"], digest)
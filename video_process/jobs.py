@@ -0,0 +1,232 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+
+from video_process import metrics
+from video_process.evaluation import STAGES
+
+# Job queue configuration
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))  # Interviews evaluated at the same time
+JOB_QUEUE_SIZE = int(os.environ.get("JOB_QUEUE_SIZE", 20))  # Queued jobs before submissions get 429
+JOB_STORE = os.environ.get("JOB_STORE", "memory")  # "memory" or "sqlite"
+JOB_STORE_PATH = os.environ.get("JOB_STORE_PATH", "jobs.sqlite3")
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue cannot accept more work"""
+
+
+def new_job(job_id):
+    now = time.time()
+    return {
+        "id": job_id,
+        "status": "queued",
+        "progress": {stage: {"done": 0, "total": None} for stage in STAGES},
+        "result": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+class MemoryJobStore:
+    """Keeps job records in a dict; lost when the process exits"""
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_id):
+        job = new_job(job_id)
+        with self._lock:
+            self._jobs[job_id] = job
+        return dict(job)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return json.loads(json.dumps(job)) if job else None
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(fields)
+            job["updated_at"] = time.time()
+
+    def delete(self, job_id):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def set_progress(self, job_id, stage, done, total):
+        with self._lock:
+            job = self._jobs[job_id]
+            job["progress"][stage] = {"done": done, "total": total}
+            job["updated_at"] = time.time()
+
+
+class SQLiteJobStore:
+    """Persists job records in SQLite so status and results survive restarts"""
+
+    def __init__(self, path=JOB_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT, progress TEXT, result TEXT, "
+                "error TEXT, created_at REAL, updated_at REAL)"
+            )
+            # Jobs that were in flight when the previous process stopped will never finish
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? "
+                "WHERE status IN ('queued', 'running')",
+                ("Interrupted by server restart", time.time()),
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:  # Commits on success, rolls back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def create(self, job_id):
+        job = new_job(job_id)
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, job["status"], json.dumps(job["progress"]), None, None,
+                 job["created_at"], job["updated_at"]),
+            )
+        return job
+
+    def get(self, job_id):
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, status, progress, result, error, created_at, updated_at "
+                "FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "status": row[1],
+            "progress": json.loads(row[2]),
+            "result": json.loads(row[3]) if row[3] else None,
+            "error": row[4],
+            "created_at": row[5],
+            "updated_at": row[6],
+        }
+
+    def update(self, job_id, **fields):
+        columns = []
+        values = []
+        for key, value in fields.items():
+            if key in ("progress", "result"):
+                value = json.dumps(value) if value is not None else None
+            columns.append(f"{key} = ?")
+            values.append(value)
+        columns.append("updated_at = ?")
+        values.extend([time.time(), job_id])
+        with self._lock, self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {', '.join(columns)} WHERE id = ?", values)
+
+    def delete(self, job_id):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def set_progress(self, job_id, stage, done, total):
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT progress FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            progress = json.loads(row[0])
+            progress[stage] = {"done": done, "total": total}
+            conn.execute(
+                "UPDATE jobs SET progress = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(progress), time.time(), job_id),
+            )
+
+
+def create_job_store(kind=JOB_STORE, path=JOB_STORE_PATH):
+    if kind == "memory":
+        return MemoryJobStore()
+    if kind == "sqlite":
+        return SQLiteJobStore(path)
+    raise ValueError(f"Unknown job store: {kind}")
+
+
+class JobQueue:
+    """Bounded queue of evaluation jobs drained by background workers.
+
+    `runner(payload, progress)` does the actual work and returns the result
+    dict; `cleanup(payload)` always runs afterwards. Workers are threads: the
+    CPU-heavy stages already run in the pipeline's process pool, while job
+    state stays in this process where the result store can see it.
+    """
+
+    def __init__(self, runner, store, workers=JOB_WORKERS, maxsize=JOB_QUEUE_SIZE, cleanup=None):
+        self.runner = runner
+        self.store = store
+        self.cleanup = cleanup
+        self.workers = max(1, int(workers))
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._threads = []
+        self._start_lock = threading.Lock()
+        metrics.register_collector(self._metrics)
+
+    def _metrics(self):
+        return [("job_queue_depth", "gauge", "Evaluation jobs waiting for a worker", [({}, self.depth())])]
+
+    def _start(self):
+        # Started lazily so importing the app never spawns threads
+        with self._start_lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, payload):
+        """Queue a job and return its id, or raise QueueFullError"""
+        self._start()
+        job_id = str(uuid.uuid4())
+        self.store.create(job_id)
+        try:
+            self._queue.put_nowait((job_id, payload))
+        except queue.Full:
+            self.store.delete(job_id)
+            raise QueueFullError("Job queue is full")
+        return job_id
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def full(self):
+        """Whether a submission now would be refused; submit() still checks, as the queue may fill meanwhile"""
+        return self._queue.full()
+
+    def _work(self):
+        while True:
+            job_id, payload = self._queue.get()
+            try:
+                self.store.update(job_id, status="running")
+                progress = lambda stage, done, total: self.store.set_progress(job_id, stage, done, total)
+                result = self.runner(payload, progress)
+                self.store.update(job_id, status="completed", result=result)
+                metrics.inc("jobs_total", status="completed")
+            except Exception as e:
+                traceback.print_exc()
+                self.store.update(job_id, status="failed", error=str(e))
+                metrics.inc("jobs_total", status="failed")
+            finally:
+                if self.cleanup:
+                    self.cleanup(payload)
+                self._queue.task_done()
@@ -0,0 +1,169 @@
+import os
+import re
+from collections import deque
+from functools import lru_cache
+from itertools import accumulate, compress, count
+
+# Keyword matching for answer evaluation
+KEYWORD_STEMMING = os.environ.get("KEYWORD_STEMMING", "plural")  # "plural" folds plural forms, "none" matches exactly
+KEYWORD_CACHE_SIZE = 256  # Compiled matchers kept for repeated question banks
+
+# Words, with the "+"/"#" suffixes of names like C++ and C#; split() keeps them at odd positions
+TOKEN_PATTERN = re.compile(r"(\w+[+#]*)")
+SIBILANT_ENDINGS = ("x", "ch", "sh", "ss")  # Plurals of these add "es": box -> boxes, class -> classes
+
+
+@lru_cache(maxsize=65536)
+def stem(token, stemming=KEYWORD_STEMMING):
+    """Fold plural forms ("runtimes" -> "runtime", "libraries" -> "library", "boxes" -> "box").
+
+    Singulars ending in a sibilant and "e" drop the "e" as well ("cache" and
+    "caches" -> "cach"), so they still share a stem with their plural.
+    """
+    if stemming == "none" or len(token) <= 3 or not token.isalpha():
+        return token
+    if token.endswith("ies") and len(token) > 4:
+        return token[:-3] + "y"
+    if token.endswith("es") and token[:-2].endswith(SIBILANT_ENDINGS):
+        return token[:-2]
+    if token.endswith("e") and token[:-1].endswith(SIBILANT_ENDINGS):
+        return token[:-1]
+    if token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def surface_forms(token, stemming=KEYWORD_STEMMING):
+    """Lowercased words that stem to `token`: the token itself and its plurals"""
+    candidates = {token, token + "s", token + "es"}
+    if token.endswith("y"):
+        candidates.add(token[:-1] + "ies")
+    if token.endswith(SIBILANT_ENDINGS):
+        candidates.add(token + "e")  # "cach" is the stem of "cache" too
+    return {word for word in candidates if stem(word, stemming) == token}
+
+
+def split_words(text):
+    """Lowercased words of `text`, plus the split parts (separators, words) whose lengths give offsets"""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        parts = TOKEN_PATTERN.split(lowered)
+        return parts[1::2], parts
+    parts = TOKEN_PATTERN.split(text)  # Lowercasing changed lengths; keep offsets of the original
+    return [word.lower() for word in parts[1::2]], parts
+
+
+def tokenize(text, stemming=KEYWORD_STEMMING):
+    """Normalized tokens of `text`: lowercased words with plurals folded"""
+    return [stem(word, stemming) for word in split_words(text)[0]]
+
+
+class KeywordMatcher:
+    """Finds every keyword group in a transcript in one pass over its words.
+
+    Each group is a list of phrases that count as the same keyword (synonyms,
+    spelled-out acronyms); the first phrase names the group in results. Phrases
+    match whole words only, after lowercasing and plural folding. The phrases
+    are compiled into an Aho-Corasick automaton over token ids; transcript
+    words are mapped to ids with one dict lookup each, and only words that
+    occur in some keyword step the automaton.
+    """
+
+    def __init__(self, groups, stemming=KEYWORD_STEMMING):
+        self.stemming = stemming
+        self.labels = []
+        self._token_ids = {}  # Normalized token -> id (ids start at 1 so they are truthy)
+        self._word_ids = {}  # Every surface form of a token -> its id
+        self._goto = [{}]  # Per state: token id -> next state
+        self._fail = [0]
+        self._outputs = [[]]  # Per state: (group, phrase length) pairs ending here
+
+        for group, phrases in enumerate(groups):
+            self.labels.append(phrases[0].lower())
+            for phrase in phrases:
+                tokens = tokenize(phrase, stemming)
+                if tokens:
+                    self._add(tokens, group)
+        self._link()
+
+    def _token_id(self, token):
+        token_id = self._token_ids.get(token)
+        if token_id is None:
+            token_id = self._token_ids[token] = len(self._token_ids) + 1
+            for word in surface_forms(token, self.stemming):
+                self._word_ids.setdefault(word, token_id)
+        return token_id
+
+    def _add(self, tokens, group):
+        state = 0
+        for token in tokens:
+            token_id = self._token_id(token)
+            next_state = self._goto[state].get(token_id)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][token_id] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            state = next_state
+        if (group, len(tokens)) not in self._outputs[state]:
+            self._outputs[state].append((group, len(tokens)))
+
+    def _link(self):
+        """Breadth-first failure links; each state also inherits the outputs of its fallback"""
+        pending = deque(self._goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for token_id, child in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and token_id not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(token_id, 0)
+                self._outputs[child] = self._outputs[child] + self._outputs[self._fail[child]]
+                pending.append(child)
+
+    def find(self, text):
+        """Every keyword occurrence in text order, as (group, start, end) character offsets into `text`"""
+        words, parts = split_words(text)
+        ids = list(map(self._word_ids.get, words))  # None for words in no keyword
+
+        found = []  # (group, first word, last word)
+        state = 0
+        previous = -2
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        for i in compress(count(), ids):
+            if i != previous + 1:
+                state = 0  # A word in no keyword resets every partial phrase
+            previous = i
+            token_id = ids[i]
+            while state and token_id not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token_id, 0)
+            for group, length in outputs[state]:
+                found.append((group, i - length + 1, i))
+        if not found:
+            return []
+
+        # Word i spans offsets[2i]..offsets[2i + 1]
+        offsets = list(accumulate(map(len, parts)))
+        matches = [(group, offsets[2 * first], offsets[2 * last + 1]) for group, first, last in found]
+        matches.sort(key=lambda match: (match[1], match[2]))
+        return matches
+
+
+def keyword_groups(keywords):
+    """Normalize a mapping's keyword list: each entry is a phrase or a list of synonymous phrases"""
+    return tuple(
+        (entry,) if isinstance(entry, str) else tuple(entry)
+        for entry in keywords
+    )
+
+
+@lru_cache(maxsize=KEYWORD_CACHE_SIZE)
+def _compiled(groups, stemming):
+    return KeywordMatcher(groups, stemming)
+
+
+def get_matcher(keywords):
+    """Compiled matcher for a keyword list, reused across requests with the same question bank"""
+    return _compiled(keyword_groups(keywords), KEYWORD_STEMMING)
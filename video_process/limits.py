@@ -0,0 +1,114 @@
+"""Per-video resource limits, enforced by degrading the analysis instead of failing it.
+
+Each video's header is probed before its stages start:
+
+    longer than MAX_VIDEO_SECONDS   only the first MAX_VIDEO_SECONDS are transcribed
+                                    and eye-tracked ("truncated")
+    more than MAX_VIDEO_PIXELS      eye tracking analyzes proportionally fewer frames
+                                    per second ("downsampled")
+
+While frames are analyzed, a worker whose resident memory passes
+MAX_WORKER_RSS_MB stops where it is and scores what it has seen so far
+(reason "memory"). Every degradation is reported with the question in the
+response, so a shortened analysis is never mistaken for a full one.
+"""
+import os
+import sys
+
+MAX_VIDEO_SECONDS = float(os.environ.get("MAX_VIDEO_SECONDS", 15 * 60))  # Seconds analyzed per video; 0 disables
+MAX_VIDEO_PIXELS = int(os.environ.get("MAX_VIDEO_PIXELS", 1920 * 1080))  # Frame size analyzed at the full rate; 0 disables
+MAX_WORKER_RSS_MB = int(os.environ.get("MAX_WORKER_RSS_MB", 3072))  # Worker memory at which analysis stops; 0 disables
+RSS_CHECK_EVERY = 25  # Frames between memory checks
+
+
+def probe_video(video_path):
+    """Duration, frame rate and resolution from the container header, or None if it cannot be read"""
+    from video_process import eye_tracking
+
+    eye_tracking.load_opencv()
+    cv2 = eye_tracking.cv2
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        return {
+            "seconds": frames / fps if frames > 0 else None,
+            "fps": fps,
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        }
+    finally:
+        cap.release()
+
+
+def plan_video(video_path, target_fps=None):
+    """How to process a video within the limits.
+
+    `target_fps` is the eye-tracking rate the video would get without the
+    limits; None means every frame.
+
+    Returns {"limit_seconds", "target_fps", "degraded"}: `limit_seconds` is always
+    passed to the stages (it also guards against headers that understate the
+    duration); `target_fps` is None unless the resolution forces a lower
+    eye-tracking rate; `degraded` lists what the probe already shows will be
+    cut, for the response.
+    """
+    plan = {"limit_seconds": MAX_VIDEO_SECONDS or None, "target_fps": None, "degraded": []}
+    probe = probe_video(video_path)
+    if probe is None:
+        return plan  # The stages report the unreadable file
+
+    if MAX_VIDEO_SECONDS and probe["seconds"] and probe["seconds"] > MAX_VIDEO_SECONDS:
+        plan["degraded"].append({"reason": "duration", "action": "truncated",
+                                 "actual": round(probe["seconds"], 1), "limit": MAX_VIDEO_SECONDS})
+    pixels = probe["width"] * probe["height"]
+    if MAX_VIDEO_PIXELS and pixels > MAX_VIDEO_PIXELS:
+        plan["target_fps"] = round((target_fps or probe["fps"]) * MAX_VIDEO_PIXELS / pixels, 2)
+        plan["degraded"].append({"reason": "resolution", "action": "downsampled",
+                                 "actual": f"{probe['width']}x{probe['height']}", "limit": MAX_VIDEO_PIXELS,
+                                 "eye_tracking_fps": plan["target_fps"]})
+    return plan
+
+
+def plan_key(plan, frames=True):
+    """Cache-key suffix for the plan's settings; `frames` includes those that only affect eye tracking"""
+    suffix = f":max{plan['limit_seconds']:g}s" if plan["limit_seconds"] else ""
+    if frames and plan["target_fps"]:
+        suffix += f":fps{plan['target_fps']:g}"
+    return suffix
+
+
+def current_rss_mb():
+    """Resident memory of this process (the peak where the current value is not available)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        import resource  # Unix only; Windows has neither /proc nor this module
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # Bytes on macOS, KiB elsewhere
+
+
+class MemoryGuard:
+    """Checks the process's memory every RSS_CHECK_EVERY calls to exceeded()"""
+
+    def __init__(self, limit_mb=None, every=RSS_CHECK_EVERY):
+        self.limit_mb = MAX_WORKER_RSS_MB if limit_mb is None else limit_mb
+        self.every = max(1, every)
+        self.calls = 0
+        self.tripped = False
+
+    def exceeded(self):
+        if not self.limit_mb:
+            return False
+        self.calls += 1
+        if not self.tripped and self.calls % self.every == 0:
+            self.tripped = current_rss_mb() > self.limit_mb
+        return self.tripped
+
+    def degradation(self, action, **detail):
+        """Response entry for analysis cut short by this guard"""
+        return {"reason": "memory", "action": action, "limit": self.limit_mb, **detail}
@@ -0,0 +1,296 @@
+"""Single-decode media stage: demux each video once and fan it out to the analyzers.
+
+The audio track is resampled to 16 kHz mono PCM and streamed to the
+transcriber on a background thread; video frames go to every requested frame
+consumer. A frame that any consumer wants is converted to RGB once, into one
+shared read-only buffer handed to each of them, so another analyzer adds no
+decode or conversion cost.
+
+Decoding uses PyAV (the optional `av` package): the container is opened
+once and both streams are decoded in one demux loop, and only the frames a
+consumer wants are converted. MEDIA_DEMUX=auto (the default) uses it when it
+is installed; otherwise, or with MEDIA_DEMUX=off, each stage decodes the
+video separately as before.
+
+A frame consumer is a factory registered with register_frame_consumer():
+factory(fps, label, **options) returns an object with wants(index), consume(index,
+rgb_frame) and finish(frames_total) -> result, and optionally the (width,
+height) `size` it expects; consumers of one video must agree on it. Consumers
+are registered at import time so process-pool workers see them too. The
+pipeline runs every registered consumer and reports the results of those other
+than eye tracking per question under `frame_analyses`, so they should be
+JSON-serializable.
+"""
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from video_process import eye_tracking, limits, metrics, video_utils
+
+MEDIA_DEMUX = os.environ.get("MEDIA_DEMUX", "auto")  # "auto", "pyav" or "off"
+MEDIA_FRAME_SIZE = (640, 480)  # Width, height of the RGB frames for consumers without a `size` of their own
+MEDIA_AUDIO_QUEUE_CHUNKS = 4  # Audio chunks decoded ahead of the transcriber before the demux waits for it
+
+# name -> factory(fps, label, **options) returning a frame consumer
+FRAME_CONSUMERS = {
+    "eye_tracking": eye_tracking.eye_contact_consumer,
+}
+
+
+def register_frame_consumer(name, factory):
+    """Add an analyzer fed by the shared decode (see the module docstring for the interface)"""
+    FRAME_CONSUMERS[name] = factory
+
+
+def shared_decode_enabled(setting=MEDIA_DEMUX):
+    """Whether stages share one decode per video, or each decodes it separately"""
+    if setting == "off":
+        return False
+    if setting not in ("auto", "pyav"):
+        raise ValueError(f"Unknown MEDIA_DEMUX: {setting} (expected auto, pyav or off)")
+    try:
+        import av  # noqa: F401
+    except ImportError as e:
+        if setting == "pyav":
+            raise ImportError("MEDIA_DEMUX=pyav needs PyAV: pip install av") from e
+        return False
+    return True
+
+
+class _AudioSink:
+    """Re-chunks decoded PCM to AUDIO_CHUNK_SECONDS and queues it for the transcription thread"""
+
+    def __init__(self, limit_seconds=None):
+        self.chunk_bytes = int(video_utils.AUDIO_CHUNK_SECONDS * video_utils.AUDIO_SAMPLE_RATE) \
+            * video_utils.AUDIO_SAMPLE_WIDTH
+        self.limit_bytes = int(limit_seconds * video_utils.AUDIO_SAMPLE_RATE) * video_utils.AUDIO_SAMPLE_WIDTH \
+            if limit_seconds else None
+        self.written = 0
+        self.queue = queue.Queue(maxsize=MEDIA_AUDIO_QUEUE_CHUNKS)
+        self.closed = False
+        self.ended = False  # The reader has seen the end of the stream
+        self._pending = bytearray()
+
+    @property
+    def full(self):
+        return self.limit_bytes is not None and self.written >= self.limit_bytes
+
+    def write(self, pcm):
+        if self.limit_bytes is not None:
+            pcm = pcm[:max(0, self.limit_bytes - self.written)]
+        self.written += len(pcm)
+        self._pending += pcm
+        while len(self._pending) >= self.chunk_bytes:
+            self.queue.put(bytes(self._pending[:self.chunk_bytes]))
+            del self._pending[:self.chunk_bytes]
+
+    def close(self, error=None):
+        if self.closed:
+            return
+        self.closed = True
+        if self._pending:
+            self.queue.put(bytes(self._pending))
+            self._pending.clear()
+        self.queue.put(error)  # None ends the stream; an exception fails the transcription
+
+    def chunks(self):
+        while not self.ended:
+            item = self.queue.get()
+            if item is None or isinstance(item, BaseException):
+                self.ended = True
+                if item is not None:
+                    raise item
+                return
+            yield item
+
+
+class _Transcription:
+    """Transcribes an _AudioSink's chunks on a thread while the demux loop runs"""
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.result = None
+        self.observations = []
+        self._thread = threading.Thread(target=self._run, name="media-transcribe", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        # Metrics recorded on this thread travel back with the result, like pool work
+        try:
+            self.result, self.observations = metrics.call_captured(video_utils.transcribe_chunks, self.sink.chunks())
+        except Exception as e:
+            self.result = video_utils.failed_transcript(e)
+            try:
+                for _ in self.sink.chunks():
+                    pass  # Keep draining so the demux loop never blocks on a full queue
+            except Exception:
+                pass
+
+    def join(self):
+        self._thread.join()
+        metrics.replay(self.observations)
+        return self.result
+
+
+class _FrameFanOut:
+    """Hands each frame, converted once, to every consumer that wants it"""
+
+    def __init__(self, names, fps, label, options=None):
+        options = options or {}
+        self.fps = fps
+        self.consumers = {name: FRAME_CONSUMERS[name](fps, label, **options.get(name, {})) for name in names}
+        sizes = {tuple(getattr(consumer, "size", MEDIA_FRAME_SIZE)) for consumer in self.consumers.values()}
+        if len(sizes) > 1:
+            raise ValueError(f"Frame consumers {', '.join(self.consumers)} expect different frame sizes: {sizes}")
+        self.size = width, height = sizes.pop() if sizes else MEDIA_FRAME_SIZE
+        self.frame = np.empty((height, width, 3), dtype=np.uint8)  # Written by the decoder only
+        self.shared = self.frame.view()
+        self.shared.flags.writeable = False  # Consumers share the buffer, so none may modify it
+        self.seconds = {name: 0.0 for name in self.consumers}
+        self.frames_total = 0
+
+    def wanting(self, index):
+        return [(name, consumer) for name, consumer in self.consumers.items() if consumer.wants(index)]
+
+    def deliver(self, index, wanting):
+        for name, consumer in wanting:
+            start = time.perf_counter()
+            consumer.consume(index, self.shared)
+            self.seconds[name] += time.perf_counter() - start
+
+    def finish(self):
+        for name, seconds in self.seconds.items():
+            metrics.observe("stage_seconds", seconds, stage=name)
+        return {name: consumer.finish(self.frames_total) for name, consumer in self.consumers.items()}
+
+
+def _pcm_bytes(frame):
+    # The plane may be padded past the last sample
+    return bytes(frame.planes[0])[:frame.samples * video_utils.AUDIO_SAMPLE_WIDTH]
+
+
+def _demux(video_path, consumers, sink, label, limit_seconds=None, options=None):
+    import av
+
+    eye_tracking.load_opencv()
+    cv2 = eye_tracking.cv2
+    decode_seconds = 0.0
+    guard = limits.MemoryGuard()
+    with av.open(video_path) as container:
+        video = container.streams.video[0] if consumers and container.streams.video else None
+        audio = container.streams.audio[0] if sink is not None and container.streams.audio else None
+        if consumers and video is None:
+            raise ValueError(f"No video stream in {video_path}")
+        if sink is not None and audio is None:
+            sink.close(ValueError("Video has no audio track"))
+            sink = None
+        streams = [stream for stream in (video, audio) if stream is not None]
+
+        fanout = None
+        frame_limit = None
+        if video is not None:
+            video.thread_type = "AUTO"
+            fanout = _FrameFanOut(consumers, float(video.average_rate or 30.0), label, options)
+            resized = np.empty_like(fanout.frame)
+            if limit_seconds:
+                frame_limit = int(limit_seconds * fanout.fps)
+        resampler = av.AudioResampler(format="s16", layout="mono", rate=video_utils.AUDIO_SAMPLE_RATE)
+
+        packets = container.demux(*streams) if streams else iter(())
+        while not guard.tripped:
+            if limit_seconds and (video is None or fanout.frames_total >= frame_limit) \
+                    and (sink is None or sink.full):
+                break  # Every stream is past the limit
+            start = time.perf_counter()
+            packet = next(packets, None)
+            if packet is None:
+                break
+            if packet.stream is video and frame_limit is not None and fanout.frames_total >= frame_limit:
+                continue
+            frames = packet.decode()
+            decode_seconds += time.perf_counter() - start
+            for frame in frames:
+                if packet.stream is audio:
+                    start = time.perf_counter()
+                    for pcm in resampler.resample(frame):
+                        sink.write(_pcm_bytes(pcm))
+                    decode_seconds += time.perf_counter() - start
+                    continue
+                if (frame_limit is not None and fanout.frames_total >= frame_limit) or guard.exceeded():
+                    break
+                index = fanout.frames_total
+                fanout.frames_total += 1
+                wanting = fanout.wanting(index)
+                if wanting:
+                    # Same conversion as eye_tracking.FrameSource, so scores match the separate decode
+                    start = time.perf_counter()
+                    cv2.resize(frame.to_ndarray(format="bgr24"), fanout.size, dst=resized)
+                    cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=fanout.frame)
+                    decode_seconds += time.perf_counter() - start
+                    fanout.deliver(index, wanting)
+        if sink is not None and not guard.tripped:
+            for pcm in resampler.resample(None):
+                sink.write(_pcm_bytes(pcm))
+    if sink is not None:
+        sink.close()
+    metrics.observe("stage_seconds", decode_seconds, stage="media_decode")
+    degraded = None
+    if guard.tripped:
+        seconds = fanout.frames_total / fanout.fps if fanout is not None else 0.0
+        degraded = guard.degradation("truncated", seconds_analyzed=round(seconds, 1))
+    return fanout, degraded
+
+
+def analyze_media(video_path, consumers=(), transcribe=True, limit_seconds=None, options=None):
+    """Run the transcriber and the named frame consumers over one decode of the video.
+
+    Returns {"transcript": ..., <consumer name>: <its result>, ...}; the
+    transcript is only present when `transcribe` is set and, as with
+    transcribe_video_safe, a missing audio track gives a failed (empty)
+    transcript rather than an error. Only the first `limit_seconds` are
+    decoded, if set; `options` maps consumer names to extra factory keyword
+    arguments. When the worker passes MAX_WORKER_RSS_MB, decoding stops and
+    every result dict lists the cut under `degraded`. If the shared decode
+    fails (e.g. PyAV cannot open the file, or it has no video stream), the
+    results come from a decode per stage instead, as with MEDIA_DEMUX=off.
+    """
+    sink = _AudioSink(limit_seconds) if transcribe else None
+    transcription = _Transcription(sink) if transcribe else None
+
+    error = None
+    with metrics.timer("media"):
+        try:
+            fanout, degraded = _demux(video_path, consumers, sink, video_path, limit_seconds, options)
+        except Exception as e:
+            if sink is not None:
+                sink.close(e)  # Lets the transcription thread finish
+            error = e
+        finally:
+            transcript = transcription.join() if transcription is not None else None
+    if error is not None:
+        print(f"[ERROR] Shared decode failed for {video_path}: {error}; decoding per stage")
+        return _analyze_per_stage(video_path, consumers, transcribe, limit_seconds, options)
+
+    results = fanout.finish() if fanout is not None else {}
+    if transcription is not None:
+        results["transcript"] = transcript
+    if degraded is not None:
+        for result in results.values():
+            if isinstance(result, dict):
+                result.setdefault("degraded", []).append(degraded)
+    return results
+
+
+def _analyze_per_stage(video_path, consumers, transcribe, limit_seconds=None, options=None):
+    """analyze_media's results from each stage's own decode; other frame consumers have none, so they are left out"""
+    results = {}
+    if "eye_tracking" in consumers:
+        eye_options = (options or {}).get("eye_tracking", {})
+        results["eye_tracking"] = eye_tracking.analyze_eye_tracking(video_path, limit_seconds=limit_seconds,
+                                                                    **eye_options)
+    if transcribe:
+        results["transcript"] = video_utils.transcribe_video_safe(video_path, limit_seconds=limit_seconds)
+    return results
@@ -0,0 +1,213 @@
+"""Lightweight in-process metrics in the Prometheus text format.
+
+Stage timers feed the `stage_seconds` histogram and, while a request trace is
+active on the current thread, that request's timing breakdown. Work that runs
+in pool threads or processes is wrapped with call_captured(): its observations
+come back with the result and are recorded by the submitting process. With
+METRICS_ENABLED=0 every recording call returns immediately.
+
+Metrics are per process; under gunicorn each worker reports its own.
+"""
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+METRICS_PREFIX = "interview_"
+
+SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+# name -> (type, help, histogram buckets)
+METRICS = {
+    "stage_seconds": ("histogram", "Wall time per pipeline stage (per video or per request)", SECONDS_BUCKETS),
+    "http_request_seconds": ("histogram", "HTTP request duration by endpoint and status", SECONDS_BUCKETS),
+    "frames_total": ("counter", "Video frames seen by eye tracking, by kind (analyzed or skipped)", None),
+    "transcription_segments_total": ("counter", "Audio segments sent to the speech-to-text engine", None),
+    "ai_batch_size": ("histogram", "Sequences per AI detector forward pass", BATCH_SIZE_BUCKETS),
+    "ai_inference_seconds": ("histogram", "AI detector forward pass duration", SECONDS_BUCKETS),
+    "upload_bytes_total": ("counter", "Video bytes received in uploads", None),
+    "temp_file_bytes": ("gauge", "Bytes of uploaded videos currently on disk", None),
+    "jobs_total": ("counter", "Finished evaluation jobs by status", None),
+}
+
+_lock = threading.Lock()
+_values = {}  # (name, labels) -> number, or [bucket counts..., sum, count] for histograms
+_collectors = []  # Callables returning [(name, type, help, [(labels, value), ...])] at scrape time
+_local = threading.local()  # .capture: observation list in pool workers; .trace: request timing breakdown
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _apply(kind, name, value, labels):
+    key = (name, labels)
+    with _lock:
+        if kind == "observe":
+            buckets = METRICS[name][2]
+            entry = _values.get(key)
+            if entry is None:
+                entry = _values[key] = [0] * (len(buckets) + 2)
+            for i, edge in enumerate(buckets):
+                if value <= edge:
+                    entry[i] += 1
+            entry[-2] += value
+            entry[-1] += 1
+        else:
+            _values[key] = _values.get(key, 0) + value
+
+
+def _record(kind, name, value, labels):
+    capture = getattr(_local, "capture", None)
+    if capture is not None:
+        capture.append((kind, name, value, labels))
+        return
+    _apply(kind, name, value, labels)
+    if name == "stage_seconds":
+        _add_to_trace(labels, value)
+
+
+def _add_to_trace(labels, value):
+    trace = getattr(_local, "trace", None)
+    if trace is not None:
+        stage = dict(labels)["stage"]
+        trace[stage] = trace.get(stage, 0.0) + value
+
+
+def inc(name, amount=1, **labels):
+    if METRICS_ENABLED:
+        _record("inc", name, amount, _labels(labels))
+
+
+def observe(name, value, **labels):
+    if METRICS_ENABLED:
+        _record("observe", name, value, _labels(labels))
+
+
+class _Timer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        observe("stage_seconds", time.perf_counter() - self.start, stage=self.stage)
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+_null_timer = _NullTimer()
+
+def timer(stage):
+    """Context manager recording the block's wall time as `stage`"""
+    return _Timer(stage) if METRICS_ENABLED else _null_timer
+
+
+def call_captured(fn, *args):
+    """Run fn(*args) in a pool worker, returning (result, observations) instead of recording them"""
+    _local.capture = observations = []
+    try:
+        return fn(*args), observations
+    finally:
+        _local.capture = None
+
+
+def chain_captured(future, observations):
+    """Future for the result of a call_captured future; records its observations and appends them to `observations`"""
+    outer = Future()
+
+    def done(inner):
+        try:
+            result, captured = inner.result()
+        except BaseException as e:
+            outer.set_exception(e)
+            return
+        for kind, name, value, labels in captured:
+            _apply(kind, name, value, labels)
+        observations.extend(captured)
+        outer.set_result(result)
+
+    future.add_done_callback(done)
+    return outer
+
+
+def replay(observations):
+    """Record observations captured on another thread as if they were made on this one"""
+    for kind, name, value, labels in observations:
+        _record(kind, name, value, labels)
+
+
+def add_to_trace(observations):
+    """Count observations recorded on behalf of this thread's request in its timing breakdown"""
+    for _, name, value, labels in observations:
+        if name == "stage_seconds":
+            _add_to_trace(labels, value)
+
+
+def start_trace():
+    """Collect a timing breakdown for the request running on this thread"""
+    if METRICS_ENABLED:
+        _local.trace = {}
+
+
+def end_trace():
+    """Stop the trace started on this thread and return {stage: seconds}, or None if there was none"""
+    trace = getattr(_local, "trace", None)
+    _local.trace = None
+    if trace is None:
+        return None
+    return {stage: round(seconds, 4) for stage, seconds in trace.items()}
+
+
+def register_collector(fn):
+    """Add a callable polled at scrape time for values kept elsewhere (queue depth, cache counters)"""
+    _collectors.append(fn)
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    with _lock:
+        values = {key: (list(value) if isinstance(value, list) else value) for key, value in _values.items()}
+
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        series = sorted((labels, value) for (metric, labels), value in values.items() if metric == name)
+        full_name = METRICS_PREFIX + name
+        lines.append(f"# HELP {full_name} {help_text}")
+        lines.append(f"# TYPE {full_name} {kind}")
+        for labels, value in series:
+            if kind != "histogram":
+                lines.append(f"{full_name}{_format_labels(labels)} {value}")
+                continue
+            for edge, count in zip(buckets, value):
+                lines.append(f"{full_name}_bucket{_format_labels(labels, [('le', edge)])} {count}")
+            lines.append(f"{full_name}_bucket{_format_labels(labels, [('le', '+Inf')])} {value[-1]}")
+            lines.append(f"{full_name}_sum{_format_labels(labels)} {value[-2]}")
+            lines.append(f"{full_name}_count{_format_labels(labels)} {value[-1]}")
+
+    for collector in _collectors:
+        for name, kind, help_text, series in collector():
+            full_name = METRICS_PREFIX + name
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            for labels, value in series:
+                lines.append(f"{full_name}{_format_labels(_labels(labels))} {value}")
+    return "\n".join(lines) + "\n"
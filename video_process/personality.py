@@ -1,39 +1,32 @@
+import hashlib
 import random
 
+from video_process import scoring
+
 # Simulate Big Five trait predictions per video
-def simulate_big_five_scores(video_path):
+def simulate_big_five_scores(video_path, content_hash=None):
+    """Traits seeded by the video content, so the same upload always gets the same traits"""
     print(f"Simulating Big Five traits for video: {video_path}")
-    import hashlib
-    seed = int(hashlib.md5(video_path.encode()).hexdigest(), 16) % 100000
-    random.seed(seed)  # Consistent per video
+    if content_hash is None:
+        from video_process.cache import content_hash as hash_file
+        content_hash = hash_file(video_path)
+    seed = int(hashlib.md5(content_hash.encode()).hexdigest(), 16) % 100000
+    rng = random.Random(seed)  # Consistent per video, independent of other threads
     return {
-        "Openness": round(random.uniform(0.5, 1.0), 2),
-        "Conscientiousness": round(random.uniform(0.5, 1.0), 2),
-        "Extraversion": round(random.uniform(0.3, 0.9), 2),
-        "Agreeableness": round(random.uniform(0.4, 1.0), 2),
-        "Neuroticism": round(random.uniform(0.1, 0.5), 2),
+        "Openness": round(rng.uniform(0.5, 1.0), 2),
+        "Conscientiousness": round(rng.uniform(0.5, 1.0), 2),
+        "Extraversion": round(rng.uniform(0.3, 0.9), 2),
+        "Agreeableness": round(rng.uniform(0.4, 1.0), 2),
+        "Neuroticism": round(rng.uniform(0.1, 0.5), 2),
     }
 
 
 # Score roles based on Big Five traits
-def score_roles(traits):
-    scores = {
-        'software_engineer': traits["Conscientiousness"] * 0.4 +
-                             traits["Openness"] * 0.3 +
-                             (1 - traits["Neuroticism"]) * 0.3,
-
-        'associate_software_engineer': traits["Conscientiousness"] * 0.3 +
-                                       traits["Agreeableness"] * 0.2 +
-                                       traits["Openness"] * 0.2 +
-                                       (1 - traits["Neuroticism"]) * 0.3,
-
-        'it_intern': traits["Openness"] * 0.4 +
-                     traits["Extraversion"] * 0.2 +
-                     traits["Agreeableness"] * 0.1 +
-                     (1 - traits["Neuroticism"]) * 0.3,
-    }
-
-    return {role: int(round(score * 100)) for role, score in scores.items()}
+def score_roles(traits, rubric=None):
+    """Role fit percentages for one candidate's traits (see scoring.Rubric for the weights)"""
+    rubric = rubric or scoring.get_rubric()
+    fit = rubric.role_fit(scoring.trait_matrix([traits]))[0]
+    return {role: int(round(float(score))) for role, score in zip(rubric.roles, fit)}
 
 # Average traits over multiple videos
 def average_traits(traits_list):
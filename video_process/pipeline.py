@@ -0,0 +1,319 @@
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from video_process import eye_tracking, limits, media, metrics, video_utils
+from video_process.cache import content_hash, get_cache, stage_key
+from video_process.eye_tracking import analyze_eye_tracking
+from video_process.video_utils import transcribe_video_safe
+from video_process.personality import simulate_big_five_scores
+
+# Number of concurrent workers per pool (1 = run everything sequentially in-process)
+PIPELINE_WORKERS = int(os.environ.get("PIPELINE_WORKERS", os.cpu_count() or 1))
+
+
+def _eye_tracking_options(plan):
+    """Keyword arguments for analyze_eye_tracking under a limits plan"""
+    options = {"limit_seconds": plan["limit_seconds"]}
+    if plan["target_fps"] and eye_tracking.EYE_SAMPLING_MODE != "budgeted":
+        options.update(mode="fps", target_fps=plan["target_fps"])
+    return options
+
+
+def _eye_tracking_params():
+    if eye_tracking.EYE_SAMPLING_MODE == "budgeted":
+        return (f"budgeted:{eye_tracking.EYE_BUDGET_TOLERANCE}:{eye_tracking.EYE_BUDGET_MAX_FRAMES}:"
+                f"{eye_tracking.EYE_BUDGET_SECONDS}:{eye_tracking.EYE_SAMPLE_SEED}")
+    return (f"{eye_tracking.EYE_SAMPLING_MODE}:{eye_tracking.EYE_TARGET_FPS}:"
+            f"{eye_tracking.EYE_EVERY_N}:{eye_tracking.ADAPTIVE_MAX_STEP}")
+
+
+class PipelineScheduler:
+    """Runs the per-question stages of an interview concurrently.
+
+    Frame analysis is CPU-bound and goes to a process pool; audio extraction and
+    transcription are I/O-bound and go to a thread pool. Results come back in
+    question order, and the first failing question (in order) raises, exactly as
+    the sequential loop would. Stage outputs are cached by video content hash,
+    so repeated uploads skip the work entirely. With PyAV installed, each video
+    is decoded once for transcription, eye tracking and every registered frame
+    consumer (see media.py). Each
+    video is processed within the per-video limits (see limits.py).
+    """
+
+    def __init__(self, workers=PIPELINE_WORKERS, cache=None):
+        self.workers = max(1, int(workers))
+        self.cache = cache or get_cache()
+        self._frame_pool = None
+        self._audio_pool = None
+        self._pools_lock = threading.Lock()
+
+    def _pools(self):
+        # Created on first use so importing the app never forks worker processes
+        with self._pools_lock:
+            if self._frame_pool is None:
+                self._frame_pool = ProcessPoolExecutor(max_workers=self.workers)
+                self._audio_pool = ThreadPoolExecutor(max_workers=self.workers,
+                                                      thread_name_prefix="audio")
+            return self._frame_pool, self._audio_pool
+
+    def _cached_or_submit(self, key, pool, work, fn, *args):
+        """(future, cache hit) for a stage: cached value, work on `pool`, or inline work when sequential.
+
+        Metrics recorded by pooled work are appended to `work["observations"]`.
+        """
+        cached = self.cache.get(key)
+        if cached is not None:
+            return _resolved(cached), True
+        return self._run(pool, work, fn, *args), False
+
+    def _run(self, pool, work, fn, *args):
+        """Future for fn(*args); the pool's own future is added to `work["pooled"]` so it can be cancelled"""
+        if pool is not None:
+            if metrics.METRICS_ENABLED:
+                pooled = pool.submit(metrics.call_captured, fn, *args)
+                work["pooled"].append(pooled)
+                return metrics.chain_captured(pooled, work["observations"])
+            pooled = pool.submit(fn, *args)
+            work["pooled"].append(pooled)
+            return pooled
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _submit_media(self, keys, frame_pool, work, video_path, plan):
+        """(transcript, eye tracking or None, frame analyses, transcript cache hit) from one shared decode.
+
+        Every frame consumer registered with media.register_frame_consumer runs
+        on the decode. Eye tracking joins it unless its result is cached or it
+        samples with `budgeted`, which seeks and so keeps its own reader (None
+        in its place). Returns None to decode per stage: without the shared
+        decode, or when no consumer needs the frames.
+        """
+        if not media.shared_decode_enabled():
+            return None
+        share_eye = eye_tracking.EYE_SAMPLING_MODE != "budgeted" and self.cache.get(keys["eye_tracking"]) is None
+        consumers = tuple(name for name in media.FRAME_CONSUMERS if name != "eye_tracking" or share_eye)
+        if not consumers:
+            return None
+        transcript = self.cache.get(keys["transcript"])
+        options = _eye_tracking_options(plan)
+        media_future = self._run(frame_pool, work, media.analyze_media, video_path,
+                                 consumers, transcript is None, options.pop("limit_seconds"),
+                                 {"eye_tracking": options})
+        if transcript is None:
+            transcription_future = _derived(media_future, lambda results: results["transcript"],
+                                            video_utils.failed_transcript)
+        else:
+            transcription_future = _resolved(transcript)
+        eye_future = _derived(media_future, lambda results: results["eye_tracking"]) if share_eye else None
+        analyses_future = _derived(media_future, lambda results: {
+            name: results[name] for name in consumers if name != "eye_tracking" and name in results
+        })
+        return transcription_future, eye_future, analyses_future, transcript is not None
+
+    def submit(self, q_key, video_path, digest=None, counter=None):
+        """Start every stage for one saved video and return a handle for collect().
+
+        With a single worker the stages run inline before this returns.
+        """
+        frame_pool, audio_pool = self._pools() if self.workers > 1 else (None, None)
+        digest = digest or content_hash(video_path)
+        analyzed_fps = eye_tracking.EYE_TARGET_FPS if eye_tracking.EYE_SAMPLING_MODE == "fps" else None
+        plan = limits.plan_video(video_path, analyzed_fps)
+        keys = {
+            "transcript": stage_key("transcript", digest,
+                                    video_utils.TRANSCRIBER_ENGINE + limits.plan_key(plan, frames=False)),
+            "eye_tracking": stage_key("eye_tracking", digest, _eye_tracking_params() + limits.plan_key(plan)),
+            "traits": stage_key("traits", digest),
+        }
+        work = {"observations": [], "pooled": []}
+
+        # Callbacks are attached per stage so inline runs report each stage as it finishes
+        shared = self._submit_media(keys, frame_pool, work, video_path, plan)
+        if shared is not None:
+            transcription_future, eye_future, analyses_future, transcript_hit = shared
+        else:
+            transcription_future, transcript_hit = self._cached_or_submit(
+                keys["transcript"], audio_pool, work,
+                partial(transcribe_video_safe, limit_seconds=plan["limit_seconds"]), video_path
+            )
+            eye_future = None
+            analyses_future = _resolved({})  # Frame consumers need the shared decode
+        if counter is not None:
+            transcription_future.add_done_callback(lambda _: counter.done("transcription"))
+        eye_hit = False
+        if eye_future is None:
+            eye_future, eye_hit = self._cached_or_submit(
+                keys["eye_tracking"], frame_pool, work,
+                partial(analyze_eye_tracking, **_eye_tracking_options(plan)), video_path
+            )
+        if counter is not None:
+            eye_future.add_done_callback(lambda _: counter.done("eye_tracking"))
+        return {
+            "question": q_key,
+            "video_path": video_path,
+            "content_hash": digest,
+            "keys": keys,
+            "plan": plan,
+            "transcription": transcription_future,
+            "eye_tracking": eye_future,
+            "frame_analyses": analyses_future,
+            "transcript_hit": transcript_hit,
+            "eye_hit": eye_hit,
+            "observations": work["observations"],
+            "pooled": work["pooled"],
+        }
+
+    def cancel(self, handles, then=None):
+        """Drop the handles' work: cancel what has not started, without waiting for what has.
+
+        `then()`, if given, runs once no worker is still reading the handles'
+        videos (e.g. to delete them): right away when nothing is running,
+        otherwise from the done-callback of the last task to finish.
+        """
+        running = [future for handle in handles for future in handle["pooled"] if not future.cancel()]
+        if then is None:
+            return
+        if not running:
+            then()
+            return
+        remaining = [len(running)]
+        lock = threading.Lock()
+
+        def done(_):
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                then()
+
+        for future in running:
+            future.add_done_callback(done)
+
+    def collect(self, handles):
+        """Results for submitted handles, in order; raises the first failing question's error.
+
+        Waits for every stage before returning or raising, so the caller never
+        deletes files that a worker is still reading.
+        """
+        outputs = []
+        first_error = None
+        for handle in handles:
+            keys = handle["keys"]
+            try:
+                transcript = handle["transcription"].result()
+                traits = self.cache.get(keys["traits"])
+                if traits is None:
+                    with metrics.timer("traits"):
+                        traits = simulate_big_five_scores(handle["video_path"], content_hash=handle["content_hash"])
+                    self.cache.set(keys["traits"], traits)
+                eye_result = handle["eye_tracking"].result()
+                analyses = handle["frame_analyses"].result()
+                metrics.add_to_trace(handle["observations"])  # Stage times measured in the pools
+            except Exception as e:
+                if first_error is None:
+                    first_error = e
+                handle["eye_tracking"].exception()
+                continue
+
+            # Transient failures (e.g. the speech API being unreachable) and memory cuts are not cached
+            if not handle["transcript_hit"] and not transcript.get("failed") and "degraded" not in transcript:
+                self.cache.set(keys["transcript"], transcript)
+            if not handle["eye_hit"] and "degraded" not in eye_result:
+                self.cache.set(keys["eye_tracking"], eye_result)
+            degraded = list(handle["plan"]["degraded"])
+            for entry in transcript.get("degraded", []) + eye_result.get("degraded", []):
+                if entry not in degraded:
+                    degraded.append(entry)
+            outputs.append({
+                "question": handle["question"],
+                "content_hash": handle["content_hash"],
+                "transcription": transcript["text"],
+                "words": transcript["words"],
+                "transcript_complete": not transcript.get("failed") and "degraded" not in transcript,
+                "traits": traits,
+                "eye_score": eye_result["score"],
+                "eye_tracking": eye_result,
+                "frame_analyses": analyses,
+                "degraded": degraded,
+            })
+
+        if first_error is not None:
+            raise first_error
+        return outputs
+
+    def run(self, questions, progress=None):
+        """Process (question_key, video_path) tuples.
+
+        Returns a list of dicts with content_hash, transcription, words,
+        transcript_complete (False for a failed or memory-cut transcript), traits,
+        eye_score, the full eye_tracking result, the results of the other
+        registered frame consumers (`frame_analyses`, by name) and the limits
+        that degraded the analysis (`degraded`, see limits.py) in the same
+        order as `questions`. `progress`, if given, is called as progress(stage, done,
+        total) each time a stage finishes for one video.
+        """
+        counter = _StageCounter(len(questions), progress)
+        handles = []
+        for q_key, video_path in questions:
+            handle = self.submit(q_key, video_path, counter=counter)
+            handles.append(handle)
+
+            # Sequential mode stops at the first failing video, like the original loop
+            if self.workers == 1 and (handle["transcription"].exception() or handle["eye_tracking"].exception()):
+                break
+        return self.collect(handles)
+
+    def shutdown(self):
+        with self._pools_lock:
+            frame_pool, audio_pool = self._frame_pool, self._audio_pool
+            self._frame_pool = None
+            self._audio_pool = None
+        if frame_pool is not None:
+            frame_pool.shutdown()
+            audio_pool.shutdown()
+
+
+def _resolved(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def _derived(future, pick, on_error=None):
+    """Future for pick(result) of `future`; `on_error(exception)`, if given, turns a failure into a result"""
+    derived = Future()
+
+    def done(inner):
+        try:
+            derived.set_result(pick(inner.result()))
+        except BaseException as e:  # Including CancelledError
+            if on_error is None:
+                derived.set_exception(e)
+            else:
+                derived.set_result(on_error(e))
+
+    future.add_done_callback(done)
+    return derived
+
+
+class _StageCounter:
+    """Counts finished videos per stage and forwards them to a progress callback"""
+
+    def __init__(self, total, callback):
+        self.total = total
+        self.callback = callback
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def done(self, stage):
+        if self.callback is None:
+            return
+        with self.lock:
+            self.counts[stage] = self.counts.get(stage, 0) + 1
+            self.callback(stage, self.counts[stage], self.total)
@@ -0,0 +1,102 @@
+import gc
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# When models and heavy libraries are loaded:
+#   lazy        on the first request that needs them
+#   background  in a background thread as soon as the app is imported (default)
+#   preload     synchronously at import, before the server forks its workers, so
+#               model weights are shared copy-on-write (gunicorn --preload)
+MODEL_LOADING = os.environ.get("MODEL_LOADING", "background")
+
+_ai_detector = None
+_detector_lock = threading.Lock()
+_ready = threading.Event()
+_warm_up_error = None
+_mode = None  # MODEL_LOADING mode passed to start()
+
+
+def get_ai_detector():
+    """Return the process-wide AIDetector, loading it on first use"""
+    global _ai_detector
+    if _ai_detector is None:
+        with _detector_lock:
+            if _ai_detector is None:
+                from video_process.ai_detection import AIDetector
+                _ai_detector = AIDetector()
+    return _ai_detector
+
+
+def warm_up(run_inference=True):
+    """Load every model and heavy library so the first request pays nothing.
+
+    `run_inference` also pushes one sentence through the detector; skip it
+    before forking, since inference starts thread pools that do not survive fork.
+    """
+    global _warm_up_error
+    try:
+        detector = get_ai_detector()
+
+        from video_process.eye_tracking import load_libraries
+        from video_process.video_utils import ffmpeg_executable
+        load_libraries()
+        ffmpeg_executable()
+
+        if run_inference:
+            detector.detect_batch(["This sentence only warms up the AI detection model."])
+        _warm_up_error = None
+        _ready.set()
+        logger.info("Warm-up complete")
+    except Exception as e:
+        _warm_up_error = str(e)
+        logger.error(f"Warm-up failed: {e}")
+        raise
+
+
+def preload():
+    """Warm up in the parent process and keep the loaded objects out of GC scans.
+
+    gc.freeze() stops the collector from touching (and so copying) the pages
+    that hold the preloaded objects in every forked worker.
+    """
+    warm_up(run_inference=False)
+    gc.freeze()
+
+
+def start_background_warm_up():
+    def run():
+        try:
+            warm_up()
+        except Exception:
+            pass  # Reported through readiness()
+
+    threading.Thread(target=run, name="warm-up", daemon=True).start()
+
+
+def readiness():
+    """(ready, detail) for the readiness probe.
+
+    Lazy loading is always ready: the models load on the first request, which
+    the probe has to let through.
+    """
+    if _ready.is_set():
+        return True, "ready"
+    if _mode == "lazy":
+        return True, "lazy"
+    if _warm_up_error:
+        return False, f"warm-up failed: {_warm_up_error}"
+    return False, "loading"
+
+
+def start(mode=MODEL_LOADING):
+    global _mode
+    _mode = mode
+    if mode == "preload":
+        preload()
+    elif mode == "background":
+        start_background_warm_up()
+    elif mode != "lazy":
+        raise ValueError(f"Unknown MODEL_LOADING mode: {mode}")
@@ -0,0 +1,138 @@
+"""Role fit and final scores for many candidates at once.
+
+A Rubric holds the role/trait weight matrix and the final-score blend:
+
+    role fit     sum of weight * trait per role (traits in `inverted` count as
+                 1 - value), as a percentage
+    base score   content, eye contact and mean-trait personality (0-100 each)
+                 blended by `final_weights`
+    final score  base score less `ai_penalty` of itself at 100% suspicion
+
+Rubric.score() takes arrays for any number of candidates and returns unrounded
+numbers; rounding and "%" formatting happen where results are reported. The
+default rubric reproduces the original hard-coded weights; SCORING_RUBRIC
+points at a JSON file ({"roles": ..., "final_weights": ..., "ai_penalty": ...,
+"inverted": [...]}, every key optional) to change them without a code change.
+"""
+import json
+import os
+import threading
+
+import numpy as np
+
+SCORING_RUBRIC = os.environ.get("SCORING_RUBRIC")  # JSON rubric file; unset uses the defaults below
+
+TRAITS = ("Openness", "Conscientiousness", "Extraversion", "Agreeableness", "Neuroticism")
+INVERTED_TRAITS = ("Neuroticism",)  # Low is desirable, so these count as 1 - value
+ROLE_WEIGHTS = {
+    "software_engineer": {"Conscientiousness": 0.4, "Openness": 0.3, "Neuroticism": 0.3},
+    "associate_software_engineer": {"Conscientiousness": 0.3, "Agreeableness": 0.2, "Openness": 0.2,
+                                    "Neuroticism": 0.3},
+    "it_intern": {"Openness": 0.4, "Extraversion": 0.2, "Agreeableness": 0.1, "Neuroticism": 0.3},
+}
+FINAL_WEIGHTS = {"content": 0.5, "eye": 0.2, "personality": 0.3}
+AI_PENALTY = 0.3  # Fraction of the base score removed at 100% AI suspicion
+
+
+class Rubric:
+    """Role weights over the Big Five traits and the final-score blend"""
+
+    def __init__(self, roles=None, final_weights=None, ai_penalty=AI_PENALTY, inverted=INVERTED_TRAITS):
+        roles = ROLE_WEIGHTS if roles is None else roles
+        final_weights = {**FINAL_WEIGHTS, **(final_weights or {})}
+        if not roles:
+            raise ValueError("A rubric needs at least one role")
+        unknown = {trait for weights in roles.values() for trait in weights} | set(inverted)
+        unknown -= set(TRAITS)
+        if unknown:
+            raise ValueError(f"Unknown traits in rubric: {sorted(unknown)}; expected {list(TRAITS)}")
+        if set(final_weights) != set(FINAL_WEIGHTS):
+            raise ValueError(f"final_weights keys must be {sorted(FINAL_WEIGHTS)}")
+
+        self.roles = tuple(roles)
+        self.weights = np.zeros((len(self.roles), len(TRAITS)))  # Role x trait matrix
+        # Per role, trait columns in the order the rubric lists them, then the unweighted ones
+        self.term_order = np.zeros((len(self.roles), len(TRAITS)), dtype=np.intp)
+        for row, role in enumerate(self.roles):
+            listed = [TRAITS.index(trait) for trait in roles[role]]
+            self.weights[row, listed] = [float(weight) for weight in roles[role].values()]
+            self.term_order[row] = listed + [column for column in range(len(TRAITS)) if column not in listed]
+        self.inverted = np.array([trait in inverted for trait in TRAITS])
+        self.final_weights = {key: float(value) for key, value in final_weights.items()}
+        self.ai_penalty = float(ai_penalty)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as f:
+            config = json.load(f)
+        return cls(config.get("roles"), config.get("final_weights"), config.get("ai_penalty", AI_PENALTY),
+                   config.get("inverted", INVERTED_TRAITS))
+
+    def role_fit(self, traits):
+        """(candidates, roles) fit percentages for a (candidates, traits) array in TRAITS order"""
+        traits = np.asarray(traits, dtype=np.float64)
+        oriented = np.where(self.inverted, 1 - traits, traits)
+        rows = np.arange(len(self.roles))
+        fit = np.zeros((len(traits), len(self.roles)))
+        # oriented @ weights.T, one term position at a time for every candidate and role, so each
+        # role sums its terms in rubric order: a BLAS matmul may not, and with two-decimal traits
+        # exact .5 ties are common enough for that last bit to change rounded scores
+        for position in range(len(TRAITS)):
+            columns = self.term_order[:, position]
+            fit += oriented[:, columns] * self.weights[rows, columns]
+        return fit * 100
+
+    def score(self, traits, content, eye, suspicion):
+        """Role fit and final scores for every candidate in one call.
+
+        `traits` is (candidates, traits) in TRAITS order; `content` holds each
+        candidate's content score, or (candidates, questions) per-question
+        scores to average; `eye` and `suspicion` are per candidate. All scores
+        are 0-100. Returns unrounded arrays: role_fit (candidates, roles),
+        content_score, eye_contact_score, personality_score, base_score and
+        final_score.
+        """
+        traits = np.asarray(traits, dtype=np.float64)
+        content = np.asarray(content, dtype=np.float64)
+        if content.ndim == 2:
+            content = content.mean(axis=1)
+        eye = np.asarray(eye, dtype=np.float64)
+        suspicion = np.asarray(suspicion, dtype=np.float64)
+
+        trait_sum = np.zeros(len(traits))
+        for column in range(traits.shape[1]):
+            trait_sum += traits[:, column]
+        personality = trait_sum / traits.shape[1] * 100
+        base = (self.final_weights["content"] * content + self.final_weights["eye"] * eye +
+                self.final_weights["personality"] * personality)
+        final = np.maximum(0, base * (1 - (suspicion / 100 * self.ai_penalty)))
+        return {
+            "role_fit": self.role_fit(traits),
+            "content_score": content,
+            "eye_contact_score": eye,
+            "personality_score": personality,
+            "base_score": base,
+            "final_score": final,
+        }
+
+
+def trait_matrix(traits_list):
+    """(candidates, traits) array from trait dicts"""
+    return np.array([[traits[trait] for trait in TRAITS] for traits in traits_list], dtype=np.float64)
+
+
+_rubric = None
+_rubric_lock = threading.Lock()
+
+def get_rubric():
+    """Process-wide rubric from SCORING_RUBRIC, or the defaults"""
+    global _rubric
+    with _rubric_lock:
+        if _rubric is None:
+            _rubric = Rubric.from_file(SCORING_RUBRIC) if SCORING_RUBRIC else Rubric()
+        return _rubric
+
+
+def score_candidates(traits, content, eye, suspicion, rubric=None):
+    """Rubric.score() with the process-wide rubric unless one is given"""
+    return (rubric or get_rubric()).score(traits, content, eye, suspicion)
@@ -1,45 +1,365 @@
+import hashlib
+import json
 import os
+import shutil
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import speech_recognition as sr
-from moviepy.editor import VideoFileClip
+
+from video_process import metrics
+from video_process.keywords import get_matcher
 
 recognizer = sr.Recognizer()
 
-def process_video(file_path, upload_id, output_dir) -> str:
-    audio_path = os.path.join(output_dir, f"{upload_id}.wav")
-    video = None
+# Audio is decoded straight to PCM in memory at the rate the recognizer needs
+AUDIO_SAMPLE_RATE = 16000  # Hz, mono
+AUDIO_SAMPLE_WIDTH = 2  # Bytes per sample (signed 16-bit little-endian)
+AUDIO_CHUNK_SECONDS = 5  # Seconds of audio per chunk read from the decoder
+
+# Speech-to-text
+TRANSCRIBER_ENGINE = os.environ.get("TRANSCRIBER_ENGINE", "google")  # "google", "vosk" or "stub"
+VOSK_MODEL_PATH = os.environ.get("VOSK_MODEL_PATH", os.path.join("models", "vosk-model-small-en-us-0.15"))
+TRANSCRIBE_WORKERS = int(os.environ.get("TRANSCRIBE_WORKERS", os.cpu_count() or 1))  # Segments in flight
+TRANSCRIBE_MAX_PENDING = 2 * TRANSCRIBE_WORKERS  # Segments held per video before waiting on the oldest
+
+# Silence-based segmentation of the audio stream
+SILENCE_RMS = 300  # Frame RMS (16-bit units, about -40 dBFS) below which a frame counts as silence
+SILENCE_FRAME_SECONDS = 0.03  # Frame length for the RMS measurement
+MIN_SILENCE_SECONDS = 0.4  # A pause must last this long to become a cut point
+MIN_SEGMENT_SECONDS = 3  # Do not cut segments shorter than this
+MAX_SEGMENT_SECONDS = 30  # Force a cut (at the quietest frame) past this length
+
+_ffmpeg_path = None
+
+def ffmpeg_executable():
+    """Path of the ffmpeg binary bundled with imageio-ffmpeg, or the one on PATH"""
+    global _ffmpeg_path
+    if _ffmpeg_path is None:
+        try:
+            import imageio_ffmpeg
+            _ffmpeg_path = imageio_ffmpeg.get_ffmpeg_exe()
+        except (ImportError, RuntimeError):
+            _ffmpeg_path = shutil.which("ffmpeg")
+            if _ffmpeg_path is None:
+                raise RuntimeError("ffmpeg not found; install imageio-ffmpeg or add ffmpeg to PATH")
+    return _ffmpeg_path
+
+def iter_audio_chunks(file_path, chunk_seconds=AUDIO_CHUNK_SECONDS, limit_seconds=None):
+    """Decode the audio track to mono 16 kHz PCM, yielding chunks as ffmpeg produces them.
+
+    Only the first `limit_seconds` are decoded, if set.
+    """
+    command = [
+        ffmpeg_executable(), "-nostdin", "-v", "error",
+        "-i", file_path,
+        "-vn", "-ac", "1", "-ar", str(AUDIO_SAMPLE_RATE), "-f", "s16le", "pipe:1",
+    ]
+    if limit_seconds:
+        command[-1:-1] = ["-t", str(limit_seconds)]
+    chunk_bytes = int(chunk_seconds * AUDIO_SAMPLE_RATE) * AUDIO_SAMPLE_WIDTH
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    finished = False
+    decode_seconds = 0.0  # Time spent waiting on ffmpeg, not on the consumer
     try:
-        video = VideoFileClip(file_path)
-        audio = video.audio
-        audio.write_audiofile(audio_path, logger=None)
-        
-        with sr.AudioFile(audio_path) as source:
-            audio_data = recognizer.record(source)
+        while True:
+            start = time.perf_counter()
+            chunk = process.stdout.read(chunk_bytes)
+            decode_seconds += time.perf_counter() - start
+            if not chunk:
+                break
+            yield chunk
+        finished = True
+    finally:
+        metrics.observe("stage_seconds", decode_seconds, stage="audio_decode")
+        if not finished and process.poll() is None:
+            process.kill()  # Consumer stopped early
+        process.stdout.close()
+        errors = process.stderr.read().decode(errors="replace").strip()
+        process.stderr.close()
+        process.wait()
+
+    if process.returncode != 0:
+        raise RuntimeError(f"Audio decoding failed: {errors or process.returncode}")
+
+def extract_audio(file_path) -> sr.AudioData:
+    """Collect the streamed PCM chunks into AudioData for the recognizer"""
+    pcm = bytearray()
+    for chunk in iter_audio_chunks(file_path):
+        pcm.extend(chunk)
+    if not pcm:
+        raise ValueError("Video has no audio track")
+    return sr.AudioData(bytes(pcm), AUDIO_SAMPLE_RATE, AUDIO_SAMPLE_WIDTH)
+
+def _frame_rms(samples):
+    frame = int(SILENCE_FRAME_SECONDS * AUDIO_SAMPLE_RATE)
+    count = len(samples) // frame
+    frames = samples[:count * frame].astype(np.float32).reshape(count, frame)
+    return np.sqrt((frames ** 2).mean(axis=1)), frame
+
+def _find_cut(samples):
+    """Sample index to cut at, or None if the buffer has no usable pause yet"""
+    rms, frame = _frame_rms(samples)
+    min_frames = int(MIN_SEGMENT_SECONDS / SILENCE_FRAME_SECONDS)
+    silence_frames = max(1, int(MIN_SILENCE_SECONDS / SILENCE_FRAME_SECONDS))
+
+    run_start = None
+    for i in range(min_frames, len(rms)):
+        if rms[i] < SILENCE_RMS:
+            if run_start is None:
+                run_start = i
+            if i - run_start + 1 >= silence_frames:
+                return ((run_start + i + 1) // 2) * frame  # Middle of the pause
+        else:
+            run_start = None
+
+    max_samples = int(MAX_SEGMENT_SECONDS * AUDIO_SAMPLE_RATE)
+    if len(samples) >= max_samples:
+        window = rms[min_frames:max_samples // frame]
+        return (min_frames + int(np.argmin(window))) * frame
+    return None
+
+def iter_speech_segments(chunks):
+    """Split a stream of PCM chunks at pauses, yielding (start_seconds, pcm_bytes) as soon as each is cut.
+
+    Segments with no frame above the silence threshold are dropped.
+    """
+    buffer = np.zeros(0, dtype=np.int16)
+    offset = 0  # Samples already emitted
+    for chunk in chunks:
+        buffer = np.concatenate([buffer, np.frombuffer(chunk, dtype=np.int16)])
+        while True:
+            cut = _find_cut(buffer)
+            if cut is None:
+                break
+            segment, buffer = buffer[:cut], buffer[cut:]
+            if _frame_rms(segment)[0].max(initial=0) >= SILENCE_RMS:
+                yield offset / AUDIO_SAMPLE_RATE, segment.tobytes()
+            offset += cut
+    if len(buffer) and _frame_rms(buffer)[0].max(initial=0) >= SILENCE_RMS:
+        yield offset / AUDIO_SAMPLE_RATE, buffer.tobytes()
+
+
+class Transcriber:
+    """Turns one PCM segment into words with timestamps (seconds from the segment start)"""
+
+    name = "base"
+
+    def transcribe(self, pcm: bytes) -> list:
+        raise NotImplementedError
+
+    @staticmethod
+    def spread_words(text, duration):
+        """Evenly spaced timestamps for engines that return plain text"""
+        words = text.split()
+        step = duration / len(words) if words else 0
+        return [
+            {"word": word, "start": round(i * step, 2), "end": round((i + 1) * step, 2)}
+            for i, word in enumerate(words)
+        ]
+
+
+class GoogleTranscriber(Transcriber):
+    """Remote Google Web Speech API; timestamps are approximate"""
+
+    name = "google"
+
+    def transcribe(self, pcm):
+        audio_data = sr.AudioData(pcm, AUDIO_SAMPLE_RATE, AUDIO_SAMPLE_WIDTH)
+        try:
             text = recognizer.recognize_google(audio_data)
-        
-        return text
+        except sr.UnknownValueError:
+            return []  # No speech recognised in this segment
+        return self.spread_words(text, len(pcm) / AUDIO_SAMPLE_WIDTH / AUDIO_SAMPLE_RATE)
+
+
+class VoskTranscriber(Transcriber):
+    """Offline Kaldi-based recognizer; runs on CPU without network access"""
+
+    name = "vosk"
+    _models = {}
+    _lock = threading.Lock()
+
+    def __init__(self, model_path=VOSK_MODEL_PATH):
+        from vosk import Model, SetLogLevel
+        SetLogLevel(-1)
+        with self._lock:
+            if model_path not in self._models:
+                self._models[model_path] = Model(model_path)
+        self.model = self._models[model_path]
+
+    def transcribe(self, pcm):
+        from vosk import KaldiRecognizer
+        recognizer = KaldiRecognizer(self.model, AUDIO_SAMPLE_RATE)  # One per segment; the model is shared
+        recognizer.SetWords(True)
+        recognizer.AcceptWaveform(pcm)
+        result = json.loads(recognizer.FinalResult())
+        return [
+            {"word": w["word"], "start": round(w["start"], 2), "end": round(w["end"], 2)}
+            for w in result.get("result", [])
+        ]
+
+
+class StubTranscriber(Transcriber):
+    """Deterministic local engine for tests and benchmarks.
+
+    With `text`, every segment returns those words; otherwise words are picked
+    from a small vocabulary by hashing the segment audio.
+    """
+
+    name = "stub"
+    VOCABULARY = ["java", "runtime", "bytecode", "development", "virtual", "machine", "kit", "environment"]
+
+    def __init__(self, text=None, words_per_second=2.5):
+        self.text = text
+        self.words_per_second = words_per_second
+
+    def transcribe(self, pcm):
+        duration = len(pcm) / AUDIO_SAMPLE_WIDTH / AUDIO_SAMPLE_RATE
+        if self.text is not None:
+            return self.spread_words(self.text, duration)
+        digest = hashlib.sha256(pcm).digest()
+        count = max(1, int(duration * self.words_per_second))
+        words = [self.VOCABULARY[digest[i % len(digest)] % len(self.VOCABULARY)] for i in range(count)]
+        return self.spread_words(" ".join(words), duration)
+
+
+def create_transcriber(engine=TRANSCRIBER_ENGINE):
+    if engine == "google":
+        return GoogleTranscriber()
+    if engine == "vosk":
+        return VoskTranscriber()
+    if engine == "stub":
+        return StubTranscriber()
+    raise ValueError(f"Unknown transcriber engine: {engine}")
+
+_transcriber = None
+_transcriber_lock = threading.Lock()
+_segment_pool = None
+
+def get_transcriber():
+    """Process-wide transcriber for TRANSCRIBER_ENGINE, created on first use"""
+    global _transcriber
+    with _transcriber_lock:
+        if _transcriber is None:
+            _transcriber = create_transcriber()
+        return _transcriber
+
+def _get_segment_pool():
+    global _segment_pool
+    with _transcriber_lock:
+        if _segment_pool is None:
+            _segment_pool = ThreadPoolExecutor(max_workers=TRANSCRIBE_WORKERS, thread_name_prefix="stt")
+        return _segment_pool
+
+def _reset_after_fork():
+    # A forked pool worker inherits the pool object but none of its threads, and possibly a held lock
+    global _segment_pool, _transcriber_lock
+    _segment_pool = None
+    _transcriber_lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):  # Not on Windows, which never forks
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def _timed_transcribe(transcriber, pcm):
+    start = time.perf_counter()
+    words = transcriber.transcribe(pcm)
+    return words, time.perf_counter() - start
+
+def transcribe_video(file_path, transcriber=None, limit_seconds=None) -> dict:
+    """Transcribe a video's audio in silence-delimited segments, in parallel.
+
+    Segments are submitted while the audio is still being decoded and stitched
+    back in order. Returns the text, word timestamps (seconds from the start of
+    the video) and the number of segments. Only the first `limit_seconds` are
+    transcribed, if set.
+    """
+    return transcribe_chunks(iter_audio_chunks(file_path, limit_seconds=limit_seconds), transcriber)
+
+def transcribe_chunks(chunks, transcriber=None) -> dict:
+    """transcribe_video for a stream of mono 16 kHz PCM chunks decoded elsewhere.
+
+    At most TRANSCRIBE_MAX_PENDING segments are held at once; decoding waits on
+    the oldest one past that, so memory does not grow with the audio's length.
+    """
+    with metrics.timer("transcription"):
+        transcriber = transcriber or get_transcriber()
+        pool = _get_segment_pool()
+        pending = deque()
+        words = []
+        segments = 0
+        engine_seconds = 0.0  # Summed over segments, which run in parallel
+
+        def collect(start, future):
+            nonlocal engine_seconds
+            segment_words, seconds = future.result()
+            engine_seconds += seconds
+            for word in segment_words:
+                words.append({
+                    "word": word["word"],
+                    "start": round(start + word["start"], 2),
+                    "end": round(start + word["end"], 2),
+                })
+
+        for start, pcm in iter_speech_segments(chunks):
+            pending.append((start, pool.submit(_timed_transcribe, transcriber, pcm)))
+            segments += 1
+            if len(pending) > TRANSCRIBE_MAX_PENDING:
+                collect(*pending.popleft())
+        while pending:
+            collect(*pending.popleft())
+    metrics.observe("stage_seconds", engine_seconds, stage="speech_to_text")
+    metrics.inc("transcription_segments_total", segments)
+    return {
+        "text": " ".join(word["word"] for word in words),
+        "words": words,
+        "segments": segments,
+    }
+
+def process_video(file_path) -> str:
+    return transcribe_video_safe(file_path)["text"]
+
+def transcribe_video_safe(file_path, limit_seconds=None) -> dict:
+    """transcribe_video that reports failures (e.g. no audio track) as an empty transcript"""
+    try:
+        return transcribe_video(file_path, limit_seconds=limit_seconds)
     except Exception as e:
-        print("No Audio found, "f"[ERROR] Processing failed: {str(e)}")
-        return ""
-    finally:
-        # Explicitly close video and audio objects
-        if video:
-            video.close()
-        if 'audio' in locals():
-            audio.close()
+        return failed_transcript(e)
+
+def failed_transcript(error):
+    print("No Audio found, "f"[ERROR] Processing failed: {str(error)}")
+    return {"text": "", "words": [], "segments": 0, "failed": True}
 
 def evaluate_answer(user_answer: str, keywords: list) -> dict:
+    """Score an answer by the keywords it mentions.
+
+    `keywords` entries are phrases or lists of synonymous phrases (the first
+    one names the keyword in the results). `score` is the percentage of
+    keywords found. Matches are whole-word and listed with their character
+    offsets in `user_answer`.
+    """
+    with metrics.timer("keyword_matching"):
+        return _evaluate_answer(user_answer, keywords)
+
+def _evaluate_answer(user_answer, keywords):
+    matcher = get_matcher(keywords)
     if not user_answer:
         return {
-            "score": "0%",
+            "score": 0,
             "keywords_found": [],
-            "keywords_missing": keywords,
+            "keywords_missing": matcher.labels,
+            "keyword_matches": [],
             "feedback": "No answer detected"
         }
 
-    user_answer = user_answer.lower()
-    keywords = [kw.lower() for kw in keywords]
-    found = [kw for kw in keywords if kw in user_answer]
-    score = len(found) / len(keywords) if keywords else 0
+    matches = matcher.find(user_answer)
+    matched = {group for group, _, _ in matches}
+    found = [label for group, label in enumerate(matcher.labels) if group in matched]
+    score = len(found) / len(matcher.labels) if matcher.labels else 0
 
     feedback = (
         "Excellent! You mentioned most key concepts." if score >= 0.8 else
@@ -48,8 +368,12 @@ def evaluate_answer(user_answer: str, keywords: list) -> dict:
     )
 
     return {
-        "score": f"{round(score * 100)}%",
+        "score": round(score * 100),
         "keywords_found": found,
-        "keywords_missing": [kw for kw in keywords if kw not in found],
+        "keywords_missing": [label for group, label in enumerate(matcher.labels) if group not in matched],
+        "keyword_matches": [
+            {"keyword": matcher.labels[group], "start": start, "end": end, "text": user_answer[start:end]}
+            for group, start, end in matches
+        ],
         "feedback": feedback
     }